@@ -0,0 +1,93 @@
+"""Compare the columnar analytics engine with row-at-a-time aggregation.
+
+    python -m benchmarks.columnar_engine --sizes 1000 100000 1000000
+
+Each size reports the time to build a ledger from documents and the time to
+answer a dashboard's worth of rollup queries, against a pure-Python group-by
+over the same documents. Pass --mongo-url to also time the equivalent raw
+$group pipeline in MongoDB (the data is written to a scratch database).
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date
+
+from columnar import ColumnarLedger
+from benchmarks.synthetic import generate_transactions
+
+def dashboard_periods(today: date) -> list:
+    """The ~40 periods a dashboard load touches"""
+    periods = set()
+    for year in (today.year - 1, today.year):
+        for month in range(1, 13):
+            periods.add(f"{year}-{month:02d}")
+    return sorted(periods)
+
+def python_rollups(docs, periods) -> dict:
+    wanted = set(periods)
+    totals = {}
+    for doc in docs:
+        period = doc['date'][:7]
+        if period not in wanted:
+            continue
+        key = (period, doc['type'], doc['category'])
+        totals[key] = totals.get(key, 0) + doc['amount']
+    return totals
+
+def timed(fn, repeat: int) -> float:
+    """Median wall time of `fn` in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+async def mongo_rollups(mongo_url: str, docs, periods, repeat: int) -> float:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(mongo_url)
+    collection = client['budget_planner_benchmark']['transactions']
+    await collection.drop()
+    await collection.insert_many([{**doc, 'user_id': 'bench', 'period': doc['date'][:7]} for doc in docs])
+    await collection.create_index([('user_id', 1), ('period', 1)])
+    pipeline = [
+        {'$match': {'user_id': 'bench', 'period': {'$in': periods}}},
+        {'$group': {'_id': {'period': '$period', 'type': '$type', 'category': '$category'}, 'total': {'$sum': '$amount'}}}
+    ]
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await collection.aggregate(pipeline).to_list(None)
+        samples.append((time.perf_counter() - started) * 1000)
+    await client.drop_database('budget_planner_benchmark')
+    client.close()
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--mongo-url', default=None)
+    args = parser.parse_args()
+
+    periods = dashboard_periods(date.today())
+    header = f"{'rows':>10} {'build ms':>10} {'columnar ms':>12} {'python ms':>10} {'speedup':>8}"
+    if args.mongo_url:
+        header += f" {'mongo ms':>10}"
+    print(header)
+    for size in args.sizes:
+        docs = list(generate_transactions(size))
+        build_ms = timed(lambda: ColumnarLedger.from_documents(docs), 1)
+        ledger = ColumnarLedger.from_documents(docs)
+        columnar_ms = timed(lambda: (ledger.period_totals(periods=periods), ledger.balance_totals()), args.repeat)
+        python_ms = timed(lambda: python_rollups(docs, periods), args.repeat)
+        line = f"{size:>10} {build_ms:>10.1f} {columnar_ms:>12.2f} {python_ms:>10.1f} {python_ms / columnar_ms:>7.1f}x"
+        if args.mongo_url:
+            mongo_ms = asyncio.run(mongo_rollups(args.mongo_url, docs, periods, args.repeat))
+            line += f" {mongo_ms:>10.1f}"
+        print(line)
+
+if __name__ == '__main__':
+    main()
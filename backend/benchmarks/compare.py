@@ -0,0 +1,59 @@
+"""Compare two benchmarks.routes result files.
+
+    python -m benchmarks.compare benchmarks/results/abc123.json benchmarks/results/def456.json
+
+Prints p50/p95/p99, throughput, peak heap and bytes on the wire per (size, route) with the relative change
+from the baseline, and exits 1 when any route's p95 regressed by more than
+--threshold (10% by default) so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+def load(path: str) -> tuple:
+    with open(path) as handle:
+        report = json.load(handle)
+    return report, {(result['size'], result['route']): result for result in report['results']}
+
+def change(base: float, head: float) -> float:
+    return (head - base) / base if base else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed relative p95 increase')
+    args = parser.parse_args()
+
+    base_report, base = load(args.baseline)
+    head_report, head = load(args.candidate)
+    # Reports recorded before the storage layer existed ran on mongo and tracked neither memory nor bytes
+    print(
+        f"baseline {base_report['commit']} ({base_report['engine']}, {base_report.get('storage', 'mongo')}) vs "
+        f"candidate {head_report['commit']} ({head_report['engine']}, {head_report.get('storage', 'mongo')})"
+    )
+    print(f"{'size':>9} {'route':40} {'p50 ms':>16} {'p95 ms':>16} {'p99 ms':>16} {'req/s':>16} {'heap MB':>16} {'wire KB':>16}")
+
+    regressions = []
+    for key in sorted(base.keys() & head.keys()):
+        old, new = base[key], head[key]
+        cells = []
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps'):
+            cells.append(f"{new[metric]:>9.2f} {change(old[metric], new[metric]):>+6.0%}")
+        for metric in ('peak_heap_mb', 'wire_kb'):
+            if metric in old and metric in new:
+                cells.append(f"{new[metric]:>9.2f} {change(old[metric], new[metric]):>+6.0%}")
+        print(f"{key[0]:>9} {key[1]:40} " + ' '.join(cells))
+        if change(old['p95_ms'], new['p95_ms']) > args.threshold:
+            regressions.append(key)
+
+    for size, route in sorted(base.keys() ^ head.keys()):
+        print(f"{size:>9} {route:40} only in {'baseline' if (size, route) in base else 'candidate'}")
+    if regressions:
+        print(f"{len(regressions)} routes regressed beyond {args.threshold:.0%} at p95:")
+        for size, route in regressions:
+            print(f"  {size} {route}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""Latency, throughput and memory of the API routes against either storage backend.
+
+    python -m benchmarks.routes --sizes 1000 100000 1000000
+    python -m benchmarks.routes --storage sqlite --sizes 1000 100000
+    python -m benchmarks.routes --accept-encoding identity gzip br
+
+For each size a user is seeded with that many synthetic transactions in a
+scratch database, and every route is called in-process through httpx's ASGI
+transport (no network hop, no uvicorn). Each route reports p50/p95/p99 latency
+and requests per second at the given concurrency, plus the peak Python heap
+allocated while serving its calls (tracemalloc) and the process's resident set
+size afterwards, and the mean bytes per response on the wire. Analytics routes
+are measured cold (their cache invalidated before every call) and cached; the
+"revalidated" cases send If-Modified-Since/If-None-Match from an earlier
+response, as a browser holding it would. Each --accept-encoding runs every
+route once more with that Accept-Encoding, named "<route> [<encoding>]"
+(plain names are identity), so compression savings show side by side. With --storage mongo the scratch database lives
+on a local mongod; with --storage sqlite it is a file that is deleted afterwards.
+Results are written to benchmarks/results/<commit>.json (with a -sqlite suffix
+for the embedded backend); compare two runs with benchmarks.compare.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import math
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from benchmarks.synthetic import CSV_FIELDS, generate_transactions
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+SEED_BATCH_ROWS = 10_000
+
+def percentile(samples: list, pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples"""
+    if not samples:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': 'unknown', 'dirty': False}
+    return {'commit': commit, 'dirty': dirty}
+
+def max_rss_mb() -> float:
+    """Peak resident set size of this process so far; ru_maxrss is KiB on Linux and bytes on macOS"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if platform.system() == 'Darwin' else rss / 2**10
+
+def csv_body(count: int, seed: int) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(generate_transactions(count, seed=seed))
+    return buffer.getvalue().encode('utf-8')
+
+async def seed_user(server, http, size: int) -> tuple:
+    """Sign up a user and give them `size` transactions plus their rollups"""
+    response = await http.post('/api/auth/signup', json={
+        'email': f'bench-{size}@example.com',
+        'name': f'Benchmark {size}',
+        'password': 'benchmark'
+    })
+    response.raise_for_status()
+    body = response.json()
+    user_id = body['user']['id']
+
+    batch = []
+    for txn in generate_transactions(size):
+        batch.append(server.transaction_doc(server.Transaction(user_id=user_id, **txn)))
+        if len(batch) >= SEED_BATCH_ROWS:
+            await server.storage.insert_transactions(batch)
+            batch = []
+    if batch:
+        await server.storage.insert_transactions(batch)
+    # Seeding goes around the routes, so record the write they would have for Last-Modified
+    await server.bump_data_version(user_id)
+    return user_id, {'Authorization': f"Bearer {body['token']}"}
+
+def route_cases(today: date, import_rows: int) -> list:
+    """(name, method, path, request kwargs, invalidate cache before each call)
+
+    A 'revalidate' kwarg sends the validators of a first response with every call.
+    """
+    month, year = today.month, today.year
+    analytics = [
+        ('analytics/monthly', '/api/analytics/monthly', {'month': month, 'year': year}),
+        ('analytics/yearly', '/api/analytics/yearly', {'year': year}),
+        ('analytics/series', '/api/analytics/series', {'from': f'{year - 4}-01', 'to': f'{year}-12', 'granularity': 'month'}),
+        ('analytics/category-breakdown', '/api/analytics/category-breakdown', {'month': month, 'year': year, 'type': 'expense'}),
+        ('analytics/trend', '/api/analytics/trend', {'months': 12}),
+        ('analytics/fiscal-year', '/api/analytics/fiscal-year', {'start_year': year - 1}),
+        ('analytics/burn-rate', '/api/analytics/burn-rate', {}),
+        ('analytics/dashboard', '/api/analytics/dashboard', {'month': month, 'year': year}),
+    ]
+    cases = [
+        ('auth/me', 'GET', '/api/auth/me', {}, False),
+        ('categories', 'GET', '/api/categories', {}, False),
+        ('settings', 'GET', '/api/settings', {}, False),
+        ('budgets', 'GET', '/api/budgets', {'params': {'month': month, 'year': year}}, False),
+        ('transactions/page', 'GET', '/api/transactions', {'params': {'limit': 200, 'sort': '-date'}}, False),
+        ('transactions/month', 'GET', '/api/transactions', {'params': {
+            'start_date': f'{year}-{month:02d}-01', 'end_date': f'{year}-{month:02d}-31', 'limit': 200
+        }}, False),
+        ('transactions/create', 'POST', '/api/transactions', {'json': {
+            'date': today.isoformat(), 'amount': 100, 'description': 'Benchmark', 'category': 'Groceries', 'type': 'expense'
+        }}, False),
+    ]
+    for name, path, params in analytics:
+        cases.append((name, 'GET', path, {'params': params}, True))
+        cases.append((f'{name} (cached)', 'GET', path, {'params': params}, False))
+    cases.append(('analytics/series (revalidated)', 'GET', '/api/analytics/series', {'params': analytics[2][2], 'revalidate': True}, False))
+    cases.append(('categories (revalidated)', 'GET', '/api/categories', {'revalidate': True}, False))
+    cases.append(('transactions/all', 'GET', '/api/transactions', {}, False))
+    cases.append(('transactions/all (revalidated)', 'GET', '/api/transactions', {'revalidate': True}, False))
+    cases.append(('export/csv', 'GET', '/api/export/csv', {}, False))
+    cases.append(('export/csv (revalidated)', 'GET', '/api/export/csv', {'revalidate': True}, False))
+    cases.append((f'import/csv {import_rows} rows', 'POST', '/api/import/csv', {'import_rows': import_rows}, False))
+    return cases
+
+async def validators(http, method: str, path: str, headers: dict, kwargs: dict) -> dict:
+    """Conditional request headers from a first response, once it carries a Last-Modified or ETag"""
+    # Last-Modified is withheld until the second of the user's latest write has passed
+    for _ in range(30):
+        response = await http.request(method, path, headers=headers, **kwargs)
+        conditional = {}
+        if 'last-modified' in response.headers:
+            conditional['If-Modified-Since'] = response.headers['last-modified']
+        if 'etag' in response.headers:
+            conditional['If-None-Match'] = response.headers['etag']
+        if conditional:
+            return conditional
+        await asyncio.sleep(0.1)
+    return {}
+
+async def measure(server, http, user_id: str, headers: dict, case: tuple, requests: int, concurrency: int) -> dict:
+    name, method, path, kwargs, cold = case
+    latencies, errors, wire_bytes = [], 0, 0
+    pending = iter(range(requests))
+    if kwargs.get('revalidate'):
+        kwargs = {key: value for key, value in kwargs.items() if key != 'revalidate'}
+        headers = {**headers, **await validators(http, method, path, headers, kwargs)}
+
+    async def call(index: int):
+        nonlocal wire_bytes
+        request = dict(kwargs)
+        if 'import_rows' in request:
+            # A fresh seed per call so the content-hash dedupe doesn't skip the rows
+            rows = request.pop('import_rows')
+            request['files'] = {'file': ('bench.csv', csv_body(rows, seed=1000 + index), 'text/csv')}
+        if cold:
+            await server.bump_data_version(user_id)
+        started = time.perf_counter()
+        response = await http.request(method, path, headers=headers, **request)
+        await response.aread()
+        latencies.append((time.perf_counter() - started) * 1000)
+        wire_bytes += response.num_bytes_downloaded
+        return response.status_code
+
+    async def worker():
+        nonlocal errors
+        for index in pending:
+            if await call(index) >= 400:
+                errors += 1
+
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    latencies.sort()
+    return {
+        'route': name,
+        'requests': requests,
+        'concurrency': concurrency,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(sum(latencies) / len(latencies), 3),
+        'throughput_rps': round(requests / elapsed, 2),
+        'wire_kb': round(wire_bytes / requests / 1024, 3),
+        'peak_heap_mb': round((peak - baseline) / 2**20, 3),
+        'max_rss_mb': round(max_rss_mb(), 1)
+    }
+
+async def run(args) -> dict:
+    # server reads its configuration at import time
+    os.environ['STORAGE_BACKEND'] = args.storage
+    os.environ['MONGO_URL'] = args.mongo_url
+    os.environ['DB_NAME'] = args.db_name
+    sqlite_path = Path(args.sqlite_path or Path(tempfile.mkdtemp(prefix='budget-bench-')) / 'benchmark.db')
+    os.environ['SQLITE_PATH'] = str(sqlite_path)
+    if args.engine:
+        os.environ['ANALYTICS_ENGINE'] = args.engine
+    import httpx
+    import server
+    # Per-request log lines would dominate the output and the timings
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('server').setLevel(logging.WARNING)
+
+    async def reset():
+        if args.storage == 'mongo':
+            await server.storage.client.drop_database(args.db_name)
+        else:
+            await server.storage.close()
+            # server may have been imported, and its storage opened, before SQLITE_PATH was set here
+            path = server.storage.path
+            for path in (Path(path), Path(f'{path}-wal'), Path(f'{path}-shm')):
+                path.unlink(missing_ok=True)
+
+    await reset()
+    await server.storage.ensure_indexes()
+    tracemalloc.start()
+    transport = httpx.ASGITransport(app=server.app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=None) as http:
+        for size in args.sizes:
+            started = time.perf_counter()
+            user_id, headers = await seed_user(server, http, size)
+            print(f'seeded {size} transactions in {time.perf_counter() - started:.1f}s')
+            for encoding in args.accept_encoding:
+                for case in route_cases(date.today(), args.import_rows):
+                    heavy = case[0].startswith(('export', 'import', 'transactions/all'))
+                    requests = args.heavy_requests if heavy else args.requests
+                    encoded_headers = {**headers, 'Accept-Encoding': encoding}
+                    result = await measure(server, http, user_id, encoded_headers, case, requests, 1 if heavy else args.concurrency)
+                    if encoding != 'identity':
+                        result['route'] += f' [{encoding}]'
+                    result['size'] = size
+                    results.append(result)
+                    print(
+                        f"{size:>9} {result['route']:48} p50 {result['p50_ms']:>9.2f} p95 {result['p95_ms']:>9.2f} "
+                        f"p99 {result['p99_ms']:>9.2f} ms {result['throughput_rps']:>9.1f} req/s "
+                        f"heap {result['peak_heap_mb']:>8.2f} MB {result['wire_kb']:>10.1f} KB"
+                        + (f" {result['errors']} errors" if result['errors'] else '')
+                    )
+    tracemalloc.stop()
+    await reset()
+    await server.storage.close()
+
+    return {
+        **git_revision(),
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'engine': server.ANALYTICS_ENGINE,
+        'storage': server.storage.name,
+        'settings': {
+            'sizes': args.sizes,
+            'requests': args.requests,
+            'heavy_requests': args.heavy_requests,
+            'concurrency': args.concurrency,
+            'import_rows': args.import_rows,
+            'accept_encoding': args.accept_encoding
+        },
+        'results': results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--requests', type=int, default=200, help='calls per route')
+    parser.add_argument('--heavy-requests', type=int, default=5, help='calls per import/export route')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--import-rows', type=int, default=10_000)
+    parser.add_argument('--engine', choices=['mongo', 'columnar'], default=None, help='override ANALYTICS_ENGINE')
+    parser.add_argument(
+        '--accept-encoding', nargs='+', default=['identity'], choices=['identity', 'gzip', 'br'],
+        help='run every route once per Accept-Encoding'
+    )
+    parser.add_argument('--storage', choices=['mongo', 'sqlite'], default='mongo', help='STORAGE_BACKEND to benchmark')
+    parser.add_argument('--sqlite-path', default=None, help='scratch database file, defaults to a temporary directory')
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017')
+    parser.add_argument('--db-name', default='budget_planner_benchmark', help='scratch database, dropped before and after')
+    parser.add_argument('--output', default=None, help='defaults to benchmarks/results/<commit>.json')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['commit']}{'-dirty' if report['dirty'] else ''}{'-sqlite' if args.storage == 'sqlite' else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'wrote {output}')
+
+if __name__ == '__main__':
+    main()
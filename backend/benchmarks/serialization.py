@@ -0,0 +1,98 @@
+"""CPU time to turn stored documents into a list response, before and after the fast path.
+
+    python -m benchmarks.serialization --rows 10000
+
+For transactions, categories and recurring rules, the validated path is what
+the list routes used to do: parse created_at in a loop, validate every row
+through the route's response_model and render it with JSONResponse. The fast
+path is ListSerializer.response, which skips that validation and encodes with
+orjson when it is installed. Both run on the same documents, in process, and
+report median CPU milliseconds per --rows rows; the bodies are checked to
+decode to the same JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+from typing import List
+
+from benchmarks.synthetic import generate_transactions
+
+def cpu_ms(fn, make_input, repeat: int) -> float:
+    """Median CPU time of fn(make_input()) in milliseconds, excluding make_input"""
+    samples = []
+    for _ in range(repeat):
+        value = make_input()
+        started = time.process_time()
+        fn(value)
+        samples.append((time.process_time() - started) * 1000)
+    return statistics.median(samples)
+
+def documents(server, rows: int) -> dict:
+    """Stored-shape documents for each list route, as storage hands them back"""
+    transactions = [server.transaction_doc(server.Transaction(user_id='bench', **txn)) for txn in generate_transactions(rows)]
+    categories, recurring = [], []
+    for index, txn in enumerate(transactions):
+        category = server.Category(user_id='bench', name=f"{txn['category']} {index}", type=txn['type']).model_dump()
+        category['created_at'] = category['created_at'].isoformat()
+        categories.append(category)
+        rule = server.RecurringTransaction(
+            user_id='bench', amount=txn['amount'], description=txn['description'], category=txn['category'],
+            type=txn['type'], day_of_month=index % 28 + 1, start_date=txn['date']
+        ).model_dump()
+        rule['created_at'] = rule['created_at'].isoformat()
+        recurring.append(rule)
+    return {'transactions': transactions, 'categories': categories, 'recurring-transactions': recurring}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args()
+
+    # server reads its configuration at import time; nothing here touches the database
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'budget_planner_benchmark')
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    import server
+
+    loop = asyncio.new_event_loop()
+    routes = {
+        'transactions': (server.Transaction, server.transaction_list),
+        'categories': (server.Category, server.category_list),
+        'recurring-transactions': (server.RecurringTransaction, server.recurring_list),
+    }
+    docs = documents(server, args.rows)
+    print(f"encoder: {'orjson' if server.orjson else 'json'}")
+    print(f"{'route':24} {'validated ms':>13} {'fast ms':>9} {'saved ms':>9} {'speedup':>8} {'body KB':>8}")
+    for name, (model, serializer) in routes.items():
+        field = create_response_field(name=f'Response_{name}', type_=List[model])
+
+        def validated(rows):
+            for row in rows:
+                if isinstance(row['created_at'], str):
+                    row['created_at'] = datetime.fromisoformat(row['created_at'])
+            content = loop.run_until_complete(serialize_response(field=field, response_content=rows))
+            return JSONResponse(content).body
+
+        def fresh():
+            return [dict(doc) for doc in docs[name]]
+
+        slow_body, fast_body = validated(fresh()), serializer.response(fresh()).body
+        if json.loads(slow_body) != json.loads(fast_body):
+            raise SystemExit(f'{name}: fast path body differs from the validated one')
+        validated_ms = cpu_ms(validated, fresh, args.repeat)
+        fast_ms = cpu_ms(lambda rows: serializer.response(rows).body, fresh, args.repeat)
+        print(
+            f"{name:24} {validated_ms:>13.1f} {fast_ms:>9.1f} {validated_ms - fast_ms:>9.1f} "
+            f"{validated_ms / fast_ms:>7.1f}x {len(fast_body) / 1024:>8.0f}"
+        )
+    loop.close()
+
+if __name__ == '__main__':
+    main()
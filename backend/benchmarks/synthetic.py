@@ -0,0 +1,65 @@
+"""Synthetic transactions following the sample_transactions.csv schema"""
+import csv
+import random
+from datetime import date, timedelta
+from typing import Iterator
+
+CSV_FIELDS = ['date', 'type', 'category', 'description', 'amount']
+
+EXPENSES = [
+    ('Groceries', 'Weekly grocery shopping', 500, 6000),
+    ('Fuel', 'Petrol for car', 500, 3000),
+    ('Restaurants', 'Dinner with family', 300, 3000),
+    ('Rent/mortgage', 'Monthly rent', 15000, 25000),
+    ('Electricity', 'Electricity bill', 800, 3500),
+    ('Internet', 'Broadband bill', 500, 1500),
+    ('Phone', 'Mobile recharge', 200, 1000),
+    ('Clothes', 'Shopping', 500, 5000),
+    ('Entertainment', 'Movie tickets', 200, 1500),
+    ('Pharmacy', 'Medicines', 100, 2000),
+    ('Public transit', 'Metro card top-up', 100, 1000),
+    ('Online services', 'Streaming subscription', 150, 800),
+]
+
+INCOMES = [
+    ('Paycheck', 'Monthly salary', 40000, 90000),
+    ('Bonus', 'Performance bonus', 5000, 30000),
+    ('Dividends', 'Stock dividends', 100, 5000),
+    ('Interest income', 'Savings interest', 50, 2000),
+]
+
+def generate_transactions(count: int, years: int = 5, seed: int = 42, end: date = None) -> Iterator[dict]:
+    """Yield `count` transactions spread evenly over the last `years` years"""
+    rng = random.Random(seed)
+    end = end or date.today()
+    span_days = 365 * years
+    start = end - timedelta(days=span_days - 1)
+    for _ in range(count):
+        if rng.random() < 0.1:
+            txn_type, (category, description, low, high) = 'income', rng.choice(INCOMES)
+        else:
+            txn_type, (category, description, low, high) = 'expense', rng.choice(EXPENSES)
+        yield {
+            'date': (start + timedelta(days=rng.randrange(span_days))).isoformat(),
+            'type': txn_type,
+            'category': category,
+            'description': description,
+            'amount': round(rng.uniform(low, high), 2)
+        }
+
+def write_csv(path: str, count: int, **kwargs) -> None:
+    with open(path, 'w', newline='') as handle:
+        writer = csv.DictWriter(handle, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(generate_transactions(count, **kwargs))
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Write a CSV of synthetic transactions importable through /import/csv')
+    parser.add_argument('path')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    write_csv(args.path, args.rows, years=args.years, seed=args.seed)
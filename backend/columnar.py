@@ -0,0 +1,128 @@
+"""Columnar, in-memory analytics over a user's transactions.
+
+The ledger keeps one NumPy array per field (day number, month index, amount and
+small-int codes for type and category) and answers the same rollup-shaped
+questions as the monthly_totals collection with vectorized group-bys.
+"""
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+TYPE_CODES = {'expense': 0, 'income': 1}
+TYPE_NAMES = ['expense', 'income']
+
+def period_to_index(period: str) -> int:
+    """Months since 1970-01 for a 'YYYY-MM' period"""
+    year, month = period.split('-')
+    return (int(year) - 1970) * 12 + int(month) - 1
+
+def index_to_period(index: int) -> str:
+    year, month = divmod(int(index), 12)
+    return f"{year + 1970}-{month + 1:02d}"
+
+# Above this many possible keys, sort-based grouping beats a dense bincount
+DENSE_GROUP_LIMIT = 1 << 22
+
+def group_sum(keys: np.ndarray, weights: np.ndarray):
+    """Sum and count `weights` per distinct non-negative integer key"""
+    if int(keys.max()) < DENSE_GROUP_LIMIT:
+        counts = np.bincount(keys)
+        totals = np.bincount(keys, weights=weights)
+        present = np.flatnonzero(counts)
+        return present, totals[present], counts[present]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, weights=weights), np.bincount(inverse)
+
+class ColumnarLedger:
+    """A user's transactions as parallel arrays"""
+    def __init__(self, days: np.ndarray, amounts: np.ndarray, types: np.ndarray, categories: np.ndarray, category_names: List[str]):
+        self.days = days
+        self.months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+        self.amounts = amounts
+        self.types = types
+        self.categories = categories
+        self.category_names = category_names
+
+    @classmethod
+    def from_documents(cls, docs: Iterable[dict]) -> 'ColumnarLedger':
+        frame = pd.DataFrame.from_records(list(docs), columns=['date', 'amount', 'type', 'category'])
+        # Unparseable dates are dropped, matching the rollups which skip them
+        dates = pd.to_datetime(frame['date'], format='%Y-%m-%d', errors='coerce')
+        types = frame['type'].map(TYPE_CODES)
+        valid = dates.notna().to_numpy() & types.notna().to_numpy()
+
+        codes, names = pd.factorize(frame['category'].fillna('')[valid])
+        return cls(
+            days=dates[valid].to_numpy().astype('datetime64[D]').astype(np.int32),
+            amounts=frame['amount'][valid].to_numpy(dtype=np.float64),
+            types=types[valid].to_numpy(dtype=np.int8),
+            categories=codes.astype(np.int16 if len(names) < 2 ** 15 else np.int32),
+            category_names=list(names)
+        )
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.days, self.months, self.amounts, self.types, self.categories)
+        return sum(array.nbytes for array in arrays) + sum(len(name) for name in self.category_names)
+
+    def period_totals(self, periods: Optional[Iterable[str]] = None, start: Optional[str] = None, end: Optional[str] = None, type: Optional[str] = None) -> List[dict]:
+        """Rows shaped like monthly_totals documents, restricted to a period set or an inclusive range"""
+        mask = np.ones(len(self), dtype=bool)
+        if periods is not None:
+            wanted = np.fromiter((period_to_index(period) for period in periods), dtype=np.int32)
+            mask &= np.isin(self.months, wanted)
+        if start is not None:
+            mask &= self.months >= period_to_index(start)
+        if end is not None:
+            mask &= self.months <= period_to_index(end)
+        if type is not None:
+            mask &= self.types == TYPE_CODES[type]
+        if not mask.any():
+            return []
+
+        months = self.months[mask].astype(np.int64)
+        first_month = int(months.min())
+        n_categories = max(len(self.category_names), 1)
+
+        # Pack (month, type, category) into one dense integer key and group on it
+        keys = ((months - first_month) * 2 + self.types[mask]) * n_categories + self.categories[mask]
+        unique_keys, totals, counts = group_sum(keys, self.amounts[mask])
+
+        rest, category_codes = np.divmod(unique_keys, n_categories)
+        month_indexes, type_codes = np.divmod(rest, 2)
+        month_indexes += first_month
+        return [
+            {
+                'period': index_to_period(month_index),
+                'type': TYPE_NAMES[type_code],
+                'category': self.category_names[category_code],
+                'total': float(total),
+                'count': int(count)
+            }
+            for month_index, type_code, category_code, total, count
+            in zip(month_indexes, type_codes, category_codes, totals, counts)
+        ]
+
+    def series_totals(self, start: str, end: str) -> List[dict]:
+        """Per-period, per-type totals over an inclusive range, without the category split"""
+        mask = (self.months >= period_to_index(start)) & (self.months <= period_to_index(end))
+        if not mask.any():
+            return []
+        months = self.months[mask].astype(np.int64)
+        first_month = int(months.min())
+        keys = (months - first_month) * 2 + self.types[mask]
+        unique_keys, totals, _ = group_sum(keys, self.amounts[mask])
+        month_indexes, type_codes = np.divmod(unique_keys, 2)
+        month_indexes += first_month
+        return [
+            {'period': index_to_period(month_index), 'type': TYPE_NAMES[type_code], 'total': float(total)}
+            for month_index, type_code, total in zip(month_indexes, type_codes, totals)
+        ]
+
+    def balance_totals(self) -> dict:
+        totals = np.bincount(self.types.astype(np.int64), weights=self.amounts, minlength=2)
+        return {name: float(totals[code]) for name, code in TYPE_CODES.items()}
@@ -0,0 +1,135 @@
+"""Negotiated gzip/brotli compression of HTTP responses.
+
+CompressionMiddleware picks the best encoding the client's Accept-Encoding
+allows (brotli only when the brotli package is installed). It holds back the
+response start until the first body chunk arrives. A complete body smaller
+than the threshold, or an incompressible type, goes out untouched. A streamed
+body is compressed chunk by chunk and flushed after each one, so the client
+still receives rows as they are produced.
+"""
+import asyncio
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+# brotli is optional: without it clients are offered gzip only
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+
+# Chunks at least this large are compressed on a worker thread (zlib and brotli release the GIL)
+# rather than holding up the event loop
+THREAD_MIN_BYTES = 256 * 1024
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """'br' or 'gzip', whichever the client weights highest (brotli on a tie), or None"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip().lower()] = weight
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    best, best_weight = None, 0.0
+    for encoding in offered:
+        weight = weights.get(encoding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+def compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304) or 'content-encoding' in headers:
+        return False
+    content_type = headers.get('content-type', '')
+    return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.split(';')[0].endswith('+json')
+
+class Encoder:
+    """One response body's compressor; each call returns what can be sent so far"""
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == 'br':
+            self.compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self.compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, finish: bool) -> bytes:
+        if self.encoding == 'br':
+            return self.compressor.process(data) + (self.compressor.finish() if finish else self.compressor.flush())
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+    async def compress_async(self, data: bytes, finish: bool) -> bytes:
+        if len(data) >= THREAD_MIN_BYTES:
+            return await asyncio.to_thread(self.compress, data, finish)
+        return self.compress(data, finish)
+
+class CompressionMiddleware:
+    """Compresses compressible responses of at least `minimum_size` bytes, and every streamed one"""
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 4, brotli_quality: int = 1):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get('accept-encoding', ''))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+            body = message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if encoder is None:
+                headers = MutableHeaders(raw=list(start['headers']))
+                if not compressible(start['status'], headers):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers.add_vary_header('Accept-Encoding')
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send({**start, 'headers': headers.raw})
+                    await send(message)
+                    return
+                encoder = Encoder(encoding, self.gzip_level, self.brotli_quality)
+                body = await encoder.compress_async(body, finish=not more_body)
+                headers['Content-Encoding'] = encoding
+                # The compressed bytes are a different representation, so a strong validator would lie
+                if headers.get('etag', '').startswith('"'):
+                    headers['ETag'] = 'W/' + headers['etag']
+                if more_body:
+                    del headers['Content-Length']
+                else:
+                    headers['Content-Length'] = str(len(body))
+                await send({**start, 'headers': headers.raw})
+            else:
+                body = await encoder.compress_async(body, finish=not more_body)
+            await send({'type': 'http.response.body', 'body': body, 'more_body': more_body})
+
+        await self.app(scope, receive, send_compressed)
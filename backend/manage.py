@@ -0,0 +1,90 @@
+import asyncio
+from typing import Optional
+
+import typer
+
+from server import migrate_predefined_categories, storage
+
+cli = typer.Typer(help='Maintenance commands for the budget planner database (STORAGE_BACKEND picks which)')
+
+@cli.callback()
+def main():
+    pass
+
+@cli.command('migrate-dates')
+def migrate_dates(batch_size: int = 1000):
+    """Backfill date_at/period on existing transactions and ensure their indexes"""
+    async def run():
+        await storage.ensure_indexes()
+        return await storage.migrate_transaction_dates(batch_size=batch_size)
+
+    migrated = asyncio.run(run())
+    typer.echo(f'Migrated {migrated} transactions')
+    asyncio.run(storage.close())
+
+@cli.command('migrate-categories')
+def migrate_categories(
+    force: bool = typer.Option(False, '--force', help='Scan again even if a previous run completed')
+):
+    """Collapse per-user copies of the predefined categories onto the shared catalog"""
+    async def run():
+        await storage.ensure_indexes()
+        return await migrate_predefined_categories(force)
+
+    migrated = asyncio.run(run())
+    typer.echo(f'Migrated {migrated} users')
+    asyncio.run(storage.close())
+
+@cli.command('rebuild-rollups')
+def rebuild_rollups(
+    user_id: Optional[str] = typer.Option(None, help='Only check this user'),
+    verify_only: bool = typer.Option(False, '--verify-only', help='Report drift without rewriting rollups')
+):
+    """Recompute monthly_totals from raw transactions and report drift"""
+    async def run():
+        await storage.ensure_indexes()
+        return await storage.rebuild_monthly_totals(user_id=user_id, repair=not verify_only)
+
+    drift = asyncio.run(run())
+    for row in drift:
+        typer.echo(
+            f"{row['user_id']} {row['period']} {row['type']} {row['category']}: "
+            f"stored {row['stored_total']} ({row['stored_count']}) "
+            f"expected {row['expected_total']} ({row['expected_count']})"
+        )
+    action = 'found' if verify_only else 'repaired'
+    typer.echo(f'{len(drift)} drifted rollups {action}')
+    asyncio.run(storage.close())
+    if drift and verify_only:
+        raise typer.Exit(code=1)
+
+@cli.command('ensure-indexes')
+def ensure_indexes_command():
+    """Create the declared indexes and report any that could not be built"""
+    failed = asyncio.run(storage.ensure_indexes())
+    for collection, name, error in failed:
+        typer.echo(f'{collection}.{name}: {error}')
+    typer.echo(f'{len(failed)} indexes failed to build')
+    asyncio.run(storage.close())
+    if failed:
+        raise typer.Exit(code=1)
+
+@cli.command('explain')
+def explain():
+    """Explain each route's query shape and fail if any of them scans a whole collection"""
+    async def run():
+        await storage.ensure_indexes()
+        return await storage.explain_query_shapes()
+
+    results = asyncio.run(run())
+    for result in results:
+        flag = 'COLLSCAN' if result['collscan'] else 'ok'
+        typer.echo(f"{flag:8} {result['collection']:24} {result['name']}: {' <- '.join(result['stages'])}")
+    scans = [result for result in results if result['collscan']]
+    typer.echo(f'{len(scans)} of {len(results)} query shapes scan a collection')
+    asyncio.run(storage.close())
+    if scans:
+        raise typer.Exit(code=1)
+
+if __name__ == '__main__':
+    cli()
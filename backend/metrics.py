@@ -0,0 +1,214 @@
+"""Request and MongoDB command metrics in the Prometheus text exposition format.
+
+MetricsMiddleware times every HTTP request under its route template and
+CommandMetrics, a pymongo command listener, times every command the driver
+sends and counts it against the request that issued it, so a route that
+fans out into one query per item shows up as a high round-trip count. The
+password hashing pool reports its queue depth, rejections and wait times here
+too. The series live in process; with several workers each one exposes its own.
+"""
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional, Sequence
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+COMMAND_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+class RequestTrace:
+    """The HTTP request being handled and the MongoDB commands it has sent so far"""
+    def __init__(self, scope):
+        self.scope = scope
+        self.commands = []
+
+# Motor runs commands on executor threads with a copy of the caller's context, so listeners
+# append to the trace rather than setting the variable
+current_request: ContextVar[Optional[RequestTrace]] = ContextVar('current_request', default=None)
+
+# Endpoint function -> route template, filled from the app's routes on first use
+route_paths = {}
+
+def route_template(scope) -> str:
+    """The matched route's template rather than the raw path, so ids in URLs don't become series"""
+    # The router records the matched endpoint in the scope
+    if not route_paths:
+        for route in scope['app'].routes:
+            route_paths.setdefault(getattr(route, 'endpoint', None), getattr(route, 'path', ''))
+    return route_paths.get(scope.get('endpoint'), 'unmatched')
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def format_labels(names: Sequence[str], values: Sequence, extra: Sequence = ()) -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in itertools.chain(zip(names, values), extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metric:
+    """A named family of series keyed by their label values"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.series = {}
+        # Listener callbacks arrive on driver threads
+        self.lock = threading.Lock()
+
+    def samples(self):
+        """(name suffix, label values, extra labels, value) for every sample"""
+        for values, value in self.series.items():
+            yield '', values, (), value
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            samples = list(self.samples())
+        for suffix, values, extra, value in samples:
+            lines.append(f'{self.name}{suffix}{format_labels(self.labels, values, extra)} {format_value(value)}')
+        return lines
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels):
+        with self.lock:
+            self.series[labels] = value
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            state = self.series.get(labels)
+            if state is None:
+                state = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        for values, (counts, total, count) in self.series.items():
+            for bound, cumulative in zip(self.buckets, itertools.accumulate(counts)):
+                yield '_bucket', values, (('le', format_value(bound)),), cumulative
+            yield '_bucket', values, (('le', '+Inf'),), count
+            yield '_sum', values, (), total
+            yield '_count', values, (), count
+
+class Metrics:
+    """Every series the API exports"""
+    def __init__(self):
+        route = ('method', 'route')
+        self.requests = Counter('http_requests_total', 'HTTP requests handled', route + ('status',))
+        self.latency = Histogram('http_request_duration_seconds', 'Time to handle an HTTP request, including streaming the body', route, LATENCY_BUCKETS)
+        self.response_size = Histogram('http_response_size_bytes', 'Bytes in the HTTP response body', route, SIZE_BUCKETS)
+        self.in_flight = Gauge('http_requests_in_flight', 'HTTP requests being handled', ('method',))
+        self.round_trips = Histogram('http_request_mongo_round_trips', 'MongoDB commands sent while handling an HTTP request', route, ROUND_TRIP_BUCKETS)
+        self.commands = Histogram('mongo_command_duration_seconds', 'MongoDB command round-trip time', ('collection', 'command', 'outcome'), COMMAND_BUCKETS)
+        self.password_hashes_in_flight = Gauge('password_hashes_in_flight', 'bcrypt hashes running or waiting for a thread')
+        self.password_hashes_queued = Gauge('password_hashes_queued', 'bcrypt hashes waiting for a thread')
+        self.password_hashes_rejected = Counter('password_hashes_rejected_total', 'bcrypt hashes turned away with a 503 because the queue was full')
+        self.password_hash_wait = Histogram('password_hash_wait_seconds', 'Time a bcrypt hash waited for a thread', (), LATENCY_BUCKETS)
+        # Unlabelled series are exported from the start rather than after their first change
+        self.password_hashes_in_flight.set(0)
+        self.password_hashes_queued.set(0)
+        self.password_hashes_rejected.inc(amount=0)
+
+    def render(self) -> str:
+        families = (
+            self.requests, self.latency, self.response_size, self.in_flight, self.round_trips, self.commands,
+            self.password_hashes_in_flight, self.password_hashes_queued, self.password_hashes_rejected, self.password_hash_wait
+        )
+        return '\n'.join(line for family in families for line in family.render()) + '\n'
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times MongoDB commands per collection and counts them against the current request"""
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        # (connection, request id) -> collection, to label the matching succeeded/failed event
+        self.pending = {}
+
+    def started(self, event):
+        # The collection is the command's first value, except for getMore which names it separately
+        collection = event.command.get('collection') if event.command_name == 'getMore' else event.command.get(event.command_name)
+        self.pending[(event.connection_id, event.request_id)] = collection if isinstance(collection, str) else ''
+        trace = current_request.get()
+        if trace is not None:
+            trace.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        self.finish(event, 'ok')
+
+    def failed(self, event):
+        self.finish(event, 'error')
+
+    def finish(self, event, outcome: str):
+        collection = self.pending.pop((event.connection_id, event.request_id), '')
+        self.metrics.commands.observe(event.duration_micros / 1e6, collection, event.command_name, outcome)
+
+class MetricsMiddleware:
+    """Records latency, status, body size and MongoDB round trips per route template"""
+    def __init__(self, app, metrics: Metrics, count_round_trips: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.count_round_trips = count_round_trips
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status, size = 500, 0
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        trace = RequestTrace(scope)
+        token = current_request.set(trace)
+        self.metrics.in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.in_flight.dec(method)
+            current_request.reset(token)
+            route = route_template(scope)
+            self.metrics.requests.inc(method, route, status)
+            self.metrics.latency.observe(elapsed, method, route)
+            self.metrics.response_size.observe(size, method, route)
+            if self.count_round_trips:
+                self.metrics.round_trips.observe(len(trace.commands), method, route)
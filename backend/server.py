@@ -1,10 +1,11 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status, UploadFile, File
+from fastapi.encoders import jsonable_encoder
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
@@ -16,20 +17,96 @@ import jwt
 import csv
 import io
 import json
+import itertools
+import shutil
+import socket
+import tempfile
+import time
+import hashlib
+import base64
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from urllib.parse import urlencode
 from calendar import monthrange
+from email.utils import formatdate, parsedate_to_datetime
+
+# orjson is optional: without it list responses fall back to the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from columnar import ColumnarLedger
+from compression import CompressionMiddleware
+from metrics import CommandMetrics, Metrics, MetricsMiddleware
+from slowlog import SlowOperationListener
+from storage import DuplicateError, MongoStorage, SQLiteStorage, transaction_date_fields
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Prometheus metrics served on /metrics
+metrics = Metrics()
+
+# Slow query log: find/aggregate commands slower than SLOW_OPERATION_MS (0 disables) are logged and
+# kept for /api/admin/slow-operations, with their executionStats when SLOW_OPERATION_EXPLAIN is set
+SLOW_OPERATION_MS = int(os.environ.get('SLOW_OPERATION_MS', '500'))
+SLOW_OPERATION_EXPLAIN = os.environ.get('SLOW_OPERATION_EXPLAIN', 'false').lower() in ('1', 'true', 'yes')
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+slow_operations = SlowOperationListener(SLOW_OPERATION_MS)
+
+# Storage backend: 'mongo' (MONGO_URL, DB_NAME) or 'sqlite', an embedded database file at SQLITE_PATH
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+if STORAGE_BACKEND == 'sqlite':
+    storage = SQLiteStorage(os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'budget_planner.db')))
+elif STORAGE_BACKEND == 'mongo':
+    listeners = [CommandMetrics(metrics)] + ([slow_operations] if SLOW_OPERATION_MS > 0 else [])
+    storage = MongoStorage(os.environ['MONGO_URL'], os.environ['DB_NAME'], event_listeners=listeners)
+else:
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected 'mongo' or 'sqlite'")
+
+# Analytics cache configuration
+ANALYTICS_CACHE_TTL_SECONDS = int(os.environ.get('ANALYTICS_CACHE_TTL_SECONDS', '300'))
+ANALYTICS_CACHE_MAX_BYTES = int(os.environ.get('ANALYTICS_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Analytics engine: 'mongo' reads the monthly_totals rollups, 'columnar' aggregates
+# each user's transactions in memory with NumPy
+ANALYTICS_ENGINE = os.environ.get('ANALYTICS_ENGINE', 'mongo')
+if ANALYTICS_ENGINE not in ('mongo', 'columnar'):
+    raise RuntimeError(f"Unknown ANALYTICS_ENGINE {ANALYTICS_ENGINE!r}, expected 'mongo' or 'columnar'")
+LEDGER_CACHE_MAX_BYTES = int(os.environ.get('LEDGER_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Response compression: gzip, or brotli when installed, for bodies of at least COMPRESSION_MIN_BYTES
+# and for every streamed body
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '4'))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '1'))
+
+# Background CSV import jobs
+IMPORT_JOB_CONCURRENCY = int(os.environ.get('IMPORT_JOB_CONCURRENCY', '2'))
+IMPORT_JOB_MAX_ERRORS = 100
+# Every process refreshes updated_at on its unfinished jobs each heartbeat; a queued or running job
+# not refreshed for IMPORT_JOB_STALE_SECONDS belonged to a process that stopped and is failed
+IMPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get('IMPORT_JOB_HEARTBEAT_SECONDS', '30'))
+IMPORT_JOB_STALE_SECONDS = int(os.environ.get('IMPORT_JOB_STALE_SECONDS', '120'))
+
+# Recurring transaction materializer
+RECURRING_SCHEDULE_SECONDS = int(os.environ.get('RECURRING_SCHEDULE_SECONDS', '3600'))
+RECURRING_BATCH_RULES = 500
+
+# Password hashing
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', '64'))
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24 * 30
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', '10000'))
+TOKEN_REVOCATION_SYNC_SECONDS = int(os.environ.get('TOKEN_REVOCATION_SYNC_SECONDS', '30'))
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -96,6 +173,36 @@ class TransactionCreate(BaseModel):
     is_recurring: bool = False
     recurring_id: Optional[str] = None
 
+MAX_BULK_OPERATIONS = 1000
+
+class TransactionPatch(BaseModel):
+    id: str
+    date: Optional[str] = None
+    amount: Optional[float] = None
+    description: Optional[str] = None
+    category: Optional[str] = None
+    type: Optional[Literal['income', 'expense']] = None
+
+class BulkTransactionCreate(BaseModel):
+    transactions: List[TransactionCreate] = Field(min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+class BulkTransactionUpdate(BaseModel):
+    updates: List[TransactionPatch] = Field(min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+class BulkTransactionDelete(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=MAX_BULK_OPERATIONS)
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: str
+    status: Literal['created', 'updated', 'deleted', 'not_found', 'failed']
+    error: Optional[str] = None
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
 class RecurringTransaction(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -108,6 +215,8 @@ class RecurringTransaction(BaseModel):
     is_active: bool = True
     start_date: str
     end_date: Optional[str] = None
+    # Last 'YYYY-MM' whose occurrence has been materialized
+    generated_through: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class RecurringTransactionCreate(BaseModel):
@@ -115,7 +224,7 @@ class RecurringTransactionCreate(BaseModel):
     description: str
     category: str
     type: Literal['income', 'expense']
-    day_of_month: int
+    day_of_month: int = Field(ge=1, le=31)
     start_date: str
     end_date: Optional[str] = None
 
@@ -125,6 +234,23 @@ class TrendData(BaseModel):
     expense: float
     balance: float
 
+class ImportJob(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    filename: str
+    status: Literal['queued', 'running', 'completed', 'failed'] = 'queued'
+    rows_processed: int = 0
+    rows_failed: int = 0
+    imported: int = 0
+    skipped: int = 0
+    rows_per_second: float = 0
+    message: Optional[str] = None
+    errors: List[str] = []
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class CategoryBreakdown(BaseModel):
     category: str
     amount: float
@@ -146,6 +272,28 @@ class BudgetCreate(BaseModel):
     year: int
     planned_amount: float
 
+MAX_BUDGET_PLAN_MONTHS = 120
+
+class BudgetLine(BaseModel):
+    category: str
+    planned_amount: float
+
+class BudgetPlan(BaseModel):
+    month: int = Field(ge=1, le=12)
+    year: int
+    budgets: List[BudgetLine] = Field(min_length=1, max_length=1000)
+    # Apply the same plan to this many consecutive months, starting at month/year
+    months: int = Field(1, ge=1, le=MAX_BUDGET_PLAN_MONTHS)
+
+class BudgetCopy(BaseModel):
+    month: int = Field(ge=1, le=12)
+    year: int
+    start_month: int = Field(ge=1, le=12)
+    start_year: int
+    end_month: int = Field(ge=1, le=12)
+    end_year: int
+    overwrite: bool = True
+
 class MonthlyData(BaseModel):
     category: str
     actual: float
@@ -158,31 +306,543 @@ class YearlyMonthData(BaseModel):
     expense: float
     balance: float
 
+class SeriesPoint(BaseModel):
+    period: str
+    income: float
+    expense: float
+    balance: float
+
+class BurnRate(BaseModel):
+    monthly_burn_rate: float
+    current_balance: float
+    runway_months: float
+
+class DashboardData(BaseModel):
+    monthly: List[MonthlyData]
+    yearly: List[YearlyMonthData]
+    fiscal_year: List[YearlyMonthData]
+    trend: List[TrendData]
+    category_breakdown: List[CategoryBreakdown]
+    burn_rate: BurnRate
+
 # Helper functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def dump_json(content) -> bytes:
+    """Compact JSON, byte for byte what FastAPI's JSONResponse would send"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode('utf-8')
+
+def json_datetime(value):
+    """A stored datetime (or its isoformat string) as pydantic renders it, UTC as 'Z'"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    if isinstance(value, str) and value.endswith('+00:00'):
+        return value[:-6] + 'Z'
+    return value
+
+class ListSerializer:
+    """Renders documents read from storage as a list of `model` without validating each one.
+    
+    The documents were validated on the way in, so only what pydantic would change on the way
+    out is redone: fields outside the model are dropped, missing ones take their defaults,
+    floats are floats and datetimes are ISO strings.
+    """
+    def __init__(self, model):
+        fields = model.model_fields
+        self.fields = list(fields)
+        # (name, default) per field; a required field or one with a default factory is always stored
+        self.defaults = [
+            (name, None if field.is_required() or field.default_factory else field.default)
+            for name, field in fields.items()
+        ]
+        self.floats = [name for name, field in fields.items() if field.annotation is float]
+        self.datetimes = [name for name, field in fields.items() if field.annotation is datetime]
+    
+    def rows(self, docs: list) -> list:
+        rows = []
+        for doc in docs:
+            row = {name: doc.get(name, default) for name, default in self.defaults}
+            for name in self.floats:
+                value = row[name]
+                if value.__class__ is not float and value is not None:
+                    row[name] = float(value)
+            for name in self.datetimes:
+                row[name] = json_datetime(row[name])
+            rows.append(row)
+        return rows
+    
+    def response(self, docs: list, headers: Optional[dict] = None) -> Response:
+        # Returning a Response skips the route's response_model, which stays for the API schema
+        return Response(dump_json(self.rows(docs)), media_type='application/json', headers=headers)
+
+transaction_list = ListSerializer(Transaction)
+category_list = ListSerializer(Category)
+recurring_list = ListSerializer(RecurringTransaction)
+
+class PasswordPool:
+    """Runs bcrypt on a dedicated thread pool so hashing never blocks the event loop.
+    
+    At most `workers` hashes run at once. Up to `max_queue` more wait their turn and
+    anything beyond that is turned away with a 503 instead of piling up. Queue depth,
+    rejections and wait times are exported through `metrics`.
+    """
+    def __init__(self, workers: int, max_queue: int, metrics: Metrics):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.workers = workers
+        self.max_queue = max_queue
+        self.metrics = metrics
+        self.in_flight = 0
+    
+    @property
+    def queued(self) -> int:
+        return max(self.in_flight - self.workers, 0)
+    
+    def count(self, change: int):
+        self.in_flight += change
+        self.metrics.password_hashes_in_flight.set(self.in_flight)
+        self.metrics.password_hashes_queued.set(self.queued)
+    
+    async def run(self, fn, *args):
+        if self.queued >= self.max_queue:
+            self.metrics.password_hashes_rejected.inc()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Too many sign-ins in progress, please retry',
+                headers={'Retry-After': '1'}
+            )
+        submitted = time.perf_counter()
+        
+        def timed():
+            return time.perf_counter() - submitted, fn(*args)
+        
+        self.count(1)
+        try:
+            waited, result = await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.count(-1)
+        self.metrics.password_hash_wait.observe(waited)
+        return result
 
-def verify_password(password: str, hashed: str) -> bool:
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE, metrics)
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def verify_password_sync(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def hash_password(password: str) -> str:
+    return await password_pool.run(hash_password_sync, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await password_pool.run(verify_password_sync, password, hashed)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True when a stored hash ('$2b$<cost>$...') was made with a different work factor than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
 def create_token(user_id: str) -> str:
     payload = {
         'user_id': user_id,
+        'jti': uuid.uuid4().hex,
+        # Sub-second issue times keep a login right after a sign-out-everywhere valid
+        'iat': time.time(),
         'exp': datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+# Revocations are mirrored in-process so checking them costs no database round trip:
+# revoked token ids (with their expiry) and per-user "signed out everywhere" cut-offs.
+# Other processes pick up each other's revocations on the next sync.
+revoked_token_ids = {}
+tokens_valid_after = {}
+
+def token_id(payload: dict, digest: bytes) -> str:
+    # Tokens issued before they carried a jti are identified by their digest
+    return payload.get('jti') or digest.hex()
+
+def token_revoked(payload: dict, digest: bytes) -> bool:
+    if token_id(payload, digest) in revoked_token_ids:
+        return True
+    valid_after = tokens_valid_after.get(payload['user_id'])
+    return valid_after is not None and payload.get('iat', 0) <= valid_after
+
+async def get_token_payload(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """Verify a bearer token, reusing earlier verifications of the same token until it expires"""
+    token = credentials.credentials
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    payload = token_cache.get(digest)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={'require': ['exp']})
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token expired')
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
+        token_cache.set(digest, payload, ttl=payload['exp'] - time.time())
+    if token_revoked(payload, digest):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token revoked')
+    return {**payload, 'digest': digest}
+
+async def get_current_user(payload: dict = Depends(get_token_payload)) -> str:
+    return payload['user_id']
+
+async def get_admin_user(user_id: str = Depends(get_current_user)) -> str:
+    user = await storage.find_user(user_id)
+    if not user or user['email'].lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Admin access required')
+    return user_id
+
+async def load_revocations(since: Optional[datetime] = None):
+    """Pull revocations recorded since `since` (or all live ones) into the in-process mirror"""
+    now = datetime.now(timezone.utc)
+    for jti, expires_at in await storage.find_revoked_tokens(since):
+        revoked_token_ids[jti] = expires_at
+    
+    for user_id, cutoff in await storage.find_tokens_valid_after(since.timestamp() if since else None):
+        tokens_valid_after[user_id] = max(tokens_valid_after.get(user_id, 0), cutoff)
+    
+    # Expired tokens fail verification anyway, so their revocations can be forgotten
+    for jti, expires_at in list(revoked_token_ids.items()):
+        if expires_at <= now:
+            del revoked_token_ids[jti]
+
+def transaction_doc(transaction: 'Transaction') -> dict:
+    doc = transaction.model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    doc.update(transaction_date_fields(doc['date']))
+    return doc
+
+# Period helpers
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+MAX_SERIES_MONTHS = 600
+
+def shift_month(year: int, month: int, offset: int):
+    """Step a (year, month) pair by whole calendar months"""
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+def parse_period(value: str):
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Token expired')
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid token')
-
-# Initialize predefined categories
+        parsed = datetime.strptime(value, '%Y-%m')
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f'Invalid period {value!r}, expected YYYY-MM')
+    return parsed.year, parsed.month
+
+def period_bucket(year: int, month: int, granularity: str) -> str:
+    if granularity == 'quarter':
+        return f"{year}-Q{(month - 1) // 3 + 1}"
+    if granularity == 'year':
+        return str(year)
+    return f"{year}-{month:02d}"
+
+async def compute_series(user_id: str, start: tuple, end: tuple, granularity: str = 'month') -> List[SeriesPoint]:
+    """Income, expense and balance for every bucket between two (year, month) pairs, inclusive"""
+    start_period = f"{start[0]}-{start[1]:02d}"
+    end_period = f"{end[0]}-{end[1]:02d}"
+    if ANALYTICS_ENGINE == 'columnar':
+        ledger = await load_ledger(user_id)
+        return build_series(ledger.series_totals(start_period, end_period), start, end, granularity)
+    rows = await storage.series_totals(user_id, start_period, end_period)
+    return build_series(rows, start, end, granularity)
+
+async def fetch_period_totals(user_id: str, periods, type: Optional[str] = None) -> list:
+    """Rollup rows for a user in an explicit set of periods"""
+    if ANALYTICS_ENGINE == 'columnar':
+        ledger = await load_ledger(user_id)
+        return ledger.period_totals(periods=periods, type=type)
+    return await storage.period_totals(user_id, periods, type)
+
+async def fetch_balance_totals(user_id: str) -> dict:
+    """All-time income and expense totals for a user"""
+    if ANALYTICS_ENGINE == 'columnar':
+        ledger = await load_ledger(user_id)
+        return ledger.balance_totals()
+    return await storage.balance_totals(user_id)
+
+# (user id, data version) -> task reading that ledger, so concurrent loads share one read
+ledger_loads = {}
+
+async def read_ledger(key: tuple) -> ColumnarLedger:
+    try:
+        ledger = ColumnarLedger.from_documents(await storage.ledger_rows(key[0]))
+        ledger_cache.set(key, ledger, ledger.nbytes)
+        return ledger
+    finally:
+        del ledger_loads[key]
+
+async def load_ledger(user_id: str) -> ColumnarLedger:
+    """The user's transactions in columnar form, cached until their data version changes"""
+    key = (user_id, await data_version(user_id))
+    ledger = ledger_cache.get(key)
+    if ledger is not None:
+        return ledger
+    load = ledger_loads.get(key)
+    if load is None:
+        load = ledger_loads[key] = asyncio.create_task(read_ledger(key))
+    # Shielded so one caller being cancelled doesn't cancel the read for the others
+    return await asyncio.shield(load)
+
+# Report builders
+# Reports are derived from monthly_totals rows ({period, type, category, total}) so the
+# single-report routes and the dashboard bundle share the same arithmetic.
+def sum_rollups(rows, granularity: str = 'month') -> dict:
+    totals = {}
+    for row in rows:
+        year, month = (int(part) for part in row['period'].split('-'))
+        key = (period_bucket(year, month, granularity), row['type'])
+        totals[key] = totals.get(key, 0) + row['total']
+    return totals
+
+def build_series(rows, start: tuple, end: tuple, granularity: str = 'month') -> List[SeriesPoint]:
+    totals = sum_rollups(rows, granularity)
+    
+    buckets = []
+    year, month = start
+    while (year, month) <= end:
+        bucket = period_bucket(year, month, granularity)
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+        year, month = shift_month(year, month, 1)
+    
+    result = []
+    for bucket in buckets:
+        income = totals.get((bucket, 'income'), 0)
+        expense = totals.get((bucket, 'expense'), 0)
+        result.append(SeriesPoint(
+            period=bucket,
+            income=income,
+            expense=expense,
+            balance=income - expense
+        ))
+    return result
+
+def build_monthly(rows, categories, budgets, month: int, year: int) -> List[MonthlyData]:
+    period = f"{year}-{month:02d}"
+    actuals = {}
+    for row in rows:
+        if row['period'] == period and row['type'] == 'expense':
+            actuals[row['category']] = actuals.get(row['category'], 0) + row['total']
+    planned_by_category = {budget['category']: budget['planned_amount'] for budget in budgets}
+    
+    result = []
+    for category in categories:
+        cat_name = category['name']
+        actual = actuals.get(cat_name, 0)
+        planned = planned_by_category.get(cat_name, 0)
+        
+        result.append(MonthlyData(
+            category=cat_name,
+            actual=actual,
+            planned=planned,
+            difference=planned - actual
+        ))
+    return result
+
+def build_yearly(series: List[SeriesPoint]) -> List[YearlyMonthData]:
+    return [
+        YearlyMonthData(
+            month=MONTH_NAMES[int(point.period[-2:]) - 1],
+            income=point.income,
+            expense=point.expense,
+            balance=point.balance
+        )
+        for point in series
+    ]
+
+def build_trend(series: List[SeriesPoint]) -> List[TrendData]:
+    result = []
+    for point in series:
+        year_num, month_num = (int(part) for part in point.period.split('-'))
+        result.append(TrendData(
+            month=f"{MONTH_NAMES[month_num - 1]} {year_num}",
+            income=point.income,
+            expense=point.expense,
+            balance=point.balance
+        ))
+    return result
+
+def build_category_breakdown(rows, month: int, year: int, type: str) -> List[CategoryBreakdown]:
+    period = f"{year}-{month:02d}"
+    results = [row for row in rows if row['period'] == period and row['type'] == type]
+    results.sort(key=lambda item: item['total'], reverse=True)
+    total_amount = sum(item['total'] for item in results)
+    
+    breakdown = []
+    for item in results:
+        if total_amount > 0:
+            percentage = (item['total'] / total_amount) * 100
+        else:
+            percentage = 0
+        breakdown.append(CategoryBreakdown(
+            category=item['category'],
+            amount=item['total'],
+            percentage=percentage
+        ))
+    return breakdown
+
+def build_burn_rate(rows, totals_by_type: dict, periods) -> dict:
+    # Average expense over the recent months that had any expenses
+    recent = [row for row in rows if row['period'] in periods and row['type'] == 'expense']
+    total_expense = sum(row['total'] for row in recent)
+    months_counted = len({row['period'] for row in recent})
+    
+    avg_monthly_burn = total_expense / months_counted if months_counted > 0 else 0
+    
+    # Current balance is total income - total expense
+    current_balance = totals_by_type.get('income', 0) - totals_by_type.get('expense', 0)
+    
+    runway_months = (current_balance / avg_monthly_burn) if avg_monthly_burn > 0 else 0
+    
+    return {
+        'monthly_burn_rate': avg_monthly_burn,
+        'current_balance': current_balance,
+        'runway_months': runway_months
+    }
+
+def trend_range(months: int, today: datetime):
+    end = (today.year, today.month)
+    start = shift_month(today.year, today.month, -(min(months, MAX_SERIES_MONTHS) - 1))
+    return start, end
+
+def burn_rate_periods(today: datetime) -> set:
+    periods = set()
+    for i in range(3):
+        year_num, month_num = shift_month(today.year, today.month, -i)
+        periods.add(f"{year_num}-{month_num:02d}")
+    return periods
+
+def periods_between(start: tuple, end: tuple) -> set:
+    periods = set()
+    year, month = start
+    while (year, month) <= end:
+        periods.add(f"{year}-{month:02d}")
+        year, month = shift_month(year, month, 1)
+    return periods
+
+# Analytics cache
+class LRUCache:
+    """Least-recently-used cache bounded by the total size of its entries, with per-entry expiry"""
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.size = 0
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        value, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self.pop(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value, size: int = 1, ttl: Optional[float] = None):
+        if size > self.max_size:
+            return
+        self.pop(key)
+        self.entries[key] = (value, size, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+    
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+        return entry
+
+analytics_cache = LRUCache(ANALYTICS_CACHE_MAX_BYTES, ANALYTICS_CACHE_TTL_SECONDS)
+ledger_cache = LRUCache(LEDGER_CACHE_MAX_BYTES, ANALYTICS_CACHE_TTL_SECONDS)
+# Verified token payloads keyed by token digest; each entry expires with its token
+token_cache = LRUCache(TOKEN_CACHE_MAX_ENTRIES, JWT_EXPIRATION_HOURS * 3600)
+
+# Per-user data versions, bumped by every write to transactions, budgets or categories. They are
+# kept in storage, so a write handled by one worker invalidates every worker's cached analytics
+# and ETags issued by any worker stay valid on the others.
+# The format number is part of every analytics ETag; change it when a report's output changes.
+ANALYTICS_FORMAT = 1
+
+# The (user id, data version) an analytics request read, so the reports it builds don't read it again
+request_data_version: ContextVar[Optional[tuple]] = ContextVar('request_data_version', default=None)
+
+async def data_version(user_id: str) -> int:
+    known = request_data_version.get()
+    if known is not None and known[0] == user_id:
+        return known[1]
+    return await storage.data_version(user_id)
+
+# Writes are timed to the whole second Last-Modified can express, rounded up
+async def bump_data_version(user_id: str):
+    await storage.bump_data_version(user_id, math.ceil(time.time()))
+
+async def mark_modified(user_id: str):
+    await storage.mark_modified(user_id, math.ceil(time.time()))
+
+async def conditional_get(request: Request, user_id: str):
+    """Response headers for a list of the user's data, and whether If-Modified-Since shows the client has it"""
+    headers = {'Cache-Control': 'private, no-cache'}
+    # Read from storage so every worker agrees; users with no recorded write get no Last-Modified
+    modified = await storage.last_modified(user_id)
+    # Until the second of the latest write is over, another write could share its Last-Modified
+    if modified is None or modified > time.time():
+        return headers, False
+    headers['Last-Modified'] = formatdate(modified, usegmt=True)
+    since = request.headers.get('if-modified-since')
+    # If-None-Match takes precedence when both are sent
+    if not since or 'if-none-match' in request.headers:
+        return headers, False
+    try:
+        return headers, parsedate_to_datetime(since).timestamp() >= modified
+    except (TypeError, ValueError):
+        return headers, False
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return etag in candidates or '*' in candidates
+
+async def cached_analytics(request: Request, user_id: str, compute) -> Response:
+    """Serve an analytics payload from the cache, or answer 304 when the client already has it.
+    
+    `compute(today)` builds the payload; reports relative to today change when the month does,
+    so the month is part of the ETag and the cache key.
+    """
+    params = urlencode(sorted(request.query_params.multi_items()))
+    version = await storage.data_version(user_id)
+    today = datetime.now(timezone.utc)
+    month = today.strftime('%Y-%m')
+    digest = hashlib.sha1(f"{ANALYTICS_FORMAT}:{user_id}:{version}:{month}:{request.url.path}?{params}".encode('utf-8'))
+    etag = f'"{digest.hexdigest()}"'
+    # Validated by ETag alone: a report relative to today can change with the month without any write
+    headers = {'Cache-Control': 'private, no-cache', 'ETag': etag}
+    if etag_matches(request, etag):
+        return not_modified(headers)
+    
+    key = (user_id, request.url.path, params, version, month)
+    body = analytics_cache.get(key)
+    if body is None:
+        token = request_data_version.set((user_id, version))
+        try:
+            body = json.dumps(jsonable_encoder(await compute(today))).encode('utf-8')
+        finally:
+            request_data_version.reset(token)
+        analytics_cache.set(key, body, len(body))
+    return Response(content=body, media_type='application/json', headers=headers)
+
+# Predefined categories
 PREDEFINED_EXPENSE_CATEGORIES = [
     'CREDIT CARDS', 'LOANS', 'TAXES', 'TUTION', 'BOOKS', 'GAMES', 'Hobbies',
     'Movies', 'Outdoor activities', 'TV', 'Groceries', 'Restaurants',
@@ -201,33 +861,67 @@ PREDEFINED_INCOME_CATEGORIES = [
     'Interest income', 'Dividends', 'Gifts', 'Refunds', 'Other'
 ]
 
-async def initialize_categories(user_id: str):
-    for cat in PREDEFINED_EXPENSE_CATEGORIES:
-        category = Category(
-            user_id=user_id,
-            name=cat,
-            type='expense',
-            is_predefined=True
-        )
-        doc = category.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.categories.insert_one(doc)
+# Predefined categories are served from one shared catalog rather than copied per user.
+# Ids are derived from (type, name) so they are stable across processes and deploys.
+CATEGORY_NAMESPACE = uuid.UUID('6f1c2a8e-3d4b-5e6f-9a0b-1c2d3e4f5a6b')
+CATALOG_CREATED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def predefined_category_id(type: str, name: str) -> str:
+    return str(uuid.uuid5(CATEGORY_NAMESPACE, f'{type}:{name}'))
+
+PREDEFINED_CATEGORIES = {
+    predefined_category_id(type, name): {
+        'id': predefined_category_id(type, name),
+        'name': name,
+        'type': type,
+        'is_predefined': True,
+        'created_at': CATALOG_CREATED_AT
+    }
+    for type, names in (('expense', PREDEFINED_EXPENSE_CATEGORIES), ('income', PREDEFINED_INCOME_CATEGORIES))
+    for name in names
+}
+
+async def list_categories(user_id: str, type: Optional[str] = None) -> list:
+    """The catalog merged with the user's overrides of it, followed by their custom categories.
     
-    for cat in PREDEFINED_INCOME_CATEGORIES:
-        category = Category(
-            user_id=user_id,
-            name=cat,
-            type='income',
-            is_predefined=True
-        )
-        doc = category.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.categories.insert_one(doc)
+    A user's document whose id is a catalog id overrides that entry (or hides it); users still
+    holding per-user copies of the predefined list from before the catalog see only their own documents.
+    """
+    docs = await storage.find_categories(user_id)
+    overrides = {doc['id']: doc for doc in docs if doc['id'] in PREDEFINED_CATEGORIES}
+    own = [doc for doc in docs if doc['id'] not in PREDEFINED_CATEGORIES]
+    
+    # Unmigrated users have predefined copies of their own and no catalog overrides yet
+    legacy = not overrides and any(doc.get('is_predefined') for doc in own)
+    categories = []
+    if not legacy:
+        for category_id, entry in PREDEFINED_CATEGORIES.items():
+            override = overrides.get(category_id)
+            if override is None:
+                categories.append({**entry, 'user_id': user_id})
+            elif not override.get('hidden'):
+                categories.append(override)
+    categories.extend(own)
+    
+    if type:
+        categories = [category for category in categories if category['type'] == type]
+    return categories
+
+async def migrate_predefined_categories(force: bool = False) -> int:
+    """Collapse per-user copies of the predefined categories onto the shared catalog.
+    
+    Returns the number of users migrated. Once a run has completed, later ones return 0 at once
+    unless `force` is set.
+    """
+    migrated = await storage.migrate_predefined_categories(PREDEFINED_CATEGORIES, force)
+    for user_id in migrated:
+        await bump_data_version(user_id)
+    return len(migrated)
 
 # Auth Routes
 @api_router.post('/auth/signup')
 async def signup(user_data: UserCreate):
-    existing_user = await db.users.find_one({'email': user_data.email}, {'_id': 0})
+    existing_user = await storage.find_user_by_email(user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail='Email already registered')
     
@@ -238,52 +932,70 @@ async def signup(user_data: UserCreate):
     
     doc = user.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    doc['password'] = hash_password(user_data.password)
-    
-    await db.users.insert_one(doc)
+    doc['password'] = await hash_password(user_data.password)
     
-    # Initialize predefined categories
-    await initialize_categories(user.id)
+    try:
+        await storage.insert_user(doc)
+    except DuplicateError:
+        # Lost a race with a concurrent signup for the same email
+        raise HTTPException(status_code=400, detail='Email already registered')
     
     # Initialize settings
     settings = UserSettings(user_id=user.id)
-    await db.settings.insert_one(settings.model_dump())
+    await storage.insert_settings(settings.model_dump())
     
     token = create_token(user.id)
     return {'token': token, 'user': user.model_dump()}
 
 @api_router.post('/auth/login')
 async def login(credentials: UserLogin):
-    user_doc = await db.users.find_one({'email': credentials.email}, {'_id': 0})
+    user_doc = await storage.find_user_by_email(credentials.email)
     if not user_doc:
         raise HTTPException(status_code=401, detail='Invalid credentials')
     
-    if not verify_password(credentials.password, user_doc['password']):
+    if not await verify_password(credentials.password, user_doc['password']):
         raise HTTPException(status_code=401, detail='Invalid credentials')
     
+    # Upgrade (or downgrade) the stored hash once BCRYPT_ROUNDS changes; only a login has the plaintext
+    if password_needs_rehash(user_doc['password']):
+        await storage.update_password(user_doc['id'], user_doc['password'], await hash_password(credentials.password))
+    
     token = create_token(user_doc['id'])
     del user_doc['password']
     return {'token': token, 'user': user_doc}
 
+@api_router.post('/auth/logout')
+async def logout(payload: dict = Depends(get_token_payload)):
+    """Revoke the token used for this request"""
+    jti = token_id(payload, payload['digest'])
+    expires_at = datetime.fromtimestamp(payload['exp'], timezone.utc)
+    await storage.revoke_token(jti, payload['user_id'], expires_at)
+    revoked_token_ids[jti] = expires_at
+    token_cache.pop(payload['digest'])
+    return {'message': 'Logged out'}
+
+@api_router.post('/auth/logout-all')
+async def logout_all(user_id: str = Depends(get_current_user)):
+    """Revoke every token issued to the user so far"""
+    cutoff = time.time()
+    await storage.set_tokens_valid_after(user_id, cutoff)
+    tokens_valid_after[user_id] = cutoff
+    return {'message': 'Logged out of all sessions'}
+
 @api_router.get('/auth/me')
 async def get_me(user_id: str = Depends(get_current_user)):
-    user_doc = await db.users.find_one({'id': user_id}, {'_id': 0, 'password': 0})
+    user_doc = await storage.find_user(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail='User not found')
     return user_doc
 
 # Category Routes
 @api_router.get('/categories', response_model=List[Category])
-async def get_categories(user_id: str = Depends(get_current_user), type: Optional[str] = None):
-    query = {'user_id': user_id}
-    if type:
-        query['type'] = type
-    
-    categories = await db.categories.find(query, {'_id': 0}).to_list(1000)
-    for cat in categories:
-        if isinstance(cat['created_at'], str):
-            cat['created_at'] = datetime.fromisoformat(cat['created_at'])
-    return categories
+async def get_categories(request: Request, user_id: str = Depends(get_current_user), type: Optional[str] = None):
+    headers, fresh = await conditional_get(request, user_id)
+    if fresh:
+        return not_modified(headers)
+    return category_list.response(await list_categories(user_id, type), headers)
 
 @api_router.post('/categories', response_model=Category)
 async def create_category(category_data: CategoryCreate, user_id: str = Depends(get_current_user)):
@@ -296,39 +1008,179 @@ async def create_category(category_data: CategoryCreate, user_id: str = Depends(
     
     doc = category.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.categories.insert_one(doc)
+    await storage.insert_category(doc)
+    await bump_data_version(user_id)
     return category
 
 @api_router.put('/categories/{category_id}')
 async def update_category(category_id: str, category_data: CategoryCreate, user_id: str = Depends(get_current_user)):
-    result = await db.categories.update_one(
-        {'id': category_id, 'user_id': user_id},
-        {'$set': {'name': category_data.name, 'type': category_data.type}}
-    )
-    if result.matched_count == 0:
+    if category_id in PREDEFINED_CATEGORIES:
+        # Editing a catalog entry stores a per-user override of it
+        await storage.update_category(
+            user_id,
+            category_id,
+            {'name': category_data.name, 'type': category_data.type, 'is_predefined': True},
+            on_insert={'created_at': CATALOG_CREATED_AT.isoformat()}
+        )
+        await bump_data_version(user_id)
+        return {'message': 'Category updated'}
+    
+    updated = await storage.update_category(user_id, category_id, {'name': category_data.name, 'type': category_data.type})
+    if not updated:
         raise HTTPException(status_code=404, detail='Category not found')
+    await bump_data_version(user_id)
     return {'message': 'Category updated'}
 
 @api_router.delete('/categories/{category_id}')
 async def delete_category(category_id: str, user_id: str = Depends(get_current_user)):
-    category = await db.categories.find_one({'id': category_id, 'user_id': user_id}, {'_id': 0})
+    if category_id in PREDEFINED_CATEGORIES:
+        raise HTTPException(status_code=400, detail='Cannot delete predefined category')
+    category = await storage.find_category(user_id, category_id)
     if not category:
         raise HTTPException(status_code=404, detail='Category not found')
     
     if category.get('is_predefined', False):
         raise HTTPException(status_code=400, detail='Cannot delete predefined category')
     
-    await db.categories.delete_one({'id': category_id, 'user_id': user_id})
+    await storage.delete_category(user_id, category_id)
+    await bump_data_version(user_id)
     return {'message': 'Category deleted'}
 
 # Transaction Routes
+MAX_TRANSACTION_PAGE_SIZE = 1000
+
+def encode_cursor(sort: str, value, txn_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort, value, txn_id]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, sort: str):
+    """The (sort value, id) keyset in a cursor issued for the same sort order"""
+    try:
+        cursor_sort, value, txn_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    if not isinstance(txn_id, str):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    # A keyset from another order would be compared against the wrong field
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail='Cursor was issued for a different sort order')
+    return value, txn_id
+
 @api_router.get('/transactions', response_model=List[Transaction])
-async def get_transactions(user_id: str = Depends(get_current_user)):
-    transactions = await db.transactions.find({'user_id': user_id}, {'_id': 0}).to_list(10000)
-    for txn in transactions:
-        if isinstance(txn['created_at'], str):
-            txn['created_at'] = datetime.fromisoformat(txn['created_at'])
-    return transactions
+async def get_transactions(
+    request: Request,
+    user_id: str = Depends(get_current_user),
+    start_date: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$', description='Earliest date, inclusive'),
+    end_date: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}-\d{2}$', description='Latest date, inclusive'),
+    type: Optional[Literal['income', 'expense']] = None,
+    category: Optional[List[str]] = Query(None),
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    sort: Literal['date', '-date', 'amount', '-amount', 'created_at', '-created_at'] = '-date',
+    limit: Optional[int] = Query(None, ge=1, le=MAX_TRANSACTION_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    """List transactions, optionally filtered and paged.
+    
+    With `limit`, the X-Next-Cursor response header carries the cursor for the next page.
+    """
+    headers, fresh = await conditional_get(request, user_id)
+    if fresh:
+        return not_modified(headers)
+    
+    # Keyset pagination: continue strictly after the (sort value, id) of the last row seen
+    field = sort.lstrip('-')
+    transactions = await storage.find_transactions(
+        user_id,
+        start_date=start_date,
+        end_date=end_date,
+        type=type,
+        categories=category,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        sort=field,
+        descending=sort.startswith('-'),
+        after=decode_cursor(cursor, sort) if cursor else None,
+        limit=limit + 1 if limit else None,
+        fields=transaction_list.fields
+    )
+    if limit and len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        headers['X-Next-Cursor'] = encode_cursor(sort, last.get(field), last['id'])
+    return transaction_list.response(transactions, headers)
+
+def bulk_result(results: list) -> BulkResult:
+    failed = sum(1 for result in results if result.status in ('not_found', 'failed'))
+    return BulkResult(succeeded=len(results) - failed, failed=failed, results=results)
+
+def bulk_item(index: int, txn_id: str, outcome, status: str) -> BulkItemResult:
+    """Result for a storage outcome: True when written, False when not found, else the error"""
+    if outcome is True:
+        return BulkItemResult(index=index, id=txn_id, status=status)
+    if outcome is False:
+        return BulkItemResult(index=index, id=txn_id, status='not_found')
+    return BulkItemResult(index=index, id=txn_id, status='failed', error=str(outcome))
+
+def unique_ids(ids: list):
+    # Unordered writes to the same document twice would race, so reject them up front
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail='Each transaction id may appear only once per request')
+
+# Bulk routes are declared before /transactions/{transaction_id} so "bulk" is not taken as an id
+@api_router.post('/transactions/bulk', response_model=BulkResult)
+async def create_transactions_bulk(payload: BulkTransactionCreate, user_id: str = Depends(get_current_user)):
+    """Create many transactions with one unordered bulk write"""
+    # Built field by field like create_transaction: recurring links are only set by the materializer
+    docs = [
+        transaction_doc(Transaction(
+            user_id=user_id,
+            date=txn.date,
+            amount=txn.amount,
+            description=txn.description,
+            category=txn.category,
+            type=txn.type
+        ))
+        for txn in payload.transactions
+    ]
+    errors = await storage.insert_transactions(docs)
+    
+    results = [
+        BulkItemResult(index=index, id=doc['id'], status='failed', error=str(errors[index])) if index in errors
+        else BulkItemResult(index=index, id=doc['id'], status='created')
+        for index, doc in enumerate(docs)
+    ]
+    if len(errors) < len(docs):
+        await bump_data_version(user_id)
+    return bulk_result(results)
+
+@api_router.patch('/transactions/bulk', response_model=BulkResult)
+async def update_transactions_bulk(payload: BulkTransactionUpdate, user_id: str = Depends(get_current_user)):
+    """Apply partial updates to many transactions with one unordered bulk write"""
+    unique_ids([patch.id for patch in payload.updates])
+    
+    updates = []
+    for patch in payload.updates:
+        changes = patch.model_dump(exclude={'id'}, exclude_none=True)
+        if 'date' in changes:
+            changes.update(transaction_date_fields(changes['date']))
+        updates.append((patch.id, changes))
+    outcomes = await storage.update_transactions(user_id, updates)
+    
+    results = [bulk_item(index, patch.id, outcome, 'updated') for index, (patch, outcome) in enumerate(zip(payload.updates, outcomes))]
+    if any(outcome is True for outcome in outcomes):
+        await bump_data_version(user_id)
+    return bulk_result(results)
+
+@api_router.delete('/transactions/bulk', response_model=BulkResult)
+async def delete_transactions_bulk(payload: BulkTransactionDelete, user_id: str = Depends(get_current_user)):
+    """Delete many transactions with one unordered bulk write"""
+    unique_ids(payload.ids)
+    outcomes = await storage.delete_transactions(user_id, payload.ids)
+    
+    results = [bulk_item(index, txn_id, outcome, 'deleted') for index, (txn_id, outcome) in enumerate(zip(payload.ids, outcomes))]
+    if any(outcome is True for outcome in outcomes):
+        await bump_data_version(user_id)
+    return bulk_result(results)
 
 @api_router.post('/transactions', response_model=Transaction)
 async def create_transaction(txn_data: TransactionCreate, user_id: str = Depends(get_current_user)):
@@ -341,229 +1193,218 @@ async def create_transaction(txn_data: TransactionCreate, user_id: str = Depends
         type=txn_data.type
     )
     
-    doc = transaction.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.transactions.insert_one(doc)
+    doc = transaction_doc(transaction)
+    await storage.insert_transaction(doc)
+    await bump_data_version(user_id)
     return transaction
 
 @api_router.put('/transactions/{transaction_id}')
 async def update_transaction(transaction_id: str, txn_data: TransactionCreate, user_id: str = Depends(get_current_user)):
-    result = await db.transactions.update_one(
-        {'id': transaction_id, 'user_id': user_id},
-        {'$set': txn_data.model_dump()}
-    )
-    if result.matched_count == 0:
+    changes = {**txn_data.model_dump(), **transaction_date_fields(txn_data.date)}
+    if not await storage.update_transaction(user_id, transaction_id, changes):
         raise HTTPException(status_code=404, detail='Transaction not found')
+    await bump_data_version(user_id)
     return {'message': 'Transaction updated'}
 
 @api_router.delete('/transactions/{transaction_id}')
 async def delete_transaction(transaction_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.transactions.delete_one({'id': transaction_id, 'user_id': user_id})
-    if result.deleted_count == 0:
+    if not await storage.delete_transaction(user_id, transaction_id):
         raise HTTPException(status_code=404, detail='Transaction not found')
+    await bump_data_version(user_id)
     return {'message': 'Transaction deleted'}
 
 # Budget Routes
 @api_router.get('/budgets')
-async def get_budgets(user_id: str = Depends(get_current_user), month: Optional[int] = None, year: Optional[int] = None):
-    query = {'user_id': user_id}
-    if month:
-        query['month'] = month
-    if year:
-        query['year'] = year
-    
-    budgets = await db.budgets.find(query, {'_id': 0}).to_list(1000)
-    return budgets
+async def get_budgets(request: Request, response: Response, user_id: str = Depends(get_current_user), month: Optional[int] = None, year: Optional[int] = None):
+    headers, fresh = await conditional_get(request, user_id)
+    if fresh:
+        return not_modified(headers)
+    response.headers.update(headers)
+    return await storage.find_budgets(user_id, month, year)
+
+def budget_doc(user_id: str, category: str, month: int, year: int, planned_amount: float) -> dict:
+    doc = Budget(user_id=user_id, category=category, month=month, year=year, planned_amount=planned_amount).model_dump()
+    doc['created_at'] = doc['created_at'].isoformat()
+    return doc
+
+async def write_budgets(user_id: str, docs: list, overwrite: bool = True) -> dict:
+    """Upsert on the unique (user_id, category, month, year) key; without overwrite existing amounts are kept"""
+    counts = await storage.upsert_budgets(docs, overwrite)
+    await bump_data_version(user_id)
+    return counts
 
 @api_router.post('/budgets')
 async def create_or_update_budget(budget_data: BudgetCreate, user_id: str = Depends(get_current_user)):
-    existing = await db.budgets.find_one({
-        'user_id': user_id,
-        'category': budget_data.category,
-        'month': budget_data.month,
-        'year': budget_data.year
-    }, {'_id': 0})
-    
-    if existing:
-        await db.budgets.update_one(
-            {
-                'user_id': user_id,
-                'category': budget_data.category,
-                'month': budget_data.month,
-                'year': budget_data.year
-            },
-            {'$set': {'planned_amount': budget_data.planned_amount}}
-        )
-        return {'message': 'Budget updated'}
-    else:
-        budget = Budget(
-            user_id=user_id,
-            category=budget_data.category,
-            month=budget_data.month,
-            year=budget_data.year,
-            planned_amount=budget_data.planned_amount
-        )
-        doc = budget.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
-        await db.budgets.insert_one(doc)
-        return {'message': 'Budget created'}
+    counts = await write_budgets(user_id, [budget_doc(user_id, **budget_data.model_dump())])
+    return {'message': 'Budget created' if counts['created'] else 'Budget updated'}
+
+@api_router.put('/budgets/bulk')
+async def save_budget_plan(plan: BudgetPlan, user_id: str = Depends(get_current_user)):
+    """Upsert a month's planned amounts, optionally repeated over the following months, in one bulk write"""
+    docs = []
+    for offset in range(plan.months):
+        year, month = shift_month(plan.year, plan.month, offset)
+        for line in plan.budgets:
+            docs.append(budget_doc(user_id, line.category, month, year, line.planned_amount))
+    counts = await write_budgets(user_id, docs)
+    return {'message': f"Saved {len(plan.budgets)} budgets for {plan.months} month(s)", **counts}
+
+@api_router.post('/budgets/copy')
+async def copy_budget_plan(copy: BudgetCopy, user_id: str = Depends(get_current_user)):
+    """Copy one month's plan to every month in an inclusive range"""
+    span = (copy.end_year * 12 + copy.end_month) - (copy.start_year * 12 + copy.start_month) + 1
+    if span < 1:
+        raise HTTPException(status_code=400, detail='Copy range ends before it starts')
+    if span > MAX_BUDGET_PLAN_MONTHS:
+        raise HTTPException(status_code=400, detail=f'Copy range is limited to {MAX_BUDGET_PLAN_MONTHS} months')
+    
+    source = await storage.find_budgets(user_id, copy.month, copy.year)
+    if not source:
+        raise HTTPException(status_code=404, detail='No budgets to copy for that month')
+    
+    # The source month is skipped when it falls inside the range
+    targets = [shift_month(copy.start_year, copy.start_month, offset) for offset in range(span)]
+    targets = [(year, month) for year, month in targets if (year, month) != (copy.year, copy.month)]
+    if not targets:
+        return {'message': 'Nothing to copy', 'created': 0, 'updated': 0}
+    docs = [
+        budget_doc(user_id, budget['category'], month, year, budget['planned_amount'])
+        for year, month in targets
+        for budget in source
+    ]
+    counts = await write_budgets(user_id, docs, copy.overwrite)
+    return {'message': f"Copied {len(source)} budgets to {len(targets)} month(s)", **counts}
 
 # Analytics Routes
+async def monthly_report(user_id: str, month: int, year: int):
+    # One pass over the month's rollups instead of one pipeline per category
+    period = f"{year}-{month:02d}"
+    categories, rows, budgets = await asyncio.gather(
+        list_categories(user_id, 'expense'),
+        fetch_period_totals(user_id, [period], type='expense'),
+        storage.find_budgets(user_id, month, year)
+    )
+    return build_monthly(rows, categories, budgets, month, year)
+
 @api_router.get('/analytics/monthly', response_model=List[MonthlyData])
-async def get_monthly_data(month: int, year: int, user_id: str = Depends(get_current_user)):
-    # Get all expense categories
-    categories = await db.categories.find({'user_id': user_id, 'type': 'expense'}, {'_id': 0}).to_list(1000)
+async def get_monthly_data(request: Request, month: int, year: int, user_id: str = Depends(get_current_user)):
+    return await cached_analytics(request, user_id, lambda today: monthly_report(user_id, month, year))
+
+async def yearly_report(user_id: str, year: int):
+    return build_yearly(await compute_series(user_id, (year, 1), (year, 12)))
+
+@api_router.get('/analytics/yearly', response_model=List[YearlyMonthData])
+async def get_yearly_data(request: Request, year: int, user_id: str = Depends(get_current_user)):
+    return await cached_analytics(request, user_id, lambda today: yearly_report(user_id, year))
+
+@api_router.get('/analytics/series', response_model=List[SeriesPoint])
+async def get_series_data(
+    request: Request,
+    from_period: str = Query(..., alias='from', description='First month, YYYY-MM'),
+    to_period: str = Query(..., alias='to', description='Last month, YYYY-MM'),
+    granularity: Literal['month', 'quarter', 'year'] = 'month',
+    user_id: str = Depends(get_current_user)
+):
+    """Get income, expense and balance per period over an inclusive month range"""
+    start = parse_period(from_period)
+    end = parse_period(to_period)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end[0] - start[0]) * 12 + end[1] - start[1] >= MAX_SERIES_MONTHS:
+        raise HTTPException(status_code=400, detail=f'Range is limited to {MAX_SERIES_MONTHS} months')
+    return await cached_analytics(request, user_id, lambda today: compute_series(user_id, start, end, granularity))
+
+# Recurring Transaction Routes
+def occurrence_date(year: int, month: int, day: int) -> str:
+    """The rule's day in a given month, clamped to the month's first and last day"""
+    return f"{year}-{month:02d}-{min(max(day, 1), monthrange(year, month)[1]):02d}"
+
+def parse_date(value: Optional[str]):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def due_occurrences(rule: dict, today) -> tuple:
+    """Dates due for a rule up to today, from the month after generated_through (or start_date).
     
-    result = []
-    for category in categories:
-        cat_name = category['name']
-        
-        # Get actual expenses
-        pipeline = [
-            {
-                '$match': {
-                    'user_id': user_id,
-                    'category': cat_name,
-                    'type': 'expense'
-                }
-            },
-            {
-                '$addFields': {
-                    'parsed_date': {
-                        '$dateFromString': {
-                            'dateString': '$date',
-                            'format': '%Y-%m-%d',
-                            'onError': None,
-                            'onNull': None
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'parsed_date': {'$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'month': {'$month': '$parsed_date'},
-                    'year': {'$year': '$parsed_date'}
-                }
-            },
-            {
-                '$match': {
-                    'month': month,
-                    'year': year
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total': {'$sum': '$amount'}
-                }
-            }
-        ]
-        
-        actual_result = await db.transactions.aggregate(pipeline).to_list(1)
-        actual = actual_result[0]['total'] if actual_result else 0
-        
-        # Get planned budget
-        budget = await db.budgets.find_one({
-            'user_id': user_id,
-            'category': cat_name,
-            'month': month,
-            'year': year
-        }, {'_id': 0})
-        
-        planned = budget['planned_amount'] if budget else 0
-        
-        result.append(MonthlyData(
-            category=cat_name,
-            actual=actual,
-            planned=planned,
-            difference=planned - actual
-        ))
+    Returns the dates and the last period covered, or None when nothing new is covered.
+    """
+    start = parse_date(rule.get('start_date'))
+    if start is None:
+        return [], None
+    end = today
+    if rule.get('end_date'):
+        end = min(end, parse_date(rule['end_date']) or end)
     
-    return result
+    year, month = start.year, start.month
+    if rule.get('generated_through'):
+        year, month = shift_month(*parse_period(rule['generated_through']), 1)
+    
+    dates, covered = [], None
+    while (year, month) <= (end.year, end.month):
+        date = occurrence_date(year, month, rule['day_of_month'])
+        if date > end.isoformat():
+            # This month's occurrence is not due yet; pick it up on a later run
+            break
+        if date >= start.isoformat():
+            dates.append(date)
+        covered = f"{year}-{month:02d}"
+        year, month = shift_month(year, month, 1)
+    return dates, covered
 
-@api_router.get('/analytics/yearly', response_model=List[YearlyMonthData])
-async def get_yearly_data(year: int, user_id: str = Depends(get_current_user)):
-    result = []
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    
-    for month_num in range(1, 13):
-        # Get income
-        income_pipeline = [
-            {
-                '$match': {
-                    'user_id': user_id,
-                    'type': 'income'
-                }
-            },
-            {
-                '$addFields': {
-                    'parsed_date': {
-                        '$dateFromString': {
-                            'dateString': '$date',
-                            'format': '%Y-%m-%d',
-                            'onError': None,
-                            'onNull': None
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'parsed_date': {'$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'month': {'$month': '$parsed_date'},
-                    'year': {'$year': '$parsed_date'}
-                }
-            },
-            {
-                '$match': {
-                    'month': month_num,
-                    'year': year
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total': {'$sum': '$amount'}
-                }
-            }
-        ]
-        
-        income_result = await db.transactions.aggregate(income_pipeline).to_list(1)
-        income = income_result[0]['total'] if income_result else 0
-        
-        # Get expenses
-        expense_pipeline = income_pipeline.copy()
-        expense_pipeline[0]['$match']['type'] = 'expense'
-        
-        expense_result = await db.transactions.aggregate(expense_pipeline).to_list(1)
-        expense = expense_result[0]['total'] if expense_result else 0
+async def insert_occurrences(docs: list) -> list:
+    """Insert unordered and return what was written; occurrences that already exist hit the unique index"""
+    if not docs:
+        return []
+    errors = await storage.insert_transactions(docs)
+    for error in errors.values():
+        if not isinstance(error, DuplicateError):
+            logger.warning(f"Recurring occurrence insert failed: {error}")
+    return [doc for index, doc in enumerate(docs) if index not in errors]
+
+async def materialize_recurring(user_id: Optional[str] = None, rule_id: Optional[str] = None, today=None) -> dict:
+    """Create every due occurrence of the active rules (one user's, or a single rule), a batch of rules at a time.
+    
+    Returns the number of transactions generated per user.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    generated = {}
+    async for rules in storage.active_recurring_batches(RECURRING_BATCH_RULES, user_id=user_id, rule_id=rule_id):
+        docs, progress = [], {}
+        for rule in rules:
+            dates, covered = due_occurrences(rule, today)
+            docs.extend(
+                transaction_doc(Transaction(
+                    user_id=rule['user_id'],
+                    date=date,
+                    amount=rule['amount'],
+                    description=rule['description'],
+                    category=rule['category'],
+                    type=rule['type'],
+                    is_recurring=True,
+                    recurring_id=rule['id']
+                ))
+                for date in dates
+            )
+            if covered:
+                progress[rule['id']] = covered
         
-        result.append(YearlyMonthData(
-            month=months[month_num - 1],
-            income=income,
-            expense=expense,
-            balance=income - expense
-        ))
+        inserted = await insert_occurrences(docs)
+        await storage.set_generated_through(progress)
+        for doc in inserted:
+            generated[doc['user_id']] = generated.get(doc['user_id'], 0) + 1
     
-    return result
+    for user_id in generated:
+        await bump_data_version(user_id)
+    return generated
 
-# Recurring Transaction Routes
 @api_router.get('/recurring-transactions', response_model=List[RecurringTransaction])
-async def get_recurring_transactions(user_id: str = Depends(get_current_user)):
-    recurring = await db.recurring_transactions.find({'user_id': user_id}, {'_id': 0}).to_list(1000)
-    for rec in recurring:
-        if isinstance(rec.get('created_at'), str):
-            rec['created_at'] = datetime.fromisoformat(rec['created_at'])
-    return recurring
+async def get_recurring_transactions(request: Request, user_id: str = Depends(get_current_user)):
+    headers, fresh = await conditional_get(request, user_id)
+    if fresh:
+        return not_modified(headers)
+    return recurring_list.response(await storage.find_recurring(user_id), headers)
 
 @api_router.post('/recurring-transactions', response_model=RecurringTransaction)
 async def create_recurring_transaction(rec_data: RecurringTransactionCreate, user_id: str = Depends(get_current_user)):
@@ -580,452 +1421,359 @@ async def create_recurring_transaction(rec_data: RecurringTransactionCreate, use
     
     doc = recurring.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.recurring_transactions.insert_one(doc)
+    await storage.insert_recurring(doc)
+    await mark_modified(user_id)
+    # Catch up on occurrences from a start date in the past right away
+    await materialize_recurring(rule_id=recurring.id)
     return recurring
 
 @api_router.put('/recurring-transactions/{recurring_id}')
 async def update_recurring_transaction(recurring_id: str, rec_data: RecurringTransactionCreate, user_id: str = Depends(get_current_user)):
-    result = await db.recurring_transactions.update_one(
-        {'id': recurring_id, 'user_id': user_id},
-        {'$set': rec_data.model_dump()}
-    )
-    if result.matched_count == 0:
+    if not await storage.update_recurring(user_id, recurring_id, rec_data.model_dump()):
         raise HTTPException(status_code=404, detail='Recurring transaction not found')
+    await mark_modified(user_id)
     return {'message': 'Recurring transaction updated'}
 
 @api_router.delete('/recurring-transactions/{recurring_id}')
 async def delete_recurring_transaction(recurring_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.recurring_transactions.delete_one({'id': recurring_id, 'user_id': user_id})
-    if result.deleted_count == 0:
+    if not await storage.delete_recurring(user_id, recurring_id):
         raise HTTPException(status_code=404, detail='Recurring transaction not found')
+    await mark_modified(user_id)
     return {'message': 'Recurring transaction deleted'}
 
 @api_router.post('/recurring-transactions/{recurring_id}/toggle')
 async def toggle_recurring_transaction(recurring_id: str, user_id: str = Depends(get_current_user)):
-    recurring = await db.recurring_transactions.find_one({'id': recurring_id, 'user_id': user_id}, {'_id': 0})
+    recurring = await storage.find_recurring_rule(user_id, recurring_id)
     if not recurring:
         raise HTTPException(status_code=404, detail='Recurring transaction not found')
     
     new_status = not recurring.get('is_active', True)
-    await db.recurring_transactions.update_one(
-        {'id': recurring_id, 'user_id': user_id},
-        {'$set': {'is_active': new_status}}
-    )
+    changes = {'is_active': new_status}
+    if new_status:
+        # Months spent paused are skipped rather than caught up on
+        today = datetime.now(timezone.utc)
+        paused_through = '{}-{:02d}'.format(*shift_month(today.year, today.month, -1))
+        changes['generated_through'] = max(recurring.get('generated_through') or '', paused_through)
+    await storage.update_recurring(user_id, recurring_id, changes)
+    await mark_modified(user_id)
+    if new_status:
+        await materialize_recurring(rule_id=recurring_id)
     return {'message': f'Recurring transaction {"activated" if new_status else "deactivated"}', 'is_active': new_status}
 
 @api_router.post('/recurring-transactions/generate')
 async def generate_recurring_transactions(user_id: str = Depends(get_current_user)):
-    """Manually trigger recurring transaction generation for current month"""
-    today = datetime.now(timezone.utc)
-    current_month = today.month
-    current_year = today.year
-    
-    recurring_txns = await db.recurring_transactions.find({
-        'user_id': user_id,
-        'is_active': True
-    }, {'_id': 0}).to_list(1000)
-    
-    generated_count = 0
-    for rec in recurring_txns:
-        # Check if transaction already exists for this month
-        txn_date = f"{current_year}-{current_month:02d}-{rec['day_of_month']:02d}"
-        
-        existing = await db.transactions.find_one({
-            'user_id': user_id,
-            'recurring_id': rec['id'],
-            'date': txn_date
-        })
-        
-        if not existing:
-            transaction = Transaction(
-                user_id=user_id,
-                date=txn_date,
-                amount=rec['amount'],
-                description=rec['description'],
-                category=rec['category'],
-                type=rec['type'],
-                is_recurring=True,
-                recurring_id=rec['id']
-            )
-            
-            doc = transaction.model_dump()
-            doc['created_at'] = doc['created_at'].isoformat()
-            await db.transactions.insert_one(doc)
-            generated_count += 1
-    
+    """Materialize the user's due recurring transactions now instead of waiting for the scheduler"""
+    generated = await materialize_recurring(user_id=user_id)
+    generated_count = generated.get(user_id, 0)
     return {'message': f'Generated {generated_count} recurring transactions', 'count': generated_count}
 
 # Enhanced Analytics Routes
+async def category_breakdown_report(user_id: str, month: int, year: int, type: str):
+    period = f"{year}-{month:02d}"
+    rows = await fetch_period_totals(user_id, [period], type=type)
+    return build_category_breakdown(rows, month, year, type)
+
 @api_router.get('/analytics/category-breakdown')
-async def get_category_breakdown(month: int, year: int, type: str, user_id: str = Depends(get_current_user)):
+async def get_category_breakdown(request: Request, month: int, year: int, type: str, user_id: str = Depends(get_current_user)):
     """Get category breakdown for donut chart"""
-    pipeline = [
-        {
-            '$match': {
-                'user_id': user_id,
-                'type': type
-            }
-        },
-        {
-            '$addFields': {
-                'parsed_date': {
-                    '$dateFromString': {
-                        'dateString': '$date',
-                        'format': '%Y-%m-%d',
-                        'onError': None,
-                        'onNull': None
-                    }
-                }
-            }
-        },
-        {
-            '$match': {
-                'parsed_date': {'$ne': None}
-            }
-        },
-        {
-            '$addFields': {
-                'month': {'$month': '$parsed_date'},
-                'year': {'$year': '$parsed_date'}
-            }
-        },
-        {
-            '$match': {
-                'month': month,
-                'year': year
-            }
-        },
-        {
-            '$group': {
-                '_id': '$category',
-                'total': {'$sum': '$amount'}
-            }
-        },
-        {
-            '$sort': {'total': -1}
-        }
-    ]
-    
-    results = await db.transactions.aggregate(pipeline).to_list(100)
-    total_amount = sum(item['total'] for item in results)
-    
-    breakdown = []
-    for item in results:
-        if total_amount > 0:
-            percentage = (item['total'] / total_amount) * 100
-        else:
-            percentage = 0
-        breakdown.append(CategoryBreakdown(
-            category=item['_id'],
-            amount=item['total'],
-            percentage=percentage
-        ))
-    
-    return breakdown
+    return await cached_analytics(request, user_id, lambda today: category_breakdown_report(user_id, month, year, type))
+
+async def trend_report(user_id: str, months: int, today: datetime):
+    if months < 1:
+        return []
+    start, end = trend_range(months, today)
+    return build_trend(await compute_series(user_id, start, end))
 
 @api_router.get('/analytics/trend', response_model=List[TrendData])
-async def get_trend_data(months: int, user_id: str = Depends(get_current_user)):
+async def get_trend_data(request: Request, months: int, user_id: str = Depends(get_current_user)):
     """Get trend data for last N months"""
-    today = datetime.now(timezone.utc)
-    result = []
-    
-    for i in range(months - 1, -1, -1):
-        target_date = today - timedelta(days=30 * i)
-        month_num = target_date.month
-        year_num = target_date.year
-        
-        # Get income
-        income_pipeline = [
-            {
-                '$match': {
-                    'user_id': user_id,
-                    'type': 'income'
-                }
-            },
-            {
-                '$addFields': {
-                    'parsed_date': {
-                        '$dateFromString': {
-                            'dateString': '$date',
-                            'format': '%Y-%m-%d',
-                            'onError': None,
-                            'onNull': None
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'parsed_date': {'$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'month': {'$month': '$parsed_date'},
-                    'year': {'$year': '$parsed_date'}
-                }
-            },
-            {
-                '$match': {
-                    'month': month_num,
-                    'year': year_num
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total': {'$sum': '$amount'}
-                }
-            }
-        ]
-        
-        income_result = await db.transactions.aggregate(income_pipeline).to_list(1)
-        income = income_result[0]['total'] if income_result else 0
-        
-        # Get expenses
-        expense_pipeline = income_pipeline.copy()
-        expense_pipeline[0]['$match']['type'] = 'expense'
-        
-        expense_result = await db.transactions.aggregate(expense_pipeline).to_list(1)
-        expense = expense_result[0]['total'] if expense_result else 0
-        
-        month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        result.append(TrendData(
-            month=f"{month_names[month_num - 1]} {year_num}",
-            income=income,
-            expense=expense,
-            balance=income - expense
-        ))
-    
-    return result
+    return await cached_analytics(request, user_id, lambda today: trend_report(user_id, months, today))
+
+async def fiscal_year_report(user_id: str, start_year: int):
+    series = await compute_series(user_id, (start_year, 4), (start_year + 1, 3))
+    return [point.model_dump() for point in build_yearly(series)]
 
 @api_router.get('/analytics/fiscal-year')
-async def get_fiscal_year_data(start_year: int, user_id: str = Depends(get_current_user)):
+async def get_fiscal_year_data(request: Request, start_year: int, user_id: str = Depends(get_current_user)):
     """Get fiscal year data (April to March)"""
-    result = []
-    months = ['Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec', 'Jan', 'Feb', 'Mar']
-    
-    for i, month_name in enumerate(months):
-        if i < 9:  # Apr-Dec
-            month_num = i + 4
-            year_num = start_year
-        else:  # Jan-Mar
-            month_num = i - 8
-            year_num = start_year + 1
-        
-        # Get income and expenses
-        income_pipeline = [
-            {
-                '$match': {
-                    'user_id': user_id,
-                    'type': 'income'
-                }
-            },
-            {
-                '$addFields': {
-                    'parsed_date': {
-                        '$dateFromString': {
-                            'dateString': '$date',
-                            'format': '%Y-%m-%d',
-                            'onError': None,
-                            'onNull': None
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'parsed_date': {'$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'month': {'$month': '$parsed_date'},
-                    'year': {'$year': '$parsed_date'}
-                }
-            },
-            {
-                '$match': {
-                    'month': month_num,
-                    'year': year_num
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total': {'$sum': '$amount'}
-                }
-            }
-        ]
-        
-        income_result = await db.transactions.aggregate(income_pipeline).to_list(1)
-        income = income_result[0]['total'] if income_result else 0
-        
-        expense_pipeline = income_pipeline.copy()
-        expense_pipeline[0]['$match']['type'] = 'expense'
-        
-        expense_result = await db.transactions.aggregate(expense_pipeline).to_list(1)
-        expense = expense_result[0]['total'] if expense_result else 0
-        
-        result.append({
-            'month': month_name,
-            'income': income,
-            'expense': expense,
-            'balance': income - expense
-        })
-    
-    return result
+    return await cached_analytics(request, user_id, lambda today: fiscal_year_report(user_id, start_year))
+
+async def burn_rate_report(user_id: str, today: datetime):
+    # Get last 3 months average expense and the all-time balance
+    periods = burn_rate_periods(today)
+    rows, totals_by_type = await asyncio.gather(
+        fetch_period_totals(user_id, periods, type='expense'),
+        fetch_balance_totals(user_id)
+    )
+    return build_burn_rate(rows, totals_by_type, periods)
 
 @api_router.get('/analytics/burn-rate')
-async def get_burn_rate(user_id: str = Depends(get_current_user)):
+async def get_burn_rate(request: Request, user_id: str = Depends(get_current_user)):
     """Calculate burn rate and runway"""
-    # Get last 3 months average expense
-    today = datetime.now(timezone.utc)
-    total_expense = 0
-    months_counted = 0
+    return await cached_analytics(request, user_id, lambda today: burn_rate_report(user_id, today))
+
+async def dashboard_report(user_id: str, month: int, year: int, start_year: int, months: int, breakdown_type: str, today: datetime):
+    yearly_range = ((year, 1), (year, 12))
+    fiscal_range = ((start_year, 4), (start_year + 1, 3))
+    trend_start, trend_end = trend_range(months, today) if months > 0 else (None, None)
+    recent_periods = burn_rate_periods(today)
     
-    for i in range(3):
-        target_date = today - timedelta(days=30 * i)
-        month_num = target_date.month
-        year_num = target_date.year
-        
-        pipeline = [
-            {
-                '$match': {
-                    'user_id': user_id,
-                    'type': 'expense'
-                }
-            },
-            {
-                '$addFields': {
-                    'parsed_date': {
-                        '$dateFromString': {
-                            'dateString': '$date',
-                            'format': '%Y-%m-%d',
-                            'onError': None,
-                            'onNull': None
-                        }
-                    }
-                }
-            },
-            {
-                '$match': {
-                    'parsed_date': {'$ne': None}
-                }
-            },
-            {
-                '$addFields': {
-                    'month': {'$month': '$parsed_date'},
-                    'year': {'$year': '$parsed_date'}
-                }
-            },
-            {
-                '$match': {
-                    'month': month_num,
-                    'year': year_num
-                }
-            },
-            {
-                '$group': {
-                    '_id': None,
-                    'total': {'$sum': '$amount'}
-                }
-            }
-        ]
-        
-        result = await db.transactions.aggregate(pipeline).to_list(1)
-        if result:
-            total_expense += result[0]['total']
-            months_counted += 1
+    # Every view reads from the same set of rollup rows, fetched once
+    periods = periods_between(*yearly_range) | periods_between(*fiscal_range) | recent_periods
+    periods.add(f"{year}-{month:02d}")
+    if trend_start:
+        periods |= periods_between(trend_start, trend_end)
     
-    avg_monthly_burn = total_expense / months_counted if months_counted > 0 else 0
-    
-    # Get current balance (total income - total expense)
-    all_income = await db.transactions.aggregate([
-        {'$match': {'user_id': user_id, 'type': 'income'}},
-        {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-    ]).to_list(1)
+    rows, categories, budgets, totals_by_type = await asyncio.gather(
+        fetch_period_totals(user_id, periods),
+        list_categories(user_id, 'expense'),
+        storage.find_budgets(user_id, month, year),
+        fetch_balance_totals(user_id)
+    )
     
-    all_expense = await db.transactions.aggregate([
-        {'$match': {'user_id': user_id, 'type': 'expense'}},
-        {'$group': {'_id': None, 'total': {'$sum': '$amount'}}}
-    ]).to_list(1)
+    return DashboardData(
+        monthly=build_monthly(rows, categories, budgets, month, year),
+        yearly=build_yearly(build_series(rows, *yearly_range)),
+        fiscal_year=build_yearly(build_series(rows, *fiscal_range)),
+        trend=build_trend(build_series(rows, trend_start, trend_end)) if trend_start else [],
+        category_breakdown=build_category_breakdown(rows, month, year, breakdown_type),
+        burn_rate=build_burn_rate(rows, totals_by_type, recent_periods)
+    )
+
+@api_router.get('/analytics/dashboard', response_model=DashboardData)
+async def get_dashboard_data(
+    request: Request,
+    month: int,
+    year: int,
+    start_year: Optional[int] = None,
+    months: int = 12,
+    breakdown_type: Literal['income', 'expense'] = 'expense',
+    user_id: str = Depends(get_current_user)
+):
+    """Get the monthly, yearly, fiscal-year, trend, category breakdown and burn-rate reports in one response"""
+    fiscal_start = start_year if start_year is not None else year
+    return await cached_analytics(
+        request,
+        user_id,
+        lambda today: dashboard_report(user_id, month, year, fiscal_start, months, breakdown_type, today)
+    )
+
+# Import/Export Routes
+CSV_IMPORT_BATCH_ROWS = 1000
+
+def transaction_content_hash(doc: dict, occurrence: int) -> str:
+    """Stable hash of an imported row's content.
     
-    total_income = all_income[0]['total'] if all_income else 0
-    total_expenses = all_expense[0]['total'] if all_expense else 0
-    current_balance = total_income - total_expenses
+    `occurrence` numbers identical rows within one file, so genuine repeats (two equal
+    purchases on the same day) are kept while a re-upload of the same file is skipped.
+    """
+    key = '\x1f'.join([
+        doc['date'],
+        f"{doc['amount']:.2f}",
+        doc['description'].strip(),
+        doc['category'],
+        doc['type'],
+        str(occurrence)
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def read_csv_batch(rows, batch_rows: int) -> list:
+    return list(itertools.islice(rows, batch_rows))
+
+async def insert_transaction_batch(user_id: str, docs: list) -> tuple:
+    """Insert a batch unordered, skipping rows whose content hash is already stored.
     
-    runway_months = (current_balance / avg_monthly_burn) if avg_monthly_burn > 0 else 0
+    Returns the inserted docs, the number of duplicates skipped and a map of failed
+    batch index to error.
+    """
+    hashes = [doc['content_hash'] for doc in docs if 'content_hash' in doc]
+    existing = await storage.find_content_hashes(user_id, hashes) if hashes else set()
+    pending = [(index, doc) for index, doc in enumerate(docs) if doc.get('content_hash') not in existing]
+    skipped = len(docs) - len(pending)
+    if not pending:
+        return [], skipped, {}
     
-    return {
-        'monthly_burn_rate': avg_monthly_burn,
-        'current_balance': current_balance,
-        'runway_months': runway_months
-    }
+    errors = await storage.insert_transactions([doc for _, doc in pending])
+    failed = {}
+    duplicates = 0
+    for position, error in errors.items():
+        # A concurrent import of the same rows can still lose the race on the unique index
+        if isinstance(error, DuplicateError):
+            duplicates += 1
+        else:
+            failed[pending[position][0]] = str(error)
+    inserted = [doc for position, (_, doc) in enumerate(pending) if position not in errors]
+    return inserted, skipped + duplicates, failed
 
-# Import/Export Routes
-@api_router.post('/import/csv')
-async def import_csv(file: UploadFile = File(...), user_id: str = Depends(get_current_user)):
-    """Import transactions from CSV"""
-    if not file.filename.endswith('.csv'):
-        raise HTTPException(status_code=400, detail='File must be a CSV')
+async def import_transactions(user_id: str, stream, progress=None) -> dict:
+    """Parse a binary CSV stream incrementally and insert its rows batch by batch.
     
-    contents = await file.read()
-    csv_data = contents.decode('utf-8')
-    csv_reader = csv.DictReader(io.StringIO(csv_data))
+    `progress`, if given, is awaited after every batch with the running counters.
+    """
+    started = time.perf_counter()
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    rows = enumerate(reader, start=2)
     
     imported_count = 0
+    skipped_count = 0
+    processed = 0
     errors = []
-    
-    for row_num, row in enumerate(csv_reader, start=2):
+    occurrences = {}
+    while True:
         try:
-            transaction = Transaction(
-                user_id=user_id,
-                date=row.get('date', ''),
-                amount=float(row.get('amount', 0)),
-                description=row.get('description', ''),
-                category=row.get('category', ''),
-                type=row.get('type', 'expense')
-            )
-            
-            doc = transaction.model_dump()
-            doc['created_at'] = doc['created_at'].isoformat()
-            await db.transactions.insert_one(doc)
-            imported_count += 1
-        except Exception as e:
-            errors.append(f"Row {row_num}: {str(e)}")
+            batch = await asyncio.to_thread(read_csv_batch, rows, CSV_IMPORT_BATCH_ROWS)
+        except (UnicodeDecodeError, csv.Error) as e:
+            errors.append(f"Row {processed + 2}: {str(e)}")
+            break
+        if not batch:
+            break
+        processed += len(batch)
+        
+        docs = []
+        row_numbers = []
+        for row_num, row in batch:
+            try:
+                transaction = Transaction(
+                    user_id=user_id,
+                    date=row.get('date', ''),
+                    amount=float(row.get('amount', 0)),
+                    description=row.get('description', ''),
+                    category=row.get('category', ''),
+                    type=row.get('type', 'expense')
+                )
+                doc = transaction_doc(transaction)
+                content_key = transaction_content_hash(doc, 0)
+                occurrences[content_key] = occurrences.get(content_key, 0) + 1
+                doc['content_hash'] = transaction_content_hash(doc, occurrences[content_key] - 1)
+                docs.append(doc)
+                row_numbers.append(row_num)
+            except Exception as e:
+                errors.append(f"Row {row_num}: {str(e)}")
+        
+        inserted, skipped, failed = await insert_transaction_batch(user_id, docs)
+        skipped_count += skipped
+        for index, message in failed.items():
+            errors.append(f"Row {row_numbers[index]}: {message}")
+        imported_count += len(inserted)
+        if inserted:
+            await bump_data_version(user_id)
+        
+        if progress:
+            elapsed = time.perf_counter() - started
+            await progress({
+                'rows_processed': processed,
+                'rows_failed': len(errors),
+                'imported': imported_count,
+                'skipped': skipped_count,
+                'rows_per_second': round(processed / elapsed, 1) if elapsed > 0 else 0
+            })
     
+    elapsed = time.perf_counter() - started
+    rows_per_second = processed / elapsed if elapsed > 0 else 0
+    logger.info(
+        f"Imported {imported_count}/{processed} CSV rows ({skipped_count} duplicates) "
+        f"for {user_id} in {elapsed:.2f}s ({rows_per_second:.0f} rows/s)"
+    )
+    message = f'Imported {imported_count} transactions'
+    if skipped_count:
+        message += f', skipped {skipped_count} already imported'
     return {
-        'message': f'Imported {imported_count} transactions',
+        'message': message,
         'imported': imported_count,
-        'errors': errors if errors else None
+        'skipped': skipped_count,
+        'errors': errors if errors else None,
+        'rows_processed': processed,
+        'rows_failed': len(errors),
+        'rows_per_second': round(rows_per_second, 1)
     }
 
-@api_router.get('/export/csv')
-async def export_csv(fiscal_year: Optional[int] = None, user_id: str = Depends(get_current_user)):
-    """Export transactions to CSV"""
-    query = {'user_id': user_id}
+@api_router.post('/import/csv')
+async def import_csv(file: UploadFile = File(...), user_id: str = Depends(get_current_user)):
+    """Import transactions from CSV"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail='File must be a CSV')
     
-    if fiscal_year:
-        # Fiscal year: April of fiscal_year to March of fiscal_year+1
-        query['$or'] = []
-        for month in range(4, 13):
-            query['$or'].append({
-                'date': {'$regex': f'^{fiscal_year}-{month:02d}'}
-            })
-        for month in range(1, 4):
-            query['$or'].append({
-                'date': {'$regex': f'^{fiscal_year + 1}-{month:02d}'}
+    return await import_transactions(user_id, file.file)
+
+# Import jobs run in the background, at most IMPORT_JOB_CONCURRENCY at a time per process
+import_job_slots = asyncio.Semaphore(IMPORT_JOB_CONCURRENCY)
+import_job_tasks = set()
+# Owner recorded on this process's jobs; the random part tells apart a restarted process reusing a pid
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+def spool_upload(source, destination: str):
+    with open(destination, 'wb') as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+async def run_import_job(job_id: str, user_id: str, path: str):
+    try:
+        async with import_job_slots:
+            started_at = datetime.now(timezone.utc)
+            await storage.update_import_job(job_id, {'status': 'running', 'started_at': started_at, 'updated_at': started_at})
+            
+            async def report_progress(stats: dict):
+                await storage.update_import_job(job_id, {**stats, 'updated_at': datetime.now(timezone.utc)})
+            
+            with open(path, 'rb') as stream:
+                result = await import_transactions(user_id, stream, progress=report_progress)
+            await storage.update_import_job(job_id, {
+                'status': 'completed',
+                'message': result['message'],
+                'rows_processed': result['rows_processed'],
+                'rows_failed': result['rows_failed'],
+                'imported': result['imported'],
+                'skipped': result['skipped'],
+                'rows_per_second': result['rows_per_second'],
+                'errors': (result['errors'] or [])[:IMPORT_JOB_MAX_ERRORS],
+                'finished_at': datetime.now(timezone.utc)
             })
+    except Exception as e:
+        logger.exception(f"Import job {job_id} failed")
+        await storage.update_import_job(job_id, {
+            'status': 'failed',
+            'message': f'Import failed: {str(e)}',
+            'finished_at': datetime.now(timezone.utc)
+        })
+    finally:
+        os.unlink(path)
+
+@api_router.post('/import/jobs', response_model=ImportJob, status_code=status.HTTP_202_ACCEPTED)
+async def create_import_job(file: UploadFile = File(...), user_id: str = Depends(get_current_user)):
+    """Queue a CSV import and return its job immediately; poll GET /import/jobs/{id} for progress"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail='File must be a CSV')
     
-    transactions = await db.transactions.find(query, {'_id': 0}).to_list(10000)
+    # The upload is gone once this request ends, so keep a copy for the background task
+    handle, path = tempfile.mkstemp(prefix='import-', suffix='.csv')
+    os.close(handle)
+    await asyncio.to_thread(spool_upload, file.file, path)
     
-    output = io.StringIO()
-    fieldnames = ['date', 'type', 'category', 'description', 'amount']
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
+    job = ImportJob(user_id=user_id, filename=file.filename)
+    await storage.insert_import_job({**job.model_dump(), 'worker': WORKER_ID, 'updated_at': job.created_at})
     
+    task = asyncio.create_task(run_import_job(job.id, user_id, path))
+    import_job_tasks.add(task)
+    task.add_done_callback(import_job_tasks.discard)
+    return job
+
+@api_router.get('/import/jobs/{job_id}', response_model=ImportJob)
+async def get_import_job(job_id: str, user_id: str = Depends(get_current_user)):
+    job = await storage.find_import_job(user_id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Import job not found')
+    return job
+
+CSV_EXPORT_FIELDS = ['date', 'type', 'category', 'description', 'amount']
+CSV_EXPORT_CHUNK_ROWS = 1000
+
+async def stream_transactions_csv(user_id: str, start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """Yield CSV text in chunks of rows straight from storage, so memory stays flat"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_EXPORT_FIELDS)
     writer.writeheader()
-    for txn in transactions:
+    
+    rows = 0
+    async for txn in storage.stream_transactions(user_id, CSV_EXPORT_FIELDS, start_date, end_date, batch_size=CSV_EXPORT_CHUNK_ROWS):
         writer.writerow({
             'date': txn.get('date', ''),
             'type': txn.get('type', ''),
@@ -1033,35 +1781,53 @@ async def export_csv(fiscal_year: Optional[int] = None, user_id: str = Depends(g
             'description': txn.get('description', ''),
             'amount': txn.get('amount', 0)
         })
+        rows += 1
+        if rows % CSV_EXPORT_CHUNK_ROWS == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+    yield output.getvalue()
+
+@api_router.get('/export/csv')
+async def export_csv(request: Request, fiscal_year: Optional[int] = None, user_id: str = Depends(get_current_user)):
+    """Export transactions to CSV"""
+    headers, fresh = await conditional_get(request, user_id)
+    if fresh:
+        return not_modified(headers)
+    start_date, end_date = None, None
+    
+    if fiscal_year:
+        # Fiscal year: April of fiscal_year to March of fiscal_year+1
+        start_date, end_date = f'{fiscal_year}-04-01', f'{fiscal_year + 1}-03-31'
     
-    output.seek(0)
     filename = f"transactions_FY{fiscal_year}.csv" if fiscal_year else "transactions.csv"
     
     return StreamingResponse(
-        iter([output.getvalue()]),
+        stream_transactions_csv(user_id, start_date, end_date),
         media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+        headers={**headers, "Content-Disposition": f"attachment; filename={filename}"}
     )
 
 # Settings Routes
 @api_router.get('/settings')
 async def get_settings(user_id: str = Depends(get_current_user)):
-    settings = await db.settings.find_one({'user_id': user_id}, {'_id': 0})
-    if not settings:
-        settings = UserSettings(user_id=user_id)
-        await db.settings.insert_one(settings.model_dump())
-        return settings.model_dump()
-    return settings
+    return await storage.get_settings(user_id, UserSettings(user_id=user_id).model_dump(exclude={'user_id'}))
 
 @api_router.put('/settings')
 async def update_settings(currency: str, user_id: str = Depends(get_current_user)):
-    await db.settings.update_one(
-        {'user_id': user_id},
-        {'$set': {'currency': currency}},
-        upsert=True
-    )
+    await storage.update_settings(user_id, {'currency': currency})
     return {'message': 'Settings updated'}
 
+# Admin Routes
+@api_router.get('/admin/slow-operations')
+async def get_slow_operations(limit: int = Query(20, ge=1, le=200), user_id: str = Depends(get_admin_user)):
+    """Query shapes that spent the most time above the slow operation threshold"""
+    return await storage.slow_operation_summary(limit)
+
+@app.get('/metrics', include_in_schema=False)
+async def get_metrics():
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4')
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1075,8 +1841,19 @@ app.add_middleware(
 
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MIN_BYTES,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY
 )
 
+# Outermost, so the timings include CORS handling and every response is counted at its size on the wire
+app.add_middleware(MetricsMiddleware, metrics=metrics, count_round_trips=STORAGE_BACKEND == 'mongo')
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -1084,6 +1861,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    await storage.ensure_indexes()
+    asyncio.create_task(run_import_job_heartbeat())
+    # Backfill native date fields in the background so startup isn't held up
+    asyncio.create_task(run_transaction_date_migration())
+    asyncio.create_task(run_category_migration())
+    asyncio.create_task(run_recurring_scheduler())
+    await load_revocations()
+    asyncio.create_task(run_revocation_sync())
+    if SLOW_OPERATION_MS > 0:
+        slow_operations.bind(asyncio.get_running_loop())
+        asyncio.create_task(run_slow_operation_log())
+
+async def run_import_job_heartbeat():
+    while True:
+        try:
+            now = datetime.now(timezone.utc)
+            if import_job_tasks:
+                await storage.touch_import_jobs(WORKER_ID, now)
+            # Jobs whose process stopped get no more heartbeats and will never finish
+            stale_before = now - timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+            failed = await storage.fail_interrupted_import_jobs('Import interrupted by a server restart', stale_before)
+            if failed:
+                logger.warning(f"Failed {failed} import jobs left behind by a stopped process")
+        except Exception:
+            logger.exception("Import job heartbeat failed")
+        await asyncio.sleep(IMPORT_JOB_HEARTBEAT_SECONDS)
+
+async def run_transaction_date_migration():
+    try:
+        migrated = await storage.migrate_transaction_dates()
+        if migrated:
+            logger.info(f"Backfilled date fields on {migrated} transactions")
+        # A repair's $set can overwrite a concurrent write's $inc, so with live traffic the rollups
+        # are only built when there are none yet; drift is left to `manage.py rebuild-rollups`
+        if not await storage.has_monthly_totals():
+            drift = await storage.rebuild_monthly_totals()
+            if drift:
+                logger.info(f"Built {len(drift)} monthly rollups")
+        elif migrated:
+            drift = await storage.rebuild_monthly_totals(repair=False)
+            if drift:
+                logger.warning(
+                    f"{len(drift)} monthly rollups are missing newly dated transactions; "
+                    f"run `manage.py rebuild-rollups` while the app is quiet"
+                )
+    except Exception:
+        logger.exception("Transaction date migration failed")
+
+async def run_category_migration():
+    try:
+        migrated = await migrate_predefined_categories()
+        if migrated:
+            logger.info(f"Moved {migrated} users onto the shared category catalog")
+    except Exception:
+        logger.exception("Category catalog migration failed")
+
+async def run_recurring_scheduler():
+    # Every worker runs this; the unique occurrence index keeps concurrent runs from duplicating
+    while True:
+        try:
+            generated = await materialize_recurring()
+            if generated:
+                logger.info(f"Generated {sum(generated.values())} recurring transactions for {len(generated)} users")
+        except Exception:
+            logger.exception("Recurring transaction materializer failed")
+        await asyncio.sleep(RECURRING_SCHEDULE_SECONDS)
+
+async def run_revocation_sync():
+    synced_at = datetime.now(timezone.utc)
+    while True:
+        await asyncio.sleep(TOKEN_REVOCATION_SYNC_SECONDS)
+        # Overlap the window a little so writes committed during the last sync aren't missed
+        started = datetime.now(timezone.utc)
+        try:
+            await load_revocations(since=synced_at - timedelta(seconds=5))
+            synced_at = started
+        except Exception:
+            logger.exception("Token revocation sync failed")
+
+async def run_slow_operation_log():
+    while True:
+        record, command = await slow_operations.queue.get()
+        logger.warning(
+            f"Slow {record['command']} on {record['collection']} from {record['method']} {record['route']}: "
+            f"{record['duration_ms']:.0f} ms {record['shape']}"
+        )
+        try:
+            if SLOW_OPERATION_EXPLAIN and not record['failed']:
+                record['explain'] = await storage.explain_command(command)
+            await storage.record_slow_operation(record)
+        except Exception:
+            logger.exception("Could not record slow operation")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await storage.close()
@@ -0,0 +1,99 @@
+"""Slow MongoDB queries: which route sent them, what shape they had and how long they took.
+
+SlowOperationListener watches find and aggregate commands and hands any that
+cross the threshold to the event loop. Records carry the command's redacted
+shape, with every literal (user ids, dates, amounts) replaced by '?', so
+nothing a user entered reaches the log or the slow_operations collection, and
+the same query issued for different users groups under one shape id.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from pymongo import monitoring
+
+from metrics import current_request, route_template
+
+SLOW_COMMANDS = {'find', 'aggregate'}
+
+# Fields the driver adds around every command; they are not part of the query and an
+# explain of it rejects them
+DRIVER_FIELDS = {'lsid', 'txnNumber', 'autocommit', 'startTransaction', 'readConcern', 'writeConcern'}
+
+def redact(value):
+    """Replace every literal with '?', keeping field names, operators and $field paths"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        items = [redact(item) for item in value]
+        # A list of literals ($in values, a date range) has one shape whatever its length
+        return ['?'] if items and all(item == '?' for item in items) else items
+    if isinstance(value, str) and value.startswith('$'):
+        return value
+    return '?'
+
+def command_shape(command_name: str, command: dict) -> dict:
+    if command_name == 'aggregate':
+        return {'aggregate': command.get('aggregate'), 'pipeline': redact(command.get('pipeline', []))}
+    shape = {'find': command.get('find'), 'filter': redact(command.get('filter', {}))}
+    # Sort and projection name fields only, and they decide which index can serve the query
+    for key in ('sort', 'projection'):
+        if key in command:
+            shape[key] = dict(command[key])
+    return shape
+
+class SlowOperationListener(monitoring.CommandListener):
+    """Reports find and aggregate commands slower than `threshold_ms`"""
+    def __init__(self, threshold_ms: int, max_pending: int = 1000):
+        self.threshold_ms = threshold_ms
+        self.max_pending = max_pending
+        # (connection, request id) -> (command, request trace) until the command finishes
+        self.started_commands = {}
+        self.loop = None
+        self.queue = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop):
+        """Queue slow operations on `loop` as (record, command to explain); until bound they are dropped"""
+        self.queue = asyncio.Queue()
+        self.loop = loop
+
+    def started(self, event):
+        if event.command_name in SLOW_COMMANDS:
+            self.started_commands[(event.connection_id, event.request_id)] = (event.command, current_request.get())
+
+    def succeeded(self, event):
+        self.finish(event, failed=False)
+
+    def failed(self, event):
+        self.finish(event, failed=True)
+
+    def finish(self, event, failed: bool):
+        started = self.started_commands.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if started is None or duration_ms < self.threshold_ms or self.loop is None:
+            return
+        command, trace = started
+        shape = json.dumps(command_shape(event.command_name, command), default=str)
+        record = {
+            'shape_id': hashlib.sha1(shape.encode('utf-8')).hexdigest()[:16],
+            'shape': shape,
+            'command': event.command_name,
+            'collection': command.get(event.command_name),
+            'route': route_template(trace.scope) if trace else None,
+            'method': trace.scope['method'] if trace else None,
+            'duration_ms': round(duration_ms, 3),
+            'failed': failed,
+            'at': datetime.now(timezone.utc)
+        }
+        explainable = {key: value for key, value in command.items() if key not in DRIVER_FIELDS and not key.startswith('$')}
+        try:
+            self.loop.call_soon_threadsafe(self.enqueue, record, explainable)
+        except RuntimeError:
+            # The loop closed during shutdown
+            pass
+
+    def enqueue(self, record: dict, command: dict):
+        # Shed records rather than grow without bound when the log falls behind
+        if self.queue.qsize() < self.max_pending:
+            self.queue.put_nowait((record, command))
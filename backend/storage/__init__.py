@@ -0,0 +1,14 @@
+from storage.base import IMPORT_JOB_RETENTION_SECONDS, ConflictError, DuplicateError, Storage, StorageError, transaction_date_fields
+from storage.mongo import MongoStorage
+from storage.sqlite import SQLiteStorage
+
+__all__ = [
+    'IMPORT_JOB_RETENTION_SECONDS',
+    'ConflictError',
+    'DuplicateError',
+    'MongoStorage',
+    'SQLiteStorage',
+    'Storage',
+    'StorageError',
+    'transaction_date_fields',
+]
@@ -0,0 +1,338 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+# Finished import jobs are kept this long for polling clients
+IMPORT_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+
+class StorageError(Exception):
+    """A write the backend rejected"""
+
+class DuplicateError(StorageError):
+    """A write that would break a unique key"""
+
+class ConflictError(StorageError):
+    """A write skipped because the document changed after it was read"""
+
+def transaction_date_fields(date: str) -> dict:
+    """Derive the native date and year-month period stored next to a transaction's date string"""
+    try:
+        parsed = datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+    except (TypeError, ValueError):
+        # Unparseable dates are kept as-is but excluded from analytics
+        return {'date_at': None, 'period': None}
+    return {'date_at': parsed, 'period': parsed.strftime('%Y-%m')}
+
+class Storage(ABC):
+    """Everything the API reads and writes, as plain dicts in and out.
+
+    Documents look the same whichever backend holds them; transaction writes also keep the
+    backend's analytics (rollups or indexes) in step, so callers never maintain them.
+    A backend implements every abstract method; the maintenance and slow-log hooks have defaults.
+    """
+    name = 'base'
+
+    @abstractmethod
+    async def ensure_indexes(self) -> list:
+        """Create the schema and indexes; returns (collection, index, error) for any that failed"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def explain_query_shapes(self) -> list:
+        """Plan stages for each query shape the routes issue, flagging full collection scans"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(self):
+        raise NotImplementedError
+
+    # Maintenance of data written by older versions; backends without such data have nothing to do
+    async def migrate_transaction_dates(self, batch_size: int = 1000) -> int:
+        return 0
+
+    async def migrate_predefined_categories(self, catalog: dict, force: bool = False) -> List[str]:
+        """Collapse per-user copies of the catalog; returns the ids of the users migrated.
+
+        Backends that record a completed run skip later ones unless `force` is set.
+        """
+        return []
+
+    async def has_monthly_totals(self) -> bool:
+        return True
+
+    async def rebuild_monthly_totals(self, user_id: Optional[str] = None, repair: bool = True) -> list:
+        return []
+
+    # Users and sessions
+    @abstractmethod
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        """The user without their password hash"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_user(self, doc: dict):
+        """Raises DuplicateError when the email is taken"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_password(self, user_id: str, current: str, replacement: str):
+        """Swap the password hash, unless it changed since `current` was read"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set_tokens_valid_after(self, user_id: str, cutoff: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_tokens_valid_after(self, since: Optional[float] = None) -> List[Tuple[str, float]]:
+        """(user id, cut-off) for every user signed out everywhere, or only at or after `since`"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def revoke_token(self, jti: str, user_id: str, expires_at: datetime):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_revoked_tokens(self, since: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """(jti, expiry) revoked at or after `since`, or every one that has not expired yet"""
+        raise NotImplementedError
+
+    # Per-user data version, counting writes to what analytics are computed from, and the time of the
+    # latest write to anything listed back to the user; both are stored so every process sees the
+    # others' writes
+    @abstractmethod
+    async def bump_data_version(self, user_id: str, modified_at: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def data_version(self, user_id: str) -> int:
+        """0 until the user's first write"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def mark_modified(self, user_id: str, modified_at: float):
+        """Record a write that doesn't change the data version; an earlier time than the stored one is ignored"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def last_modified(self, user_id: str) -> Optional[float]:
+        """None until the user's first write"""
+        raise NotImplementedError
+
+    # Settings
+    @abstractmethod
+    async def insert_settings(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_settings(self, user_id: str, defaults: dict) -> dict:
+        """The user's settings, created from `defaults` on first read"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_settings(self, user_id: str, changes: dict):
+        raise NotImplementedError
+
+    # Categories
+    @abstractmethod
+    async def find_categories(self, user_id: str) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_category(self, user_id: str, category_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_category(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_category(self, user_id: str, category_id: str, changes: dict, on_insert: Optional[dict] = None) -> bool:
+        """Apply `changes`, inserting the category with `on_insert` as well when given and missing.
+
+        Returns whether a category matched (always True for an upsert).
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_category(self, user_id: str, category_id: str) -> bool:
+        raise NotImplementedError
+
+    # Transactions
+    @abstractmethod
+    async def find_transactions(
+        self,
+        user_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        type: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sort: str = 'date',
+        descending: bool = True,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> list:
+        """Filtered transactions ordered by (sort, id); `after` is the (value, id) keyset to resume from.
+
+        With `fields`, only those fields of each transaction are read.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_transactions_by_id(self, user_id: str, ids: Iterable[str]) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def stream_transactions(
+        self,
+        user_id: str,
+        fields: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> AsyncIterator[dict]:
+        """Yield `fields` of the user's transactions in (date, id) order without loading them all"""
+        raise NotImplementedError
+        yield
+
+    @abstractmethod
+    async def ledger_rows(self, user_id: str) -> list:
+        """date, amount, type and category of every transaction, for the columnar engine"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_transaction(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_transaction(self, user_id: str, transaction_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_transactions(self, docs: list) -> Dict[int, StorageError]:
+        """Insert unordered; returns the error for each doc that was not written"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_transactions(self, user_id: str, updates: List[Tuple[str, dict]]) -> list:
+        """Apply (id, changes) pairs unordered; per pair True, False when not found, or the StorageError"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_transactions(self, user_id: str, ids: List[str]) -> list:
+        """Delete unordered; per id True, False when not found, or the StorageError"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_content_hashes(self, user_id: str, hashes: List[str]) -> set:
+        """The subset of import content hashes already stored for the user"""
+        raise NotImplementedError
+
+    # Analytics, over rows shaped {period, type, category, total, count}
+    @abstractmethod
+    async def period_totals(self, user_id: str, periods: Iterable[str], type: Optional[str] = None) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def series_totals(self, user_id: str, start: str, end: str) -> list:
+        """{period, type, total} per period in an inclusive 'YYYY-MM' range"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def balance_totals(self, user_id: str) -> dict:
+        """All-time total per transaction type"""
+        raise NotImplementedError
+
+    # Budgets
+    @abstractmethod
+    async def find_budgets(self, user_id: str, month: Optional[int] = None, year: Optional[int] = None) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def upsert_budgets(self, docs: list, overwrite: bool = True) -> dict:
+        """Upsert on (user_id, category, month, year); without overwrite existing amounts are kept.
+
+        Returns the number of budgets created and updated.
+        """
+        raise NotImplementedError
+
+    # Recurring rules
+    @abstractmethod
+    async def find_recurring(self, user_id: str) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_recurring_rule(self, user_id: str, rule_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_recurring(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_recurring(self, user_id: str, rule_id: str, changes: dict) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_recurring(self, user_id: str, rule_id: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def active_recurring_batches(self, batch_size: int, user_id: Optional[str] = None, rule_id: Optional[str] = None) -> AsyncIterator[list]:
+        """Yield active rules, optionally one user's or a single rule, `batch_size` at a time"""
+        raise NotImplementedError
+        yield
+
+    @abstractmethod
+    async def set_generated_through(self, periods: Dict[str, str]):
+        """Record the last period materialized for each rule id"""
+        raise NotImplementedError
+
+    # Import jobs
+    @abstractmethod
+    async def insert_import_job(self, doc: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_import_job(self, job_id: str, changes: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def find_import_job(self, user_id: str, job_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def touch_import_jobs(self, worker: str, at: datetime):
+        """Heartbeat: set updated_at on the queued and running jobs owned by `worker`"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def fail_interrupted_import_jobs(self, message: str, stale_before: datetime) -> int:
+        """Mark queued or running jobs as failed when their heartbeat stopped before `stale_before`.
+
+        Jobs written before they carried a heartbeat go by their created_at instead.
+        """
+        raise NotImplementedError
+
+    # Slow operation log; only backends whose commands are monitored have anything to record
+    async def explain_command(self, command: dict) -> Optional[dict]:
+        """Plan stages and execution counters from re-running a slow query"""
+        return None
+
+    async def record_slow_operation(self, doc: dict):
+        pass
+
+    async def slow_operation_summary(self, limit: int = 20) -> list:
+        """The slow operations that took the most time in total, grouped by shape_id"""
+        return []
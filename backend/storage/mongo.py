@@ -0,0 +1,856 @@
+import logging
+from calendar import monthrange
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, UpdateOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from storage.base import IMPORT_JOB_RETENTION_SECONDS, ConflictError, DuplicateError, Storage, StorageError, transaction_date_fields
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+NAMESPACE_EXISTS_ERROR = 48
+
+# Id of the migrations document recording that the category catalog migration has completed
+CATEGORY_MIGRATION = 'predefined_categories'
+
+# Slow operations are kept in a capped collection, so the oldest make way for new ones
+SLOW_OPERATION_LOG_BYTES = 16 * 1024 * 1024
+
+# Indexes, ensured at startup. Every query a route issues should be served by one of them;
+# `manage.py explain` checks that against QUERY_SHAPES below.
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email', unique=True),
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('tokens_valid_after', ASCENDING)], name='tokens_valid_after', sparse=True),
+    ],
+    'settings': [
+        IndexModel([('user_id', ASCENDING)], name='user_id', unique=True),
+    ],
+    'categories': [
+        IndexModel([('user_id', ASCENDING), ('id', ASCENDING)], name='user_id_id', unique=True),
+    ],
+    'transactions': [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('user_id', ASCENDING), ('type', ASCENDING), ('period', ASCENDING)], name='user_type_period'),
+        IndexModel([('user_id', ASCENDING), ('date_at', ASCENDING)], name='user_date_at'),
+        # Keyset pagination for each sort key offered by GET /transactions
+        IndexModel([('user_id', ASCENDING), ('date', ASCENDING), ('id', ASCENDING)], name='user_date_id'),
+        IndexModel([('user_id', ASCENDING), ('amount', ASCENDING), ('id', ASCENDING)], name='user_amount_id'),
+        IndexModel([('user_id', ASCENDING), ('created_at', ASCENDING), ('id', ASCENDING)], name='user_created_at_id'),
+        # One materialized occurrence per recurring rule and date
+        IndexModel(
+            [('user_id', ASCENDING), ('recurring_id', ASCENDING), ('date', ASCENDING)],
+            name='user_recurring_date', unique=True,
+            partialFilterExpression={'recurring_id': {'$type': 'string'}}
+        ),
+        # Imported rows carry a content hash so re-importing an overlapping file skips them
+        IndexModel(
+            [('user_id', ASCENDING), ('content_hash', ASCENDING)],
+            name='user_content_hash',
+            unique=True,
+            partialFilterExpression={'content_hash': {'$exists': True}}
+        ),
+    ],
+    'monthly_totals': [
+        IndexModel(
+            [('user_id', ASCENDING), ('period', ASCENDING), ('type', ASCENDING), ('category', ASCENDING)],
+            name='user_period_type_category',
+            unique=True
+        ),
+    ],
+    'budgets': [
+        IndexModel(
+            [('user_id', ASCENDING), ('category', ASCENDING), ('month', ASCENDING), ('year', ASCENDING)],
+            name='user_category_month_year', unique=True
+        ),
+        IndexModel([('user_id', ASCENDING), ('year', ASCENDING), ('month', ASCENDING)], name='user_year_month'),
+    ],
+    'recurring_transactions': [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('user_id', ASCENDING)], name='user_id'),
+        # The scheduler walks every active rule
+        IndexModel([('is_active', ASCENDING), ('user_id', ASCENDING)], name='is_active_user_id'),
+    ],
+    'import_jobs': [
+        IndexModel([('id', ASCENDING)], name='id', unique=True),
+        IndexModel([('created_at', ASCENDING)], name='created_at_ttl', expireAfterSeconds=IMPORT_JOB_RETENTION_SECONDS),
+        # Heartbeats and the sweep for jobs whose process stopped
+        IndexModel([('status', ASCENDING), ('updated_at', ASCENDING)], name='status_updated_at'),
+    ],
+    'revoked_tokens': [
+        IndexModel([('jti', ASCENDING)], name='jti', unique=True),
+        IndexModel([('revoked_at', ASCENDING)], name='revoked_at'),
+        IndexModel([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0),
+    ],
+}
+
+# Representative filters (and sorts) for the queries routes issue, used by `manage.py explain`.
+# Values are placeholders; only the shape matters to the planner.
+QUERY_SHAPES = [
+    ('login', 'users', {'email': 'user@example.com'}, None),
+    ('current user', 'users', {'id': 'user'}, None),
+    ('settings', 'settings', {'user_id': 'user'}, None),
+    ('list categories', 'categories', {'user_id': 'user'}, None),
+    ('category by id', 'categories', {'id': 'category', 'user_id': 'user'}, None),
+    ('list transactions', 'transactions', {'user_id': 'user'}, [('date', -1), ('id', -1)]),
+    ('filter transactions', 'transactions', {
+        'user_id': 'user', 'date': {'$gte': '2025-01-01', '$lte': '2025-01-31'}, 'type': 'expense'
+    }, [('date', -1), ('id', -1)]),
+    ('transactions by amount', 'transactions', {'user_id': 'user', 'amount': {'$gte': 10}}, [('amount', 1), ('id', 1)]),
+    ('transaction by id', 'transactions', {'id': 'transaction', 'user_id': 'user'}, None),
+    ('bulk transactions', 'transactions', {'user_id': 'user', 'id': {'$in': ['a', 'b']}}, None),
+    ('import dedupe', 'transactions', {'user_id': 'user', 'content_hash': {'$in': ['hash']}}, None),
+    ('export', 'transactions', {'user_id': 'user'}, [('date', 1), ('id', 1)]),
+    ('period totals', 'monthly_totals', {
+        'user_id': 'user', 'period': {'$in': ['2025-01', '2025-02']}, 'count': {'$gt': 0}, 'type': 'expense'
+    }, None),
+    ('series totals', 'monthly_totals', {'user_id': 'user', 'period': {'$gte': '2024-01', '$lte': '2025-12'}}, None),
+    ('month budgets', 'budgets', {'user_id': 'user', 'month': 1, 'year': 2025}, None),
+    ('recurring rules', 'recurring_transactions', {'user_id': 'user'}, None),
+    ('recurring rule by id', 'recurring_transactions', {'id': 'rule', 'user_id': 'user'}, None),
+    ('due recurring rules', 'recurring_transactions', {'is_active': True}, None),
+    ('import job', 'import_jobs', {'id': 'job', 'user_id': 'user'}, None),
+    ('import job heartbeat', 'import_jobs', {'status': {'$in': ['queued', 'running']}, 'worker': 'worker'}, None),
+    ('stale import jobs', 'import_jobs', {
+        'status': {'$in': ['queued', 'running']}, 'updated_at': {'$lt': datetime(2025, 1, 1, tzinfo=timezone.utc)}
+    }, None),
+    ('revocation sync', 'revoked_tokens', {'revoked_at': {'$gte': datetime(2025, 1, 1, tzinfo=timezone.utc)}}, None),
+    ('sign-out sync', 'users', {'tokens_valid_after': {'$gte': 0}}, None),
+]
+
+# Monthly rollups
+ROLLUP_KEY = ('user_id', 'period', 'type', 'category')
+
+def rollup_key(doc: dict):
+    return tuple(doc.get(field) for field in ROLLUP_KEY)
+
+# A transaction's fields that its rollup row and total depend on
+ROLLUP_FIELDS = ('amount', 'type', 'category', 'period')
+
+def rollup_guard(doc: dict) -> dict:
+    """Filter matching a transaction only while its rollup fields are still as read"""
+    return {'id': doc['id'], 'user_id': doc['user_id'], **{field: doc.get(field) for field in ROLLUP_FIELDS}}
+
+def rollup_fields(doc: dict) -> tuple:
+    return tuple(doc.get(field) for field in ROLLUP_FIELDS)
+
+def plan_stages(plan: dict):
+    yield plan.get('stage')
+    for child in plan.get('inputStages', []) + [plan[key] for key in ('inputStage', 'queryPlan') if key in plan]:
+        yield from plan_stages(child)
+
+def write_errors(error: BulkWriteError) -> Dict[int, StorageError]:
+    """Failed operation index to error for an unordered bulk write"""
+    errors = {}
+    for item in error.details.get('writeErrors', []):
+        message = item.get('errmsg', 'write failed')
+        errors[item['index']] = DuplicateError(message) if item.get('code') == DUPLICATE_KEY_ERROR else StorageError(message)
+    return errors
+
+class MongoStorage(Storage):
+    """Motor-backed storage; analytics read the monthly_totals rollups kept beside transactions"""
+    name = 'mongo'
+
+    def __init__(self, url: str, db_name: str, event_listeners: Optional[list] = None):
+        self.client = AsyncIOMotorClient(url, event_listeners=event_listeners or [])
+        self.db = self.client[db_name]
+
+    async def close(self):
+        self.client.close()
+
+    async def dedupe_budgets(self) -> int:
+        """Drop all but the newest budget per (user, category, month, year) so the unique index can build"""
+        duplicates = self.db.budgets.aggregate([
+            {'$sort': {'created_at': -1}},
+            {'$group': {
+                '_id': {'user_id': '$user_id', 'category': '$category', 'month': '$month', 'year': '$year'},
+                'ids': {'$push': '$_id'}
+            }},
+            {'$match': {'ids.1': {'$exists': True}}}
+        ])
+        removed = 0
+        async for group in duplicates:
+            result = await self.db.budgets.delete_many({'_id': {'$in': group['ids'][1:]}})
+            removed += result.deleted_count
+        return removed
+
+    async def repair_recurring_occurrences(self) -> int:
+        """Clamp generated dates past the month end (e.g. 2025-02-31) and drop duplicate occurrences.
+
+        Older generators wrote both; the unique (user_id, recurring_id, date) index needs them gone.
+        """
+        if 'user_recurring_date' in await self.db.transactions.index_information():
+            return 0
+        repaired = 0
+        invalid = self.db.transactions.find(
+            {'recurring_id': {'$type': 'string'}, 'date': {'$regex': r'-(29|30|31)$'}},
+            {'_id': 0}
+        )
+        async for txn in invalid:
+            try:
+                year, month, day = (int(part) for part in txn['date'].split('-'))
+                last_day = monthrange(year, month)[1]
+                if day <= last_day:
+                    continue
+            except (TypeError, ValueError):
+                continue
+            fixed = {'date': f"{year}-{month:02d}-{last_day:02d}"}
+            fixed.update(transaction_date_fields(fixed['date']))
+            await self.db.transactions.update_one({'id': txn['id']}, {'$set': fixed})
+            await self.update_monthly_totals(added=[{**txn, **fixed}], removed=[txn])
+            repaired += 1
+
+        duplicates = self.db.transactions.aggregate([
+            {'$match': {'recurring_id': {'$type': 'string'}}},
+            {'$group': {
+                '_id': {'user_id': '$user_id', 'recurring_id': '$recurring_id', 'date': '$date'},
+                'ids': {'$push': '$id'}
+            }},
+            {'$match': {'ids.1': {'$exists': True}}}
+        ])
+        async for group in duplicates:
+            extra = await self.db.transactions.find({'id': {'$in': group['ids'][1:]}}, {'_id': 0}).to_list(None)
+            await self.db.transactions.delete_many({'id': {'$in': group['ids'][1:]}})
+            await self.update_monthly_totals(removed=extra)
+            repaired += len(extra)
+        return repaired
+
+    async def ensure_indexes(self) -> list:
+        """Create the declared indexes one at a time and return the ones that failed to build.
+
+        A unique index can fail on existing duplicates; that is logged rather than keeping the app down.
+        """
+        await self.dedupe_budgets()
+        await self.repair_recurring_occurrences()
+        await self.create_slow_operation_log()
+        failed = []
+        for collection, indexes in INDEXES.items():
+            for index in indexes:
+                try:
+                    await self.db[collection].create_indexes([index])
+                except OperationFailure as e:
+                    logger.error(f"Could not create index {collection}.{index.document['name']}: {e}")
+                    failed.append((collection, index.document['name'], str(e)))
+        return failed
+
+    async def create_slow_operation_log(self):
+        try:
+            await self.db.create_collection('slow_operations', capped=True, size=SLOW_OPERATION_LOG_BYTES)
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            # Another process created it first
+            if e.code != NAMESPACE_EXISTS_ERROR:
+                raise
+
+    async def explain_query_shapes(self) -> list:
+        """Winning plan stages for every entry in QUERY_SHAPES"""
+        results = []
+        for name, collection, query, sort in QUERY_SHAPES:
+            command = {'find': collection, 'filter': query}
+            if sort:
+                command['sort'] = dict(sort)
+            explained = await self.db.command('explain', command, verbosity='queryPlanner')
+            stages = [stage for stage in plan_stages(explained['queryPlanner']['winningPlan']) if stage]
+            results.append({'name': name, 'collection': collection, 'stages': stages, 'collscan': 'COLLSCAN' in stages})
+        return results
+
+    async def migrate_transaction_dates(self, batch_size: int = 1000) -> int:
+        """Backfill date_at/period on transactions written before they were stored"""
+        migrated = 0
+        batch = []
+        cursor = self.db.transactions.find({'period': {'$exists': False}}, {'_id': 1, 'date': 1})
+        async for txn in cursor:
+            batch.append(UpdateOne({'_id': txn['_id']}, {'$set': transaction_date_fields(txn.get('date'))}))
+            if len(batch) >= batch_size:
+                await self.db.transactions.bulk_write(batch, ordered=False)
+                migrated += len(batch)
+                batch = []
+        if batch:
+            await self.db.transactions.bulk_write(batch, ordered=False)
+            migrated += len(batch)
+        return migrated
+
+    async def migrate_predefined_categories(self, catalog: dict, force: bool = False) -> List[str]:
+        """Collapse per-user copies of the predefined categories onto the shared catalog.
+
+        Untouched copies are deleted. Edited copies are kept as they are, and the catalog entries
+        they replaced are hidden for that user so the renamed category is not listed twice.
+        The hidden overrides also mark the user as migrated, see list_categories in server.py.
+        A completed run is recorded in the migrations collection and later runs return at once,
+        since edited copies keep matching the scan; `force` runs it again anyway.
+        """
+        if not force and await self.db.migrations.find_one({'_id': CATEGORY_MIGRATION}):
+            return []
+        catalog_by_name = {(entry['type'], entry['name']): category_id for category_id, entry in catalog.items()}
+        copies = self.db.categories.find(
+            {'is_predefined': True, 'id': {'$nin': list(catalog)}},
+            {'_id': 0, 'id': 1, 'user_id': 1, 'name': 1, 'type': 1}
+        ).sort('user_id', ASCENDING)
+
+        migrated = []
+        user_docs = []
+        async for doc in copies:
+            if user_docs and doc['user_id'] != user_docs[0]['user_id']:
+                if await self.collapse_category_copies(user_docs, catalog, catalog_by_name):
+                    migrated.append(user_docs[0]['user_id'])
+                user_docs = []
+            user_docs.append(doc)
+        if user_docs and await self.collapse_category_copies(user_docs, catalog, catalog_by_name):
+            migrated.append(user_docs[0]['user_id'])
+
+        await self.db.migrations.update_one(
+            {'_id': CATEGORY_MIGRATION},
+            {'$set': {'completed_at': datetime.now(timezone.utc), 'users': len(migrated)}},
+            upsert=True
+        )
+        return migrated
+
+    async def collapse_category_copies(self, docs: list, catalog: dict, catalog_by_name: dict) -> bool:
+        """Migrate one user's copies; False when the user was migrated already"""
+        user_id = docs[0]['user_id']
+        # Users with catalog overrides were migrated already; what's left are their edited copies
+        if await self.db.categories.find_one({'user_id': user_id, 'id': {'$in': list(catalog)}}, {'_id': 1}):
+            return False
+        operations = []
+        untouched = set()
+        for doc in docs:
+            category_id = catalog_by_name.get((doc['type'], doc['name']))
+            if category_id and category_id not in untouched:
+                untouched.add(category_id)
+                operations.append(DeleteOne({'id': doc['id'], 'user_id': user_id}))
+        for category_id in catalog.keys() - untouched:
+            entry = catalog[category_id]
+            operations.append(UpdateOne(
+                {'id': category_id, 'user_id': user_id},
+                {'$setOnInsert': {
+                    'name': entry['name'],
+                    'type': entry['type'],
+                    'is_predefined': True,
+                    'hidden': True,
+                    'created_at': entry['created_at'].isoformat()
+                }},
+                upsert=True
+            ))
+        await self.db.categories.bulk_write(operations, ordered=False)
+        return True
+
+    async def update_monthly_totals(self, added: list = (), removed: list = ()):
+        """Apply $inc deltas to monthly_totals for inserted and removed transaction docs"""
+        deltas = {}
+        for docs, sign in ((added, 1), (removed, -1)):
+            for doc in docs:
+                if not doc.get('period'):
+                    continue
+                total, count = deltas.get(rollup_key(doc), (0, 0))
+                deltas[rollup_key(doc)] = (total + sign * doc['amount'], count + sign)
+
+        operations = []
+        for key, (total, count) in deltas.items():
+            if total == 0 and count == 0:
+                continue
+            year, month = key[1].split('-')
+            operations.append(UpdateOne(
+                dict(zip(ROLLUP_KEY, key)),
+                {
+                    '$inc': {'total': total, 'count': count},
+                    '$setOnInsert': {'year': int(year), 'month': int(month)}
+                },
+                upsert=True
+            ))
+        if operations:
+            await self.db.monthly_totals.bulk_write(operations, ordered=False)
+
+    async def has_monthly_totals(self) -> bool:
+        return bool(await self.db.monthly_totals.estimated_document_count())
+
+    async def rebuild_monthly_totals(self, user_id: Optional[str] = None, repair: bool = True) -> list:
+        """Recompute rollups from raw transactions and report (and optionally fix) any drift.
+
+        Writes racing with a repair can be overwritten, so run it while the app is quiet.
+        """
+        match = {'period': {'$ne': None}}
+        if user_id:
+            match['user_id'] = user_id
+        pipeline = [
+            {'$match': match},
+            {
+                '$group': {
+                    '_id': {field: f'${field}' for field in ROLLUP_KEY},
+                    'total': {'$sum': '$amount'},
+                    'count': {'$sum': 1}
+                }
+            }
+        ]
+        expected = {}
+        async for row in self.db.transactions.aggregate(pipeline):
+            expected[rollup_key(row['_id'])] = (row['total'], row['count'])
+
+        stored_query = {'user_id': user_id} if user_id else {}
+        stored = {}
+        async for row in self.db.monthly_totals.find(stored_query, {'_id': 0}):
+            stored[rollup_key(row)] = (row.get('total', 0), row.get('count', 0))
+
+        drift = []
+        operations = []
+        for key in expected.keys() | stored.keys():
+            want_total, want_count = expected.get(key, (0, 0))
+            have_total, have_count = stored.get(key, (0, 0))
+            if want_count == have_count and abs(want_total - have_total) < 0.005:
+                continue
+            drift.append({
+                **dict(zip(ROLLUP_KEY, key)),
+                'expected_total': want_total,
+                'stored_total': have_total,
+                'expected_count': want_count,
+                'stored_count': have_count
+            })
+            if key not in expected:
+                operations.append(DeleteOne(dict(zip(ROLLUP_KEY, key))))
+            else:
+                year, month = key[1].split('-')
+                operations.append(UpdateOne(
+                    dict(zip(ROLLUP_KEY, key)),
+                    {'$set': {'total': want_total, 'count': want_count, 'year': int(year), 'month': int(month)}},
+                    upsert=True
+                ))
+
+        if repair and operations:
+            await self.db.monthly_totals.bulk_write(operations, ordered=False)
+        return drift
+
+    # Users and sessions
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.db.users.find_one({'email': email}, {'_id': 0, 'data_version': 0, 'data_modified_at': 0})
+
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        return await self.db.users.find_one({'id': user_id}, {'_id': 0, 'password': 0, 'data_version': 0, 'data_modified_at': 0})
+
+    async def insert_user(self, doc: dict):
+        try:
+            await self.db.users.insert_one(doc)
+        except DuplicateKeyError as e:
+            raise DuplicateError(str(e))
+
+    async def update_password(self, user_id: str, current: str, replacement: str):
+        await self.db.users.update_one({'id': user_id, 'password': current}, {'$set': {'password': replacement}})
+
+    async def set_tokens_valid_after(self, user_id: str, cutoff: float):
+        await self.db.users.update_one({'id': user_id}, {'$set': {'tokens_valid_after': cutoff}})
+
+    async def find_tokens_valid_after(self, since: Optional[float] = None) -> list:
+        query = {'tokens_valid_after': {'$gte': since}} if since is not None else {'tokens_valid_after': {'$exists': True}}
+        cursor = self.db.users.find(query, {'_id': 0, 'id': 1, 'tokens_valid_after': 1})
+        return [(user['id'], user['tokens_valid_after']) async for user in cursor]
+
+    async def revoke_token(self, jti: str, user_id: str, expires_at: datetime):
+        await self.db.revoked_tokens.update_one(
+            {'jti': jti},
+            {'$setOnInsert': {
+                'user_id': user_id,
+                'expires_at': expires_at,
+                'revoked_at': datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def find_revoked_tokens(self, since: Optional[datetime] = None) -> list:
+        query = {'revoked_at': {'$gte': since}} if since else {'expires_at': {'$gt': datetime.now(timezone.utc)}}
+        cursor = self.db.revoked_tokens.find(query, {'_id': 0, 'jti': 1, 'expires_at': 1})
+        return [(revoked['jti'], revoked['expires_at'].replace(tzinfo=timezone.utc)) async for revoked in cursor]
+
+    async def bump_data_version(self, user_id: str, modified_at: float):
+        await self.db.users.update_one({'id': user_id}, {'$inc': {'data_version': 1}, '$max': {'data_modified_at': modified_at}})
+
+    async def data_version(self, user_id: str) -> int:
+        user = await self.db.users.find_one({'id': user_id}, {'_id': 0, 'data_version': 1})
+        return (user or {}).get('data_version', 0)
+
+    async def mark_modified(self, user_id: str, modified_at: float):
+        await self.db.users.update_one({'id': user_id}, {'$max': {'data_modified_at': modified_at}})
+
+    async def last_modified(self, user_id: str) -> Optional[float]:
+        user = await self.db.users.find_one({'id': user_id}, {'_id': 0, 'data_modified_at': 1})
+        return (user or {}).get('data_modified_at')
+
+    # Settings
+    async def insert_settings(self, doc: dict):
+        await self.db.settings.insert_one(doc)
+
+    async def get_settings(self, user_id: str, defaults: dict) -> dict:
+        # Upsert so concurrent first reads can't both insert defaults
+        return await self.db.settings.find_one_and_update(
+            {'user_id': user_id},
+            {'$setOnInsert': defaults},
+            projection={'_id': 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def update_settings(self, user_id: str, changes: dict):
+        await self.db.settings.update_one({'user_id': user_id}, {'$set': changes}, upsert=True)
+
+    # Categories
+    async def find_categories(self, user_id: str) -> list:
+        return await self.db.categories.find({'user_id': user_id}, {'_id': 0}).to_list(None)
+
+    async def find_category(self, user_id: str, category_id: str) -> Optional[dict]:
+        return await self.db.categories.find_one({'id': category_id, 'user_id': user_id}, {'_id': 0})
+
+    async def insert_category(self, doc: dict):
+        await self.db.categories.insert_one(doc)
+
+    async def update_category(self, user_id: str, category_id: str, changes: dict, on_insert: Optional[dict] = None) -> bool:
+        update = {'$set': changes}
+        if on_insert is not None:
+            update['$setOnInsert'] = on_insert
+        result = await self.db.categories.update_one(
+            {'id': category_id, 'user_id': user_id},
+            update,
+            upsert=on_insert is not None
+        )
+        return result.matched_count > 0 or result.upserted_id is not None
+
+    async def delete_category(self, user_id: str, category_id: str) -> bool:
+        result = await self.db.categories.delete_one({'id': category_id, 'user_id': user_id})
+        return result.deleted_count > 0
+
+    # Transactions
+    async def find_transactions(
+        self,
+        user_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        type: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sort: str = 'date',
+        descending: bool = True,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> list:
+        query = {'user_id': user_id}
+        if start_date or end_date:
+            query['date'] = {}
+            if start_date:
+                query['date']['$gte'] = start_date
+            if end_date:
+                query['date']['$lte'] = end_date
+        if type:
+            query['type'] = type
+        if categories:
+            query['category'] = {'$in': categories}
+        if min_amount is not None or max_amount is not None:
+            query['amount'] = {}
+            if min_amount is not None:
+                query['amount']['$gte'] = min_amount
+            if max_amount is not None:
+                query['amount']['$lte'] = max_amount
+
+        # Keyset pagination: continue strictly after the (sort value, id) of the last row seen
+        direction = DESCENDING if descending else ASCENDING
+        if after:
+            value, last_id = after
+            beyond = '$lt' if descending else '$gt'
+            query['$and'] = [{'$or': [{sort: {beyond: value}}, {sort: value, 'id': {beyond: last_id}}]}]
+
+        projection = {'_id': 0, **dict.fromkeys(fields, 1)} if fields else {'_id': 0}
+        find = self.db.transactions.find(query, projection).sort([(sort, direction), ('id', direction)])
+        if limit:
+            find = find.limit(limit)
+        return await find.to_list(None)
+
+    async def find_transactions_by_id(self, user_id: str, ids: Iterable[str]) -> Dict[str, dict]:
+        docs = await self.db.transactions.find({'user_id': user_id, 'id': {'$in': list(ids)}}, {'_id': 0}).to_list(None)
+        return {doc['id']: doc for doc in docs}
+
+    async def stream_transactions(self, user_id: str, fields: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None, batch_size: int = 1000):
+        query = {'user_id': user_id}
+        if start_date or end_date:
+            query['date'] = {}
+            if start_date:
+                query['date']['$gte'] = start_date
+            if end_date:
+                query['date']['$lte'] = end_date
+        projection = {'_id': 0, **{field: 1 for field in fields}}
+        cursor = self.db.transactions.find(query, projection).sort([('date', ASCENDING), ('id', ASCENDING)])
+        async for txn in cursor.batch_size(batch_size):
+            yield txn
+
+    async def ledger_rows(self, user_id: str) -> list:
+        return await self.db.transactions.find(
+            {'user_id': user_id},
+            {'_id': 0, 'date': 1, 'amount': 1, 'type': 1, 'category': 1}
+        ).to_list(None)
+
+    async def insert_transaction(self, doc: dict):
+        await self.db.transactions.insert_one(doc)
+        await self.update_monthly_totals(added=[doc])
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict) -> bool:
+        previous = await self.db.transactions.find_one_and_update(
+            {'id': transaction_id, 'user_id': user_id},
+            {'$set': changes},
+            projection={'_id': 0},
+            return_document=ReturnDocument.BEFORE
+        )
+        if not previous:
+            return False
+        await self.update_monthly_totals(added=[{**previous, **changes}], removed=[previous])
+        return True
+
+    async def delete_transaction(self, user_id: str, transaction_id: str) -> bool:
+        deleted = await self.db.transactions.find_one_and_delete({'id': transaction_id, 'user_id': user_id}, projection={'_id': 0})
+        if not deleted:
+            return False
+        await self.update_monthly_totals(removed=[deleted])
+        return True
+
+    async def bulk_write_transactions(self, operations: list) -> Tuple[int, Dict[int, StorageError]]:
+        """Run transaction write operations unordered.
+
+        Returns how many documents the updates matched plus how many were deleted, and the
+        error for each failed operation index.
+        """
+        if not operations:
+            return 0, {}
+        try:
+            result = await self.db.transactions.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            return e.details.get('nMatched', 0) + e.details.get('nRemoved', 0), write_errors(e)
+        return result.matched_count + result.deleted_count, {}
+
+    async def insert_transactions(self, docs: list) -> Dict[int, StorageError]:
+        _, errors = await self.bulk_write_transactions([InsertOne(doc) for doc in docs])
+        await self.update_monthly_totals(added=[doc for index, doc in enumerate(docs) if index not in errors])
+        return errors
+
+    async def update_transactions(self, user_id: str, updates: list) -> list:
+        existing = await self.find_transactions_by_id(user_id, [txn_id for txn_id, _ in updates])
+        results = [txn_id in existing for txn_id, _ in updates]
+        operations, pending = [], []
+        for index, (txn_id, changes) in enumerate(updates):
+            if txn_id in existing and changes:
+                # Only write over the row as it was read, so the rollup delta below is the one that applies
+                operations.append(UpdateOne(rollup_guard(existing[txn_id]), {'$set': changes}))
+                pending.append((index, txn_id, changes))
+
+        matched, errors = await self.bulk_write_transactions(operations)
+        current = None
+        if matched < len(operations) - len(errors):
+            # Some rows changed after they were read; only those now holding this write's values took it
+            current = await self.find_transactions_by_id(user_id, [txn_id for _, txn_id, _ in pending])
+        added, removed = [], []
+        for position, (index, txn_id, changes) in enumerate(pending):
+            if position in errors:
+                results[index] = errors[position]
+                continue
+            updated = {**existing[txn_id], **changes}
+            if current is not None and rollup_fields(current.get(txn_id, {})) != rollup_fields(updated):
+                results[index] = ConflictError('Transaction changed while it was being updated, retry')
+                continue
+            removed.append(existing[txn_id])
+            added.append(updated)
+        await self.update_monthly_totals(added=added, removed=removed)
+        return results
+
+    async def delete_transactions(self, user_id: str, ids: list) -> list:
+        existing = await self.find_transactions_by_id(user_id, ids)
+        results = [txn_id in existing for txn_id in ids]
+        pending = [(index, txn_id) for index, txn_id in enumerate(ids) if txn_id in existing]
+        deleted, errors = await self.bulk_write_transactions([DeleteOne(rollup_guard(existing[txn_id])) for _, txn_id in pending])
+        remaining = {}
+        if deleted < len(pending) - len(errors):
+            # Rows that changed after they were read were left in place
+            remaining = await self.find_transactions_by_id(user_id, [txn_id for _, txn_id in pending])
+
+        removed = []
+        for position, (index, txn_id) in enumerate(pending):
+            if position in errors:
+                results[index] = errors[position]
+                continue
+            if txn_id in remaining:
+                results[index] = ConflictError('Transaction changed while it was being deleted, retry')
+                continue
+            removed.append(existing[txn_id])
+        await self.update_monthly_totals(removed=removed)
+        return results
+
+    async def find_content_hashes(self, user_id: str, hashes: List[str]) -> set:
+        cursor = self.db.transactions.find(
+            {'user_id': user_id, 'content_hash': {'$in': hashes}},
+            {'_id': 0, 'content_hash': 1}
+        )
+        return {txn['content_hash'] async for txn in cursor}
+
+    # Analytics
+    async def period_totals(self, user_id: str, periods: Iterable[str], type: Optional[str] = None) -> list:
+        query = {'user_id': user_id, 'period': {'$in': sorted(periods)}, 'count': {'$gt': 0}}
+        if type:
+            query['type'] = type
+        return await self.db.monthly_totals.find(query, {'_id': 0}).to_list(None)
+
+    async def series_totals(self, user_id: str, start: str, end: str) -> list:
+        pipeline = [
+            {
+                '$match': {
+                    'user_id': user_id,
+                    'period': {'$gte': start, '$lte': end},
+                    'count': {'$gt': 0}
+                }
+            },
+            {
+                '$group': {
+                    '_id': {'period': '$period', 'type': '$type'},
+                    'total': {'$sum': '$total'}
+                }
+            }
+        ]
+        grouped = await self.db.monthly_totals.aggregate(pipeline).to_list(None)
+        return [{**row['_id'], 'total': row['total']} for row in grouped]
+
+    async def balance_totals(self, user_id: str) -> dict:
+        all_totals = await self.db.monthly_totals.aggregate([
+            {'$match': {'user_id': user_id}},
+            {'$group': {'_id': '$type', 'total': {'$sum': '$total'}}}
+        ]).to_list(None)
+        return {item['_id']: item['total'] for item in all_totals}
+
+    # Budgets
+    async def find_budgets(self, user_id: str, month: Optional[int] = None, year: Optional[int] = None) -> list:
+        query = {'user_id': user_id}
+        if month:
+            query['month'] = month
+        if year:
+            query['year'] = year
+        return await self.db.budgets.find(query, {'_id': 0}).to_list(None)
+
+    async def upsert_budgets(self, docs: list, overwrite: bool = True) -> dict:
+        operations = []
+        for doc in docs:
+            key = {field: doc[field] for field in ('user_id', 'category', 'month', 'year')}
+            on_insert = {'id': doc['id'], 'created_at': doc['created_at']}
+            if overwrite:
+                update = {'$set': {'planned_amount': doc['planned_amount']}, '$setOnInsert': on_insert}
+            else:
+                update = {'$setOnInsert': {**on_insert, 'planned_amount': doc['planned_amount']}}
+            operations.append(UpdateOne(key, update, upsert=True))
+        result = await self.db.budgets.bulk_write(operations, ordered=False)
+        return {'created': result.upserted_count, 'updated': result.modified_count}
+
+    # Recurring rules
+    async def find_recurring(self, user_id: str) -> list:
+        return await self.db.recurring_transactions.find({'user_id': user_id}, {'_id': 0}).to_list(1000)
+
+    async def find_recurring_rule(self, user_id: str, rule_id: str) -> Optional[dict]:
+        return await self.db.recurring_transactions.find_one({'id': rule_id, 'user_id': user_id}, {'_id': 0})
+
+    async def insert_recurring(self, doc: dict):
+        await self.db.recurring_transactions.insert_one(doc)
+
+    async def update_recurring(self, user_id: str, rule_id: str, changes: dict) -> bool:
+        result = await self.db.recurring_transactions.update_one({'id': rule_id, 'user_id': user_id}, {'$set': changes})
+        return result.matched_count > 0
+
+    async def delete_recurring(self, user_id: str, rule_id: str) -> bool:
+        result = await self.db.recurring_transactions.delete_one({'id': rule_id, 'user_id': user_id})
+        return result.deleted_count > 0
+
+    async def active_recurring_batches(self, batch_size: int, user_id: Optional[str] = None, rule_id: Optional[str] = None):
+        query = {'is_active': True}
+        if user_id:
+            query['user_id'] = user_id
+        if rule_id:
+            query['id'] = rule_id
+        cursor = self.db.recurring_transactions.find(query, {'_id': 0})
+        while True:
+            rules = await cursor.to_list(batch_size)
+            if not rules:
+                break
+            yield rules
+
+    async def set_generated_through(self, periods: Dict[str, str]):
+        if periods:
+            await self.db.recurring_transactions.bulk_write([
+                UpdateOne({'id': rule_id}, {'$set': {'generated_through': period}})
+                for rule_id, period in periods.items()
+            ], ordered=False)
+
+    # Import jobs
+    async def insert_import_job(self, doc: dict):
+        await self.db.import_jobs.insert_one(doc)
+
+    async def update_import_job(self, job_id: str, changes: dict):
+        await self.db.import_jobs.update_one({'id': job_id}, {'$set': changes})
+
+    async def find_import_job(self, user_id: str, job_id: str) -> Optional[dict]:
+        return await self.db.import_jobs.find_one({'id': job_id, 'user_id': user_id}, {'_id': 0})
+
+    async def touch_import_jobs(self, worker: str, at: datetime):
+        await self.db.import_jobs.update_many(
+            {'status': {'$in': ['queued', 'running']}, 'worker': worker},
+            {'$set': {'updated_at': at}}
+        )
+
+    async def fail_interrupted_import_jobs(self, message: str, stale_before: datetime) -> int:
+        result = await self.db.import_jobs.update_many(
+            {
+                'status': {'$in': ['queued', 'running']},
+                '$or': [
+                    {'updated_at': {'$lt': stale_before}},
+                    {'updated_at': None, 'created_at': {'$lt': stale_before}}
+                ]
+            },
+            {'$set': {'status': 'failed', 'message': message, 'finished_at': datetime.now(timezone.utc)}}
+        )
+        return result.modified_count
+
+    # Slow operation log
+    async def explain_command(self, command: dict) -> Optional[dict]:
+        explained = await self.db.command('explain', command, verbosity='executionStats')
+        planner, stats = explained.get('queryPlanner'), explained.get('executionStats')
+        if planner is None:
+            # Aggregations report the part pushed down to the query layer under their $cursor stage
+            cursor = next((stage['$cursor'] for stage in explained.get('stages', []) if '$cursor' in stage), {})
+            planner, stats = cursor.get('queryPlanner', {}), cursor.get('executionStats')
+        stats = stats or {}
+        # Counters and stage names only: the parsed query would carry the literal values
+        return {
+            'stages': [stage for stage in plan_stages(planner.get('winningPlan', {})) if stage],
+            'returned': stats.get('nReturned'),
+            'keys_examined': stats.get('totalKeysExamined'),
+            'docs_examined': stats.get('totalDocsExamined'),
+            'execution_ms': stats.get('executionTimeMillis')
+        }
+
+    async def record_slow_operation(self, doc: dict):
+        await self.db.slow_operations.insert_one(dict(doc))
+
+    async def slow_operation_summary(self, limit: int = 20) -> list:
+        return await self.db.slow_operations.aggregate([
+            # Natural order of a capped collection is insertion order, so $last is the latest
+            {'$group': {
+                '_id': '$shape_id',
+                'command': {'$last': '$command'},
+                'collection': {'$last': '$collection'},
+                'shape': {'$last': '$shape'},
+                'routes': {'$addToSet': '$route'},
+                'count': {'$sum': 1},
+                'failed': {'$sum': {'$cond': ['$failed', 1, 0]}},
+                'total_ms': {'$sum': '$duration_ms'},
+                'max_ms': {'$max': '$duration_ms'},
+                'last_seen': {'$last': '$at'},
+                'explain': {'$last': '$explain'}
+            }},
+            {'$sort': {'total_ms': -1}},
+            {'$limit': limit},
+            {'$addFields': {'shape_id': '$_id', 'mean_ms': {'$divide': ['$total_ms', '$count']}}},
+            {'$project': {'_id': 0}}
+        ]).to_list(limit)
@@ -0,0 +1,720 @@
+"""Embedded SQLite storage for single-node installs and benchmarks without a MongoDB.
+
+Every table has explicit columns and the indexes its queries need. Analytics are
+`GROUP BY`s over a covering (user_id, period, type, category, amount) index on
+transactions, so unlike the Mongo backend there are no rollups to keep in step.
+All statements run on one dedicated thread, which owns the connection.
+"""
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+
+from storage.base import IMPORT_JOB_RETENTION_SECONDS, DuplicateError, Storage, StorageError
+
+TABLES = [
+    """CREATE TABLE IF NOT EXISTS users (
+        id TEXT PRIMARY KEY,
+        email TEXT NOT NULL,
+        name TEXT NOT NULL,
+        password TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        tokens_valid_after REAL,
+        data_version INTEGER NOT NULL DEFAULT 0,
+        data_modified_at REAL
+    )""",
+    """CREATE TABLE IF NOT EXISTS settings (
+        user_id TEXT PRIMARY KEY,
+        currency TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS categories (
+        user_id TEXT NOT NULL,
+        id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        type TEXT NOT NULL,
+        is_predefined INTEGER NOT NULL DEFAULT 0,
+        hidden INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (user_id, id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS transactions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT NOT NULL,
+        is_recurring INTEGER NOT NULL DEFAULT 0,
+        recurring_id TEXT,
+        created_at TEXT NOT NULL,
+        period TEXT,
+        content_hash TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS budgets (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        category TEXT NOT NULL,
+        month INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        planned_amount REAL NOT NULL,
+        created_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS recurring_transactions (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        amount REAL NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        type TEXT NOT NULL,
+        day_of_month INTEGER NOT NULL,
+        is_active INTEGER NOT NULL DEFAULT 1,
+        start_date TEXT NOT NULL,
+        end_date TEXT,
+        generated_through TEXT,
+        created_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS import_jobs (
+        id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        filename TEXT NOT NULL,
+        status TEXT NOT NULL,
+        rows_processed INTEGER NOT NULL DEFAULT 0,
+        rows_failed INTEGER NOT NULL DEFAULT 0,
+        imported INTEGER NOT NULL DEFAULT 0,
+        skipped INTEGER NOT NULL DEFAULT 0,
+        rows_per_second REAL NOT NULL DEFAULT 0,
+        message TEXT,
+        errors TEXT NOT NULL DEFAULT '[]',
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        worker TEXT,
+        updated_at TEXT
+    )""",
+    """CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        expires_at TEXT NOT NULL,
+        revoked_at TEXT NOT NULL
+    )""",
+]
+
+# (table, column, definition) for columns added after their table was first created;
+# connect() adds them to database files that predate them
+ADDED_COLUMNS = [
+    ('users', 'data_version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('users', 'data_modified_at', 'REAL'),
+    ('import_jobs', 'worker', 'TEXT'),
+    ('import_jobs', 'updated_at', 'TEXT'),
+]
+
+# (table, name, definition); primary keys above cover lookups by id
+INDEXES = [
+    ('users', 'users_email', 'CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email)'),
+    ('users', 'users_tokens_valid_after', 'CREATE INDEX IF NOT EXISTS users_tokens_valid_after ON users (tokens_valid_after) WHERE tokens_valid_after IS NOT NULL'),
+    # Keyset pagination for each sort key offered by GET /transactions
+    ('transactions', 'transactions_user_date_id', 'CREATE INDEX IF NOT EXISTS transactions_user_date_id ON transactions (user_id, date, id)'),
+    ('transactions', 'transactions_user_amount_id', 'CREATE INDEX IF NOT EXISTS transactions_user_amount_id ON transactions (user_id, amount, id)'),
+    ('transactions', 'transactions_user_created_at_id', 'CREATE INDEX IF NOT EXISTS transactions_user_created_at_id ON transactions (user_id, created_at, id)'),
+    # Covers every analytics GROUP BY, so they never touch the table rows
+    ('transactions', 'transactions_user_period_type_category', 'CREATE INDEX IF NOT EXISTS transactions_user_period_type_category ON transactions (user_id, period, type, category, amount)'),
+    # One materialized occurrence per recurring rule and date
+    ('transactions', 'transactions_user_recurring_date', 'CREATE UNIQUE INDEX IF NOT EXISTS transactions_user_recurring_date ON transactions (user_id, recurring_id, date) WHERE recurring_id IS NOT NULL'),
+    # Imported rows carry a content hash so re-importing an overlapping file skips them
+    ('transactions', 'transactions_user_content_hash', 'CREATE UNIQUE INDEX IF NOT EXISTS transactions_user_content_hash ON transactions (user_id, content_hash) WHERE content_hash IS NOT NULL'),
+    ('budgets', 'budgets_user_category_month_year', 'CREATE UNIQUE INDEX IF NOT EXISTS budgets_user_category_month_year ON budgets (user_id, category, month, year)'),
+    ('budgets', 'budgets_user_year_month', 'CREATE INDEX IF NOT EXISTS budgets_user_year_month ON budgets (user_id, year, month)'),
+    ('recurring_transactions', 'recurring_user_id', 'CREATE INDEX IF NOT EXISTS recurring_user_id ON recurring_transactions (user_id)'),
+    # The scheduler walks every active rule in id order
+    ('recurring_transactions', 'recurring_active_id', 'CREATE INDEX IF NOT EXISTS recurring_active_id ON recurring_transactions (is_active, id)'),
+    ('import_jobs', 'import_jobs_created_at', 'CREATE INDEX IF NOT EXISTS import_jobs_created_at ON import_jobs (created_at)'),
+    # Heartbeats and the sweep for jobs whose process stopped
+    ('import_jobs', 'import_jobs_status_updated_at', 'CREATE INDEX IF NOT EXISTS import_jobs_status_updated_at ON import_jobs (status, updated_at)'),
+    ('revoked_tokens', 'revoked_tokens_revoked_at', 'CREATE INDEX IF NOT EXISTS revoked_tokens_revoked_at ON revoked_tokens (revoked_at)'),
+    ('revoked_tokens', 'revoked_tokens_expires_at', 'CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at ON revoked_tokens (expires_at)'),
+]
+
+# The statements routes issue, for `manage.py explain`. Values are placeholders.
+QUERY_SHAPES = [
+    ('login', 'users', 'SELECT * FROM users WHERE email = ?', ['user@example.com']),
+    ('current user', 'users', 'SELECT * FROM users WHERE id = ?', ['user']),
+    ('settings', 'settings', 'SELECT * FROM settings WHERE user_id = ?', ['user']),
+    ('list categories', 'categories', 'SELECT * FROM categories WHERE user_id = ?', ['user']),
+    ('category by id', 'categories', 'SELECT * FROM categories WHERE user_id = ? AND id = ?', ['user', 'category']),
+    ('list transactions', 'transactions', 'SELECT * FROM transactions WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT 200', ['user']),
+    ('filter transactions', 'transactions',
+        'SELECT * FROM transactions WHERE user_id = ? AND date >= ? AND date <= ? AND type = ? ORDER BY date DESC, id DESC',
+        ['user', '2025-01-01', '2025-01-31', 'expense']),
+    ('transactions by amount', 'transactions',
+        'SELECT * FROM transactions WHERE user_id = ? AND amount >= ? ORDER BY amount, id', ['user', 10]),
+    ('transaction by id', 'transactions', 'SELECT * FROM transactions WHERE id = ? AND user_id = ?', ['transaction', 'user']),
+    ('bulk transactions', 'transactions', 'SELECT * FROM transactions WHERE user_id = ? AND id IN (?, ?)', ['user', 'a', 'b']),
+    ('import dedupe', 'transactions', 'SELECT content_hash FROM transactions WHERE user_id = ? AND content_hash IN (?)', ['user', 'hash']),
+    ('export', 'transactions',
+        'SELECT * FROM transactions WHERE user_id = ? AND (date > ? OR (date = ? AND id > ?)) ORDER BY date, id LIMIT 1000',
+        ['user', '2025-01-01', '2025-01-01', 'id']),
+    ('period totals', 'transactions',
+        'SELECT period, type, category, SUM(amount), COUNT(*) FROM transactions '
+        'WHERE user_id = ? AND period IN (?, ?) AND type = ? GROUP BY period, type, category',
+        ['user', '2025-01', '2025-02', 'expense']),
+    ('series totals', 'transactions',
+        'SELECT period, type, SUM(amount) FROM transactions WHERE user_id = ? AND period BETWEEN ? AND ? GROUP BY period, type',
+        ['user', '2024-01', '2025-12']),
+    ('balance', 'transactions',
+        'SELECT type, SUM(amount) FROM transactions WHERE user_id = ? AND period IS NOT NULL GROUP BY type', ['user']),
+    ('month budgets', 'budgets', 'SELECT * FROM budgets WHERE user_id = ? AND month = ? AND year = ?', ['user', 1, 2025]),
+    ('recurring rules', 'recurring_transactions', 'SELECT * FROM recurring_transactions WHERE user_id = ?', ['user']),
+    ('recurring rule by id', 'recurring_transactions', 'SELECT * FROM recurring_transactions WHERE id = ? AND user_id = ?', ['rule', 'user']),
+    ('due recurring rules', 'recurring_transactions',
+        'SELECT * FROM recurring_transactions WHERE is_active = 1 AND id > ? ORDER BY id LIMIT 500', ['']),
+    ('import job', 'import_jobs', 'SELECT * FROM import_jobs WHERE id = ? AND user_id = ?', ['job', 'user']),
+    ('import job heartbeat', 'import_jobs',
+        "UPDATE import_jobs SET updated_at = ? WHERE status IN ('queued', 'running') AND worker = ?", ['2025-01-01', 'worker']),
+    ('stale import jobs', 'import_jobs',
+        "UPDATE import_jobs SET status = 'failed' WHERE status IN ('queued', 'running') "
+        "AND (updated_at < ? OR (updated_at IS NULL AND created_at < ?))", ['2025-01-01', '2025-01-01']),
+    ('revocation sync', 'revoked_tokens', 'SELECT jti, expires_at FROM revoked_tokens WHERE revoked_at >= ?', ['2025-01-01']),
+    ('sign-out sync', 'users', 'SELECT id, tokens_valid_after FROM users WHERE tokens_valid_after >= ?', [0]),
+]
+
+BOOLEAN_COLUMNS = {'is_predefined', 'hidden', 'is_recurring', 'is_active'}
+JSON_COLUMNS = {'errors'}
+TRANSACTION_SORTS = {'date', 'amount', 'created_at'}
+
+def to_column(name: str, value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if name in JSON_COLUMNS:
+        return json.dumps(value)
+    return value
+
+def to_doc(row: sqlite3.Row) -> dict:
+    doc = dict(row)
+    for name in BOOLEAN_COLUMNS & doc.keys():
+        doc[name] = bool(doc[name])
+    for name in JSON_COLUMNS & doc.keys():
+        doc[name] = json.loads(doc[name])
+    return doc
+
+def placeholders(count: int) -> str:
+    return ', '.join('?' * count)
+
+@contextmanager
+def transaction(connection: sqlite3.Connection):
+    """Take the write lock up front so read-then-write sequences are atomic across processes"""
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+def storage_error(error: sqlite3.IntegrityError) -> StorageError:
+    message = str(error)
+    return DuplicateError(message) if message.startswith('UNIQUE constraint failed') else StorageError(message)
+
+class SQLiteStorage(Storage):
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = None
+        self.columns = {}
+        # sqlite3 connections are not safe to share between threads, so one thread does all the work
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is None:
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute('PRAGMA busy_timeout = 5000')
+            for statement in TABLES:
+                connection.execute(statement)
+            for table, column, definition in ADDED_COLUMNS:
+                if column not in [row['name'] for row in connection.execute(f'PRAGMA table_info({table})')]:
+                    connection.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+            for _, _, statement in INDEXES:
+                connection.execute(statement)
+            for table in ('users', 'settings', 'categories', 'transactions', 'budgets', 'recurring_transactions', 'import_jobs', 'revoked_tokens'):
+                self.columns[table] = [row['name'] for row in connection.execute(f'PRAGMA table_info({table})')]
+            self.connection = connection
+        return self.connection
+
+    async def run(self, function, *args):
+        """Run function(connection, *args) on the storage thread"""
+        def call():
+            return function(self.connect(), *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def insert_row(self, connection: sqlite3.Connection, table: str, doc: dict, verb: str = 'INSERT'):
+        names = [name for name in self.columns[table] if name in doc]
+        connection.execute(
+            f"{verb} INTO {table} ({', '.join(names)}) VALUES ({placeholders(len(names))})",
+            [to_column(name, doc[name]) for name in names]
+        )
+
+    def assignments(self, table: str, changes: dict):
+        """SET clause and parameters for the changes that are columns of `table`"""
+        names = [name for name in changes if name in self.columns[table]]
+        return ', '.join(f'{name} = ?' for name in names), [to_column(name, changes[name]) for name in names]
+
+    def update_row(self, connection: sqlite3.Connection, table: str, where: str, params: list, changes: dict) -> bool:
+        """Whether a row matched; with nothing to change, only checks that one exists"""
+        clause, values = self.assignments(table, changes)
+        if not clause:
+            return connection.execute(f'SELECT 1 FROM {table} WHERE {where}', params).fetchone() is not None
+        return connection.execute(f'UPDATE {table} SET {clause} WHERE {where}', values + params).rowcount > 0
+
+    async def insert(self, table: str, doc: dict):
+        def write(connection):
+            try:
+                self.insert_row(connection, table, doc)
+            except sqlite3.IntegrityError as e:
+                raise storage_error(e)
+        await self.run(write)
+
+    async def update(self, table: str, where: str, params: list, changes: dict) -> bool:
+        def write(connection):
+            try:
+                return self.update_row(connection, table, where, params, changes)
+            except sqlite3.IntegrityError as e:
+                raise storage_error(e)
+        return await self.run(write)
+
+    async def delete(self, table: str, where: str, params: list) -> bool:
+        return await self.run(lambda connection: connection.execute(f'DELETE FROM {table} WHERE {where}', params).rowcount > 0)
+
+    async def fetch_one(self, sql: str, params: list = ()) -> Optional[dict]:
+        def read(connection):
+            row = connection.execute(sql, params).fetchone()
+            return to_doc(row) if row else None
+        return await self.run(read)
+
+    async def fetch_all(self, sql: str, params: list = ()) -> list:
+        return await self.run(lambda connection: [to_doc(row) for row in connection.execute(sql, params)])
+
+    async def ensure_indexes(self) -> list:
+        def create(connection):
+            failed = []
+            for table, name, statement in INDEXES:
+                try:
+                    connection.execute(statement)
+                except sqlite3.Error as e:
+                    failed.append((table, name, str(e)))
+            return failed
+        return await self.run(create)
+
+    async def explain_query_shapes(self) -> list:
+        def explain(connection):
+            results = []
+            for name, table, sql, params in QUERY_SHAPES:
+                stages = [row['detail'] for row in connection.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+                # 'SCAN <table>' without an index walks every row
+                collscan = any(re.fullmatch(rf'SCAN {table}', stage) for stage in stages)
+                results.append({'name': name, 'collection': table, 'stages': stages, 'collscan': collscan})
+            return results
+        return await self.run(explain)
+
+    async def close(self):
+        def close(connection):
+            connection.close()
+            self.connection = None
+        if self.connection is not None:
+            await self.run(close)
+
+    # Users and sessions
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        user = await self.fetch_one('SELECT id, email, name, password, created_at, tokens_valid_after FROM users WHERE email = ?', [email])
+        if user and user['tokens_valid_after'] is None:
+            del user['tokens_valid_after']
+        return user
+
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        return await self.fetch_one('SELECT id, email, name, created_at FROM users WHERE id = ?', [user_id])
+
+    async def insert_user(self, doc: dict):
+        await self.insert('users', doc)
+
+    async def update_password(self, user_id: str, current: str, replacement: str):
+        await self.update('users', 'id = ? AND password = ?', [user_id, current], {'password': replacement})
+
+    async def set_tokens_valid_after(self, user_id: str, cutoff: float):
+        await self.update('users', 'id = ?', [user_id], {'tokens_valid_after': cutoff})
+
+    async def find_tokens_valid_after(self, since: Optional[float] = None) -> list:
+        if since is None:
+            rows = await self.fetch_all('SELECT id, tokens_valid_after FROM users WHERE tokens_valid_after IS NOT NULL')
+        else:
+            rows = await self.fetch_all('SELECT id, tokens_valid_after FROM users WHERE tokens_valid_after >= ?', [since])
+        return [(row['id'], row['tokens_valid_after']) for row in rows]
+
+    async def revoke_token(self, jti: str, user_id: str, expires_at: datetime):
+        now = datetime.now(timezone.utc)
+        def write(connection):
+            with transaction(connection):
+                # Stands in for Mongo's TTL index
+                connection.execute('DELETE FROM revoked_tokens WHERE expires_at <= ?', [now.isoformat()])
+                self.insert_row(connection, 'revoked_tokens', {
+                    'jti': jti, 'user_id': user_id, 'expires_at': expires_at, 'revoked_at': now
+                }, verb='INSERT OR IGNORE')
+        await self.run(write)
+
+    async def find_revoked_tokens(self, since: Optional[datetime] = None) -> list:
+        if since:
+            rows = await self.fetch_all('SELECT jti, expires_at FROM revoked_tokens WHERE revoked_at >= ?', [since.isoformat()])
+        else:
+            rows = await self.fetch_all('SELECT jti, expires_at FROM revoked_tokens WHERE expires_at > ?', [datetime.now(timezone.utc).isoformat()])
+        return [(row['jti'], datetime.fromisoformat(row['expires_at'])) for row in rows]
+
+    async def bump_data_version(self, user_id: str, modified_at: float):
+        await self.run(lambda connection: connection.execute(
+            'UPDATE users SET data_version = data_version + 1, data_modified_at = MAX(COALESCE(data_modified_at, 0), ?) WHERE id = ?',
+            [modified_at, user_id]
+        ))
+
+    async def data_version(self, user_id: str) -> int:
+        user = await self.fetch_one('SELECT data_version FROM users WHERE id = ?', [user_id])
+        return user['data_version'] if user else 0
+
+    async def mark_modified(self, user_id: str, modified_at: float):
+        await self.run(lambda connection: connection.execute(
+            'UPDATE users SET data_modified_at = MAX(COALESCE(data_modified_at, 0), ?) WHERE id = ?', [modified_at, user_id]
+        ))
+
+    async def last_modified(self, user_id: str) -> Optional[float]:
+        user = await self.fetch_one('SELECT data_modified_at FROM users WHERE id = ?', [user_id])
+        return user['data_modified_at'] if user else None
+
+    # Settings
+    async def insert_settings(self, doc: dict):
+        await self.insert('settings', doc)
+
+    async def get_settings(self, user_id: str, defaults: dict) -> dict:
+        def read(connection):
+            self.insert_row(connection, 'settings', {**defaults, 'user_id': user_id}, verb='INSERT OR IGNORE')
+            return to_doc(connection.execute('SELECT * FROM settings WHERE user_id = ?', [user_id]).fetchone())
+        return await self.run(read)
+
+    async def update_settings(self, user_id: str, changes: dict):
+        def write(connection):
+            with transaction(connection):
+                if not self.update_row(connection, 'settings', 'user_id = ?', [user_id], changes):
+                    self.insert_row(connection, 'settings', {**changes, 'user_id': user_id})
+        await self.run(write)
+
+    # Categories
+    async def find_categories(self, user_id: str) -> list:
+        return await self.fetch_all('SELECT * FROM categories WHERE user_id = ?', [user_id])
+
+    async def find_category(self, user_id: str, category_id: str) -> Optional[dict]:
+        return await self.fetch_one('SELECT * FROM categories WHERE user_id = ? AND id = ?', [user_id, category_id])
+
+    async def insert_category(self, doc: dict):
+        await self.insert('categories', doc)
+
+    async def update_category(self, user_id: str, category_id: str, changes: dict, on_insert: Optional[dict] = None) -> bool:
+        if on_insert is None:
+            return await self.update('categories', 'user_id = ? AND id = ?', [user_id, category_id], changes)
+
+        def write(connection):
+            with transaction(connection):
+                if not self.update_row(connection, 'categories', 'user_id = ? AND id = ?', [user_id, category_id], changes):
+                    self.insert_row(connection, 'categories', {**on_insert, **changes, 'user_id': user_id, 'id': category_id})
+            return True
+        return await self.run(write)
+
+    async def delete_category(self, user_id: str, category_id: str) -> bool:
+        return await self.delete('categories', 'user_id = ? AND id = ?', [user_id, category_id])
+
+    # Transactions
+    async def find_transactions(
+        self,
+        user_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        type: Optional[str] = None,
+        categories: Optional[List[str]] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sort: str = 'date',
+        descending: bool = True,
+        after: Optional[tuple] = None,
+        limit: Optional[int] = None,
+        fields: Optional[List[str]] = None
+    ) -> list:
+        if sort not in TRANSACTION_SORTS:
+            raise ValueError(f'Cannot sort transactions by {sort!r}')
+        conditions, params = ['user_id = ?'], [user_id]
+        for condition, value in (
+            ('date >= ?', start_date),
+            ('date <= ?', end_date),
+            ('type = ?', type),
+            ('amount >= ?', min_amount),
+            ('amount <= ?', max_amount)
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if categories:
+            conditions.append(f'category IN ({placeholders(len(categories))})')
+            params.extend(categories)
+
+        # Keyset pagination: continue strictly after the (sort value, id) of the last row seen
+        beyond = '<' if descending else '>'
+        if after:
+            value, last_id = after
+            conditions.append(f'({sort} {beyond} ? OR ({sort} = ? AND id {beyond} ?))')
+            params.extend([value, value, last_id])
+
+        order = 'DESC' if descending else 'ASC'
+        columns = ', '.join(fields) if fields else '*'
+        sql = f"SELECT {columns} FROM transactions WHERE {' AND '.join(conditions)} ORDER BY {sort} {order}, id {order}"
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return await self.fetch_all(sql, params)
+
+    async def find_transactions_by_id(self, user_id: str, ids: Iterable[str]) -> Dict[str, dict]:
+        ids = list(ids)
+        if not ids:
+            return {}
+        docs = await self.fetch_all(
+            f'SELECT * FROM transactions WHERE user_id = ? AND id IN ({placeholders(len(ids))})',
+            [user_id, *ids]
+        )
+        return {doc['id']: doc for doc in docs}
+
+    async def stream_transactions(self, user_id: str, fields: List[str], start_date: Optional[str] = None, end_date: Optional[str] = None, batch_size: int = 1000):
+        columns = ', '.join(fields)
+        bounds, bound_params = '', []
+        if start_date:
+            bounds += ' AND date >= ?'
+            bound_params.append(start_date)
+        if end_date:
+            bounds += ' AND date <= ?'
+            bound_params.append(end_date)
+
+        # Page on (date, id) rather than holding a statement open across awaits
+        position = None
+        while True:
+            keyset, keyset_params = '', []
+            if position:
+                keyset = ' AND (date > ? OR (date = ? AND id > ?))'
+                keyset_params = [position[0], position[0], position[1]]
+            rows = await self.fetch_all(
+                f'SELECT {columns}, date AS sort_date, id AS sort_id FROM transactions '
+                f'WHERE user_id = ?{bounds}{keyset} ORDER BY date, id LIMIT ?',
+                [user_id, *bound_params, *keyset_params, batch_size]
+            )
+            for row in rows:
+                position = (row.pop('sort_date'), row.pop('sort_id'))
+                yield row
+            if len(rows) < batch_size:
+                break
+
+    async def ledger_rows(self, user_id: str) -> list:
+        return await self.fetch_all('SELECT date, amount, type, category FROM transactions WHERE user_id = ?', [user_id])
+
+    async def insert_transaction(self, doc: dict):
+        await self.insert('transactions', doc)
+
+    async def update_transaction(self, user_id: str, transaction_id: str, changes: dict) -> bool:
+        return await self.update('transactions', 'id = ? AND user_id = ?', [transaction_id, user_id], changes)
+
+    async def delete_transaction(self, user_id: str, transaction_id: str) -> bool:
+        return await self.delete('transactions', 'id = ? AND user_id = ?', [transaction_id, user_id])
+
+    async def insert_transactions(self, docs: list) -> Dict[int, StorageError]:
+        def write(connection):
+            errors = {}
+            with transaction(connection):
+                # A failed INSERT only rolls back its own statement, so the rest still go in
+                for index, doc in enumerate(docs):
+                    try:
+                        self.insert_row(connection, 'transactions', doc)
+                    except sqlite3.IntegrityError as e:
+                        errors[index] = storage_error(e)
+            return errors
+        if not docs:
+            return {}
+        return await self.run(write)
+
+    async def update_transactions(self, user_id: str, updates: list) -> list:
+        def write(connection):
+            results = []
+            with transaction(connection):
+                for txn_id, changes in updates:
+                    try:
+                        results.append(self.update_row(connection, 'transactions', 'id = ? AND user_id = ?', [txn_id, user_id], changes))
+                    except sqlite3.IntegrityError as e:
+                        results.append(storage_error(e))
+            return results
+        return await self.run(write)
+
+    async def delete_transactions(self, user_id: str, ids: list) -> list:
+        def write(connection):
+            with transaction(connection):
+                return [
+                    connection.execute('DELETE FROM transactions WHERE id = ? AND user_id = ?', [txn_id, user_id]).rowcount > 0
+                    for txn_id in ids
+                ]
+        return await self.run(write)
+
+    async def find_content_hashes(self, user_id: str, hashes: List[str]) -> set:
+        def read(connection):
+            found = set()
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                found.update(row[0] for row in connection.execute(
+                    f'SELECT content_hash FROM transactions WHERE user_id = ? AND content_hash IN ({placeholders(len(chunk))})',
+                    [user_id, *chunk]
+                ))
+            return found
+        return await self.run(read)
+
+    # Analytics
+    async def period_totals(self, user_id: str, periods: Iterable[str], type: Optional[str] = None) -> list:
+        periods = sorted(periods)
+        if not periods:
+            return []
+        sql = (
+            'SELECT period, type, category, SUM(amount) AS total, COUNT(*) AS count FROM transactions '
+            f'WHERE user_id = ? AND period IN ({placeholders(len(periods))})'
+        )
+        params = [user_id, *periods]
+        if type:
+            sql += ' AND type = ?'
+            params.append(type)
+        return await self.fetch_all(sql + ' GROUP BY period, type, category', params)
+
+    async def series_totals(self, user_id: str, start: str, end: str) -> list:
+        return await self.fetch_all(
+            'SELECT period, type, SUM(amount) AS total FROM transactions '
+            'WHERE user_id = ? AND period BETWEEN ? AND ? GROUP BY period, type',
+            [user_id, start, end]
+        )
+
+    async def balance_totals(self, user_id: str) -> dict:
+        rows = await self.fetch_all(
+            'SELECT type, SUM(amount) AS total FROM transactions WHERE user_id = ? AND period IS NOT NULL GROUP BY type',
+            [user_id]
+        )
+        return {row['type']: row['total'] for row in rows}
+
+    # Budgets
+    async def find_budgets(self, user_id: str, month: Optional[int] = None, year: Optional[int] = None) -> list:
+        sql, params = 'SELECT * FROM budgets WHERE user_id = ?', [user_id]
+        if month:
+            sql += ' AND month = ?'
+            params.append(month)
+        if year:
+            sql += ' AND year = ?'
+            params.append(year)
+        return await self.fetch_all(sql, params)
+
+    async def upsert_budgets(self, docs: list, overwrite: bool = True) -> dict:
+        def write(connection):
+            counts = {'created': 0, 'updated': 0}
+            with transaction(connection):
+                for doc in docs:
+                    key = [doc['user_id'], doc['category'], doc['month'], doc['year']]
+                    existing = connection.execute(
+                        'SELECT planned_amount FROM budgets WHERE user_id = ? AND category = ? AND month = ? AND year = ?',
+                        key
+                    ).fetchone()
+                    if existing is None:
+                        self.insert_row(connection, 'budgets', doc)
+                        counts['created'] += 1
+                    elif overwrite and existing[0] != doc['planned_amount']:
+                        connection.execute(
+                            'UPDATE budgets SET planned_amount = ? WHERE user_id = ? AND category = ? AND month = ? AND year = ?',
+                            [doc['planned_amount'], *key]
+                        )
+                        counts['updated'] += 1
+            return counts
+        return await self.run(write)
+
+    # Recurring rules
+    async def find_recurring(self, user_id: str) -> list:
+        return await self.fetch_all('SELECT * FROM recurring_transactions WHERE user_id = ? LIMIT 1000', [user_id])
+
+    async def find_recurring_rule(self, user_id: str, rule_id: str) -> Optional[dict]:
+        return await self.fetch_one('SELECT * FROM recurring_transactions WHERE id = ? AND user_id = ?', [rule_id, user_id])
+
+    async def insert_recurring(self, doc: dict):
+        await self.insert('recurring_transactions', doc)
+
+    async def update_recurring(self, user_id: str, rule_id: str, changes: dict) -> bool:
+        return await self.update('recurring_transactions', 'id = ? AND user_id = ?', [rule_id, user_id], changes)
+
+    async def delete_recurring(self, user_id: str, rule_id: str) -> bool:
+        return await self.delete('recurring_transactions', 'id = ? AND user_id = ?', [rule_id, user_id])
+
+    async def active_recurring_batches(self, batch_size: int, user_id: Optional[str] = None, rule_id: Optional[str] = None):
+        filters, filter_params = '', []
+        if user_id:
+            filters += ' AND user_id = ?'
+            filter_params.append(user_id)
+        if rule_id:
+            filters += ' AND id = ?'
+            filter_params.append(rule_id)
+        last_id = ''
+        while True:
+            rules = await self.fetch_all(
+                f'SELECT * FROM recurring_transactions WHERE is_active = 1 AND id > ?{filters} ORDER BY id LIMIT ?',
+                [last_id, *filter_params, batch_size]
+            )
+            if not rules:
+                break
+            yield rules
+            last_id = rules[-1]['id']
+
+    async def set_generated_through(self, periods: Dict[str, str]):
+        def write(connection):
+            with transaction(connection):
+                connection.executemany(
+                    'UPDATE recurring_transactions SET generated_through = ? WHERE id = ?',
+                    [(period, rule_id) for rule_id, period in periods.items()]
+                )
+        if periods:
+            await self.run(write)
+
+    # Import jobs
+    async def insert_import_job(self, doc: dict):
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=IMPORT_JOB_RETENTION_SECONDS)
+        def write(connection):
+            with transaction(connection):
+                # Stands in for Mongo's TTL index
+                connection.execute('DELETE FROM import_jobs WHERE created_at < ?', [cutoff.isoformat()])
+                self.insert_row(connection, 'import_jobs', doc)
+        await self.run(write)
+
+    async def update_import_job(self, job_id: str, changes: dict):
+        await self.update('import_jobs', 'id = ?', [job_id], changes)
+
+    async def find_import_job(self, user_id: str, job_id: str) -> Optional[dict]:
+        return await self.fetch_one('SELECT * FROM import_jobs WHERE id = ? AND user_id = ?', [job_id, user_id])
+
+    async def touch_import_jobs(self, worker: str, at: datetime):
+        await self.run(lambda connection: connection.execute(
+            "UPDATE import_jobs SET updated_at = ? WHERE status IN ('queued', 'running') AND worker = ?",
+            [at.isoformat(), worker]
+        ))
+
+    async def fail_interrupted_import_jobs(self, message: str, stale_before: datetime) -> int:
+        def write(connection):
+            return connection.execute(
+                "UPDATE import_jobs SET status = 'failed', message = ?, finished_at = ? WHERE status IN ('queued', 'running') "
+                "AND (updated_at < ? OR (updated_at IS NULL AND created_at < ?))",
+                [message, datetime.now(timezone.utc).isoformat(), stale_before.isoformat(), stale_before.isoformat()]
+            ).rowcount
+        return await self.run(write)
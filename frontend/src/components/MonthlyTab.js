@@ -40,50 +40,19 @@ const MonthlyTab = ({ currency }) => {
   const saveAllBudgets = async () => {
     setLoading(true);
     try {
-      const savePromises = [];
-      
-      for (const [category, value] of Object.entries(editingBudget)) {
-        const plannedAmount = parseFloat(value);
-        if (isNaN(plannedAmount) || plannedAmount < 0) continue;
+      const budgets = Object.entries(editingBudget)
+        .map(([category, value]) => ({ category, planned_amount: parseFloat(value) }))
+        .filter(({ planned_amount }) => !isNaN(planned_amount) && planned_amount >= 0);
 
-        if (applyToFuture) {
-          // Save for current and all future months (12 months ahead)
-          const currentYear = year;
-          const currentMonth = month;
-          
-          for (let i = 0; i < 12; i++) {
-            let targetMonth = currentMonth + i;
-            let targetYear = currentYear;
-            
-            // Handle month overflow
-            while (targetMonth > 12) {
-              targetMonth -= 12;
-              targetYear += 1;
-            }
-            
-            savePromises.push(
-              api.post('/budgets', {
-                category,
-                month: targetMonth,
-                year: targetYear,
-                planned_amount: plannedAmount
-              })
-            );
-          }
-        } else {
-          // Save only for current month
-          savePromises.push(
-            api.post('/budgets', {
-              category,
-              month,
-              year,
-              planned_amount: plannedAmount
-            })
-          );
-        }
+      if (budgets.length > 0) {
+        // One request for the month, or for it and the following 11 months
+        await api.put('/budgets/bulk', {
+          month,
+          year,
+          budgets,
+          months: applyToFuture ? 12 : 1
+        });
       }
-
-      await Promise.all(savePromises);
       toast.success(applyToFuture ? 'Budgets saved and applied to future months' : 'Budgets saved for current month');
       setEditingBudget({});
       setHasChanges(false);
@@ -105,7 +74,6 @@ const MonthlyTab = ({ currency }) => {
 
     setLoading(true);
     try {
-      // Get current budgets
       const currentBudgets = data.filter(item => item.planned > 0);
       
       if (currentBudgets.length === 0) {
@@ -113,32 +81,15 @@ const MonthlyTab = ({ currency }) => {
         return;
       }
 
-      const savePromises = [];
-      const startMonth = month;
-      const startYear = year;
-
-      for (const budget of currentBudgets) {
-        for (let i = 1; i <= 12; i++) {
-          let targetMonth = startMonth + i;
-          let targetYear = startYear;
-
-          while (targetMonth > 12) {
-            targetMonth -= 12;
-            targetYear += 1;
-          }
-
-          savePromises.push(
-            api.post('/budgets', {
-              category: budget.category,
-              month: targetMonth,
-              year: targetYear,
-              planned_amount: budget.planned
-            })
-          );
-        }
-      }
-
-      await Promise.all(savePromises);
+      const start = month === 12 ? { month: 1, year: year + 1 } : { month: month + 1, year };
+      await api.post('/budgets/copy', {
+        month,
+        year,
+        start_month: start.month,
+        start_year: start.year,
+        end_month: month,
+        end_year: year + 1
+      });
       toast.success(`Copied ${currentBudgets.length} budgets to next 12 months`);
     } catch (error) {
       toast.error('Failed to copy budgets');
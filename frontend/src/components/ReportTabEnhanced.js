@@ -22,38 +22,20 @@ const ReportTabEnhanced = ({ currency }) => {
   const [loading, setLoading] = useState(false);
 
   useEffect(() => {
-    if (viewType === 'monthly') {
-      loadMonthlyData();
-    } else if (viewType === 'yearly') {
-      loadYearlyData();
-    } else if (viewType === 'fiscal') {
-      loadFiscalYearData();
-    }
-  }, [viewType, month, year, fiscalYear]);
-
-  useEffect(() => {
-    loadTrendData();
-    loadCategoryBreakdown();
-    loadBurnRate();
-  }, [month, year]);
-
-  const loadMonthlyData = async () => {
-    setLoading(true);
-    try {
-      const response = await api.get(`/analytics/monthly?month=${month}&year=${year}`);
-      setMonthlyData(response.data.filter(item => item.actual > 0 || item.planned > 0));
-    } catch (error) {
-      toast.error('Failed to load data');
-    } finally {
-      setLoading(false);
-    }
-  };
+    loadDashboard();
+  }, [month, year, fiscalYear]);
 
-  const loadYearlyData = async () => {
+  const loadDashboard = async () => {
     setLoading(true);
     try {
-      const response = await api.get(`/analytics/yearly?year=${year}`);
-      setYearlyData(response.data);
+      const response = await api.get(`/analytics/dashboard?month=${month}&year=${year}&start_year=${fiscalYear}&months=12&breakdown_type=expense`);
+      const data = response.data;
+      setMonthlyData(data.monthly.filter(item => item.actual > 0 || item.planned > 0));
+      setYearlyData(data.yearly);
+      setFiscalYearData(data.fiscal_year);
+      setTrendData(data.trend);
+      setCategoryBreakdown(data.category_breakdown.slice(0, 10));
+      setBurnRate(data.burn_rate);
     } catch (error) {
       toast.error('Failed to load data');
     } finally {
@@ -61,45 +43,6 @@ const ReportTabEnhanced = ({ currency }) => {
     }
   };
 
-  const loadFiscalYearData = async () => {
-    setLoading(true);
-    try {
-      const response = await api.get(`/analytics/fiscal-year?start_year=${fiscalYear}`);
-      setFiscalYearData(response.data);
-    } catch (error) {
-      toast.error('Failed to load fiscal year data');
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  const loadTrendData = async () => {
-    try {
-      const response = await api.get(`/analytics/trend?months=12`);
-      setTrendData(response.data);
-    } catch (error) {
-      console.error('Failed to load trend data');
-    }
-  };
-
-  const loadCategoryBreakdown = async () => {
-    try {
-      const response = await api.get(`/analytics/category-breakdown?month=${month}&year=${year}&type=expense`);
-      setCategoryBreakdown(response.data.slice(0, 10));
-    } catch (error) {
-      console.error('Failed to load category breakdown');
-    }
-  };
-
-  const loadBurnRate = async () => {
-    try {
-      const response = await api.get('/analytics/burn-rate');
-      setBurnRate(response.data);
-    } catch (error) {
-      console.error('Failed to load burn rate');
-    }
-  };
-
   const handleExport = async (type = 'csv') => {
     try {
       const fyParam = viewType === 'fiscal' ? `?fiscal_year=${fiscalYear}` : '';
@@ -11,6 +11,16 @@ import RecurringTransactionDialog from "./RecurringTransactionDialog";
 import api from "../utils/api";
 import { toast } from "sonner";
 
+const PAGE_SIZE = 200;
+const IMPORT_POLL_INTERVAL_MS = 1000;
+
+const SORT_PARAMS = {
+  'date-desc': '-date',
+  'date-asc': 'date',
+  'amount-desc': '-amount',
+  'amount-asc': 'amount',
+};
+
 const TransactionsTabEnhanced = ({ currency }) => {
   const [activeSubTab, setActiveSubTab] = useState('transactions');
   const [transactions, setTransactions] = useState([]);
@@ -37,68 +47,53 @@ const TransactionsTabEnhanced = ({ currency }) => {
   const [filterYear, setFilterYear] = useState(new Date().getFullYear().toString());
   const [filterType, setFilterType] = useState('all');
   const [sortBy, setSortBy] = useState('date-desc');
+  const [nextCursor, setNextCursor] = useState(null);
 
   useEffect(() => {
-    loadTransactions();
     loadRecurringTransactions();
     loadCategories();
-    autoGenerateRecurringTransactions();
   }, []);
-useEffect(() => {
-  let filtered = [...transactions];
-
-  if (filterMonth !== 'all') {
-    filtered = filtered.filter(txn => {
-      const txnDate = new Date(txn.date);
-      return txnDate.getMonth() + 1 === parseInt(filterMonth);
-    });
-  }
+  useEffect(() => {
+    loadTransactions();
+  }, [filterMonth, filterYear, filterType, sortBy]);
 
-  if (filterYear !== 'all') {
-    filtered = filtered.filter(txn => {
-      const txnDate = new Date(txn.date);
-      return txnDate.getFullYear() === parseInt(filterYear);
-    });
-  }
-
-  if (filterType !== 'all') {
-    filtered = filtered.filter(txn => txn.type === filterType);
-  }
-
-  filtered.sort((a, b) => {
-    switch (sortBy) {
-      case 'date-desc':
-        return new Date(b.date) - new Date(a.date);
-      case 'date-asc':
-        return new Date(a.date) - new Date(b.date);
-      case 'amount-desc':
-        return b.amount - a.amount;
-      case 'amount-asc':
-        return a.amount - b.amount;
-      default:
-        return new Date(b.date) - new Date(a.date);
+  useEffect(() => {
+    // A month across every year is not a single date range, so that filter stays client-side
+    if (filterYear === 'all' && filterMonth !== 'all') {
+      setFilteredTransactions(transactions.filter(txn => new Date(txn.date).getMonth() + 1 === parseInt(filterMonth)));
+    } else {
+      setFilteredTransactions(transactions);
     }
-  });
-
-  setFilteredTransactions(filtered);
-
-}, [transactions, filterMonth, filterYear, filterType, sortBy]);
-
-
-
-  const autoGenerateRecurringTransactions = async () => {
-    try {
-      await api.post('/recurring-transactions/generate');
-      console.log('Auto-generated recurring transactions');
-    } catch (error) {
-      console.error('Failed to auto-generate recurring transactions');
+  }, [transactions, filterMonth, filterYear]);
+
+  const buildTransactionParams = () => {
+    const params = { sort: SORT_PARAMS[sortBy] || '-date', limit: PAGE_SIZE };
+    if (filterYear !== 'all') {
+      if (filterMonth !== 'all') {
+        const month = filterMonth.padStart(2, '0');
+        const lastDay = new Date(parseInt(filterYear), parseInt(filterMonth), 0).getDate();
+        params.start_date = `${filterYear}-${month}-01`;
+        params.end_date = `${filterYear}-${month}-${lastDay}`;
+      } else {
+        params.start_date = `${filterYear}-01-01`;
+        params.end_date = `${filterYear}-12-31`;
+      }
+    }
+    if (filterType !== 'all') {
+      params.type = filterType;
     }
+    return params;
   };
 
-  const loadTransactions = async () => {
+  const loadTransactions = async (cursor = null) => {
     try {
-      const response = await api.get('/transactions');
-      setTransactions(response.data.sort((a, b) => new Date(b.date) - new Date(a.date)));
+      const params = buildTransactionParams();
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const response = await api.get('/transactions', { params });
+      setTransactions(prev => cursor ? [...prev, ...response.data] : response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
       toast.error('Failed to load transactions');
     }
@@ -229,21 +224,37 @@ useEffect(() => {
     formData.append('file', file);
 
     try {
-      const response = await api.post('/import/csv', formData, {
+      const { data: queued } = await api.post('/import/jobs', formData, {
         headers: {
           'Content-Type': 'multipart/form-data'
         }
       });
-      toast.success(response.data.message);
-      if (response.data.errors && response.data.errors.length > 0) {
-        toast.warning(`${response.data.errors.length} rows had errors. Check console for details.`);
-        console.error('Import errors:', response.data.errors);
-      }
       setShowImportDialog(false);
-      loadTransactions();
       if (fileInputRef.current) {
         fileInputRef.current.value = '';
       }
+      const progressToast = toast.loading(`Importing ${queued.filename}...`);
+
+      let job = queued;
+      while (job.status === 'queued' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, IMPORT_POLL_INTERVAL_MS));
+        job = (await api.get(`/import/jobs/${queued.id}`)).data;
+        if (job.status === 'running') {
+          toast.loading(`Importing ${job.filename}: ${job.rows_processed} rows processed`, { id: progressToast });
+        }
+      }
+      toast.dismiss(progressToast);
+
+      if (job.status === 'failed') {
+        toast.error(job.message || 'Failed to import CSV');
+        return;
+      }
+      toast.success(job.message);
+      if (job.errors && job.errors.length > 0) {
+        toast.warning(`${job.rows_failed} rows had errors. Check console for details.`);
+        console.error('Import errors:', job.errors);
+      }
+      loadTransactions();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Failed to import CSV');
     }
@@ -589,7 +600,7 @@ useEffect(() => {
                     {filteredTransactions.length === 0 ? (
                       <tr>
                         <td colSpan="6" className="text-center py-8 text-muted-foreground">
-                          {transactions.length === 0 ? 'No transactions yet. Add your first transaction to get started.' : 'No transactions match the current filters.'}
+                          {filterYear === 'all' && filterMonth === 'all' && filterType === 'all' ? 'No transactions yet. Add your first transaction to get started.' : 'No transactions match the current filters.'}
                         </td>
                       </tr>
                     ) : (
@@ -643,6 +654,13 @@ useEffect(() => {
                   </tbody>
                 </table>
               </div>
+              {nextCursor && (
+                <div className="flex justify-center py-4">
+                  <Button variant="outline" onClick={() => loadTransactions(nextCursor)} data-testid="load-more-transactions">
+                    Load more
+                  </Button>
+                </div>
+              )}
             </CardContent>
           </Card>
         </TabsContent>
@@ -38,7 +38,13 @@ const Dashboard = ({ setToken }) => {
     }
   };
 
-  const handleLogout = () => {
+  const handleLogout = async () => {
+    try {
+      // Revoke the token server-side so a copy of it stops working too
+      await api.post('/auth/logout');
+    } catch (error) {
+      console.error('Failed to revoke token on logout');
+    }
     setToken(null);
     toast.success('Logged out successfully');
   };
@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+# server reads its configuration at import time; each test gets its own SQLite file below
+os.environ.setdefault('STORAGE_BACKEND', 'sqlite')
+os.environ.setdefault('SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'budget_planner_tests.db'))
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+
+import server as server_module
+from fastapi.testclient import TestClient
+from storage import MongoStorage, SQLiteStorage
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_module, 'storage', SQLiteStorage(str(tmp_path / 'budget_planner.db')))
+    return server_module
+
+@pytest.fixture
+def client(server):
+    with TestClient(server.app) as client:
+        yield client
+
+@pytest.fixture
+def auth_headers(client):
+    response = client.post('/api/auth/signup', json={'email': 'user@example.com', 'password': 'secret', 'name': 'User'})
+    assert response.status_code == 200, response.text
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+@pytest.fixture
+def mongo_storage():
+    """MongoStorage on an in-memory mongomock-motor client; skipped where that isn't installed"""
+    mongomock_motor = pytest.importorskip('mongomock_motor')
+    storage = MongoStorage('mongodb://localhost:27017', 'budget_planner')
+    # The real client never connects
+    storage.client = mongomock_motor.AsyncMongoMockClient()
+    storage.db = storage.client['budget_planner']
+    return storage
@@ -0,0 +1,30 @@
+def copy_plan(client, headers, start, end, source=(2025, 3)):
+    return client.post('/api/budgets/copy', json={
+        'year': source[0], 'month': source[1],
+        'start_year': start[0], 'start_month': start[1],
+        'end_year': end[0], 'end_month': end[1]
+    }, headers=headers)
+
+def test_copy_skips_the_source_month(client, auth_headers):
+    for category, amount in (('Groceries', 400), ('Fuel', 120)):
+        client.post('/api/budgets', json={'category': category, 'month': 3, 'year': 2025, 'planned_amount': amount}, headers=auth_headers)
+    response = copy_plan(client, auth_headers, (2025, 2), (2025, 5))
+    assert response.status_code == 200
+    body = response.json()
+    assert body['message'] == 'Copied 2 budgets to 3 month(s)'
+    assert (body['created'], body['updated']) == (6, 0)
+    for month in (2, 4, 5):
+        budgets = client.get('/api/budgets', params={'month': month, 'year': 2025}, headers=auth_headers).json()
+        assert sorted((budget['category'], budget['planned_amount']) for budget in budgets) == [('Fuel', 120), ('Groceries', 400)]
+
+def test_copy_crosses_the_year_end(client, auth_headers):
+    client.post('/api/budgets', json={'category': 'Fuel', 'month': 3, 'year': 2025, 'planned_amount': 120}, headers=auth_headers)
+    assert copy_plan(client, auth_headers, (2025, 11), (2026, 2)).json()['created'] == 4
+    assert len(client.get('/api/budgets', params={'month': 1, 'year': 2026}, headers=auth_headers).json()) == 1
+
+def test_copy_range_is_checked_before_copying(client, auth_headers):
+    assert copy_plan(client, auth_headers, (2025, 5), (2025, 4)).status_code == 400
+    assert copy_plan(client, auth_headers, (2025, 1), (2035, 1)).status_code == 400
+    # Far too long a range is refused without walking it
+    assert copy_plan(client, auth_headers, (1, 1), (999999, 12)).status_code == 400
+    assert copy_plan(client, auth_headers, (2025, 1), (2025, 12)).status_code == 404
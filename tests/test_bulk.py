@@ -0,0 +1,64 @@
+def expense(date, amount, category='Food'):
+    return {'date': date, 'amount': amount, 'description': f'{category} {amount}', 'category': category, 'type': 'expense'}
+
+def create(client, headers, rows):
+    response = client.post('/api/transactions/bulk', json={'transactions': rows}, headers=headers)
+    assert response.status_code == 200, response.text
+    return [result['id'] for result in response.json()['results']]
+
+def series(client, headers, start, end):
+    response = client.get('/api/analytics/series', params={'from': start, 'to': end}, headers=headers)
+    assert response.status_code == 200, response.text
+    return {point['period']: point['expense'] for point in response.json()}
+
+def test_bulk_create_reports_each_row(client, auth_headers):
+    rows = [expense('2025-01-05', 10), expense('2025-01-06', 20), expense('2025-02-01', 5)]
+    response = client.post('/api/transactions/bulk', json={'transactions': rows}, headers=auth_headers)
+    body = response.json()
+    assert (body['succeeded'], body['failed']) == (3, 0)
+    assert [(result['index'], result['status']) for result in body['results']] == [(0, 'created'), (1, 'created'), (2, 'created')]
+    listed = client.get('/api/transactions', headers=auth_headers).json()
+    assert sorted(txn['id'] for txn in listed) == sorted(result['id'] for result in body['results'])
+
+def test_bulk_patch_reports_missing_rows(client, auth_headers):
+    first, second = create(client, auth_headers, [expense('2025-01-05', 10), expense('2025-01-06', 20)])
+    response = client.patch('/api/transactions/bulk', json={'updates': [
+        {'id': first, 'amount': 11},
+        {'id': 'missing', 'amount': 99},
+        {'id': second, 'description': 'Groceries'}
+    ]}, headers=auth_headers)
+    body = response.json()
+    assert (body['succeeded'], body['failed']) == (2, 1)
+    assert [result['status'] for result in body['results']] == ['updated', 'not_found', 'updated']
+    listed = {txn['id']: txn for txn in client.get('/api/transactions', headers=auth_headers).json()}
+    assert listed[first]['amount'] == 11
+    # Fields left out of a patch are kept
+    assert (listed[second]['amount'], listed[second]['description']) == (20, 'Groceries')
+
+def test_bulk_delete_reports_missing_rows(client, auth_headers):
+    first, second = create(client, auth_headers, [expense('2025-01-05', 10), expense('2025-01-06', 20)])
+    response = client.request('DELETE', '/api/transactions/bulk', json={'ids': ['missing', first]}, headers=auth_headers)
+    body = response.json()
+    assert (body['succeeded'], body['failed']) == (1, 1)
+    assert [result['status'] for result in body['results']] == ['not_found', 'deleted']
+    assert [txn['id'] for txn in client.get('/api/transactions', headers=auth_headers).json()] == [second]
+
+def test_bulk_rejects_repeated_ids(client, auth_headers):
+    [txn_id] = create(client, auth_headers, [expense('2025-01-05', 10)])
+    response = client.patch('/api/transactions/bulk', json={'updates': [
+        {'id': txn_id, 'amount': 11},
+        {'id': txn_id, 'amount': 12}
+    ]}, headers=auth_headers)
+    assert response.status_code == 400
+    response = client.request('DELETE', '/api/transactions/bulk', json={'ids': [txn_id, txn_id]}, headers=auth_headers)
+    assert response.status_code == 400
+    assert client.get('/api/transactions', headers=auth_headers).json()[0]['amount'] == 10
+
+def test_totals_follow_a_transaction_moved_to_another_month(client, auth_headers):
+    moved, _ = create(client, auth_headers, [expense('2025-01-05', 10), expense('2025-01-20', 5)])
+    assert series(client, auth_headers, '2025-01', '2025-02') == {'2025-01': 15, '2025-02': 0}
+    response = client.patch('/api/transactions/bulk', json={'updates': [{'id': moved, 'date': '2025-02-03', 'amount': 12}]}, headers=auth_headers)
+    assert response.json()['succeeded'] == 1
+    assert series(client, auth_headers, '2025-01', '2025-02') == {'2025-01': 5, '2025-02': 12}
+    client.request('DELETE', '/api/transactions/bulk', json={'ids': [moved]}, headers=auth_headers)
+    assert series(client, auth_headers, '2025-01', '2025-02') == {'2025-01': 5, '2025-02': 0}
@@ -0,0 +1,53 @@
+import time
+from email.utils import formatdate
+
+def expense(date, amount):
+    return {'date': date, 'amount': amount, 'description': 'Lunch', 'category': 'Food', 'type': 'expense'}
+
+def yearly_expense(response, month):
+    return next(row['expense'] for row in response.json() if row['month'] == month)
+
+def test_analytics_revalidate_until_a_write(client, auth_headers):
+    client.post('/api/transactions', json=expense('2025-03-04', 10), headers=auth_headers)
+    first = client.get('/api/analytics/yearly', params={'year': 2025}, headers=auth_headers)
+    assert first.status_code == 200
+    assert first.headers['cache-control'] == 'private, no-cache'
+    assert yearly_expense(first, 'Mar') == 10
+    etag = first.headers['etag']
+
+    cached = client.get('/api/analytics/yearly', params={'year': 2025}, headers={**auth_headers, 'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.content == b''
+    assert cached.headers['etag'] == etag
+
+    client.post('/api/transactions', json=expense('2025-03-09', 5), headers=auth_headers)
+    changed = client.get('/api/analytics/yearly', params={'year': 2025}, headers={**auth_headers, 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert yearly_expense(changed, 'Mar') == 15
+
+def test_analytics_ignore_if_modified_since(client, auth_headers):
+    response = client.get('/api/analytics/yearly', params={'year': 2025}, headers={
+        **auth_headers, 'If-Modified-Since': formatdate(time.time() + 3600, usegmt=True)
+    })
+    assert response.status_code == 200
+    assert 'last-modified' not in response.headers
+
+def test_lists_revalidate_until_a_write(server, client, auth_headers):
+    user_id = client.get('/api/auth/me', headers=auth_headers).json()['id']
+    assert 'last-modified' not in client.get('/api/transactions', headers=auth_headers).headers
+
+    # A write recorded by any worker a while ago
+    written = int(time.time()) - 10
+    client.portal.call(server.storage.mark_modified, user_id, written)
+    for path in ('/api/transactions', '/api/categories', '/api/budgets', '/api/recurring-transactions', '/api/export/csv'):
+        response = client.get(path, headers=auth_headers)
+        assert response.headers['last-modified'] == formatdate(written, usegmt=True), path
+        cached = client.get(path, headers={**auth_headers, 'If-Modified-Since': response.headers['last-modified']})
+        assert cached.status_code == 304, path
+        assert cached.content == b''
+
+    client.post('/api/transactions', json=expense('2025-03-04', 10), headers=auth_headers)
+    response = client.get('/api/transactions', headers={**auth_headers, 'If-Modified-Since': formatdate(written, usegmt=True)})
+    assert response.status_code == 200
+    assert [txn['amount'] for txn in response.json()] == [10]
@@ -0,0 +1,33 @@
+"""The Mongo category catalog migration"""
+import asyncio
+import uuid
+
+from server import PREDEFINED_CATEGORIES
+
+def add_copies(storage, user_id, names):
+    docs = [
+        {'id': str(uuid.uuid4()), 'user_id': user_id, 'name': name, 'type': 'expense', 'is_predefined': True}
+        for name in names
+    ]
+    asyncio.run(storage.db.categories.insert_many(docs))
+
+def categories(storage, user_id):
+    async def read():
+        return [doc async for doc in storage.db.categories.find({'user_id': user_id}, {'_id': 0})]
+    return asyncio.run(read())
+
+def test_completed_migration_is_not_repeated(mongo_storage):
+    names = [entry['name'] for entry in PREDEFINED_CATEGORIES.values() if entry['type'] == 'expense']
+    add_copies(mongo_storage, 'first', names[:2])
+    add_copies(mongo_storage, 'second', names[:1] + ['Renamed'])
+
+    assert asyncio.run(mongo_storage.migrate_predefined_categories(PREDEFINED_CATEGORIES)) == ['first', 'second']
+    # Untouched copies are gone; the rest of the catalog is hidden for each user
+    remaining = categories(mongo_storage, 'second')
+    assert [doc['name'] for doc in remaining if not doc.get('hidden')] == ['Renamed']
+    assert len(remaining) == len(PREDEFINED_CATEGORIES)
+
+    # Later runs skip the scan, where the edited copy would still match
+    add_copies(mongo_storage, 'late', names[:1])
+    assert asyncio.run(mongo_storage.migrate_predefined_categories(PREDEFINED_CATEGORIES)) == []
+    assert asyncio.run(mongo_storage.migrate_predefined_categories(PREDEFINED_CATEGORIES, force=True)) == ['late']
@@ -0,0 +1,38 @@
+import time
+
+HEADER = 'date,type,category,description,amount\n'
+ROWS = [
+    '2025-01-15,expense,Groceries,Weekly grocery shopping,54.20\n',
+    # The same purchase twice on one day is two transactions, not a duplicate
+    '2025-01-16,expense,Coffee,Flat white,3.50\n',
+    '2025-01-16,expense,Coffee,Flat white,3.50\n',
+]
+
+def upload(client, headers, path, rows):
+    return client.post(path, files={'file': ('statement.csv', HEADER + ''.join(rows), 'text/csv')}, headers=headers)
+
+def test_reimport_skips_rows_already_imported(client, auth_headers):
+    first = upload(client, auth_headers, '/api/import/csv', ROWS).json()
+    assert (first['imported'], first['skipped']) == (3, 0)
+
+    again = upload(client, auth_headers, '/api/import/csv', ROWS).json()
+    assert (again['imported'], again['skipped']) == (0, 3)
+
+    extended = upload(client, auth_headers, '/api/import/csv', ROWS + ['2025-01-17,income,Paycheck,Salary,2000\n']).json()
+    assert (extended['imported'], extended['skipped']) == (1, 3)
+    assert len(client.get('/api/transactions', headers=auth_headers).json()) == 4
+
+def test_import_job_runs_to_completion(client, auth_headers):
+    response = upload(client, auth_headers, '/api/import/jobs', ROWS)
+    assert response.status_code == 202
+    job = response.json()
+    assert job['status'] == 'queued'
+
+    deadline = time.monotonic() + 10
+    while job['status'] in ('queued', 'running') and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/import/jobs/{job['id']}", headers=auth_headers).json()
+    assert job['status'] == 'completed', job
+    assert (job['rows_processed'], job['imported'], job['skipped'], job['rows_failed']) == (3, 3, 0, 0)
+    assert job['finished_at'] is not None
+    assert len(client.get('/api/transactions', headers=auth_headers).json()) == 3
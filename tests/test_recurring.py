@@ -0,0 +1,51 @@
+from datetime import date
+
+from server import due_occurrences, occurrence_date
+
+def rule(**fields):
+    return {'start_date': '2025-01-15', 'day_of_month': 15, 'end_date': None, 'generated_through': None, **fields}
+
+def test_catches_up_every_month_since_start():
+    dates, covered = due_occurrences(rule(), date(2025, 4, 20))
+    assert dates == ['2025-01-15', '2025-02-15', '2025-03-15', '2025-04-15']
+    assert covered == '2025-04'
+
+def test_leaves_this_month_until_its_day():
+    dates, covered = due_occurrences(rule(), date(2025, 4, 10))
+    assert dates == ['2025-01-15', '2025-02-15', '2025-03-15']
+    assert covered == '2025-03'
+
+def test_skips_a_first_month_day_before_the_start_date():
+    dates, covered = due_occurrences(rule(start_date='2025-01-20'), date(2025, 2, 20))
+    assert dates == ['2025-02-15']
+    assert covered == '2025-02'
+
+def test_stops_at_an_end_date_in_the_middle_of_a_month():
+    dates, covered = due_occurrences(rule(end_date='2025-03-10'), date(2025, 6, 1))
+    assert dates == ['2025-01-15', '2025-02-15']
+    assert covered == '2025-02'
+
+def test_clamps_to_the_end_of_short_months():
+    dates, _ = due_occurrences(rule(start_date='2024-01-31', day_of_month=31), date(2024, 4, 30))
+    assert dates == ['2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30']
+
+def test_resumes_after_generated_through():
+    dates, covered = due_occurrences(rule(generated_through='2025-02'), date(2025, 4, 20))
+    assert dates == ['2025-03-15', '2025-04-15']
+    assert covered == '2025-04'
+
+def test_nothing_due_once_generated_through_this_month():
+    assert due_occurrences(rule(generated_through='2025-04'), date(2025, 4, 20)) == ([], None)
+
+def test_occurrence_day_is_clamped_to_the_month():
+    assert occurrence_date(2025, 2, 31) == '2025-02-28'
+    assert occurrence_date(2025, 1, 0) == '2025-01-01'
+    assert occurrence_date(2025, 2, -3) == '2025-02-01'
+
+def test_rejects_a_day_of_month_outside_1_to_31(client, auth_headers):
+    for day in (0, -3, 32):
+        response = client.post('/api/recurring-transactions', headers=auth_headers, json={
+            'amount': 10, 'description': 'Rent', 'category': 'Rent/mortgage', 'type': 'expense',
+            'day_of_month': day, 'start_date': '2025-01-01'
+        })
+        assert response.status_code == 422, day
@@ -0,0 +1,55 @@
+"""Rollup maintenance in the Mongo backend"""
+import asyncio
+
+from server import Transaction, transaction_doc
+from storage import ConflictError
+
+def txn(date, amount, category='Food'):
+    return transaction_doc(Transaction(user_id='user', date=date, amount=amount, description=category, category=category, type='expense'))
+
+def totals(storage):
+    async def read():
+        return {(row['period'], row['category']): (row['total'], row['count']) async for row in storage.db.monthly_totals.find({'count': {'$gt': 0}})}
+    return asyncio.run(read())
+
+def test_writes_keep_rollups_in_step(mongo_storage):
+    docs = [txn('2025-01-05', 10), txn('2025-01-20', 5), txn('2025-02-01', 7, 'Fuel')]
+    assert asyncio.run(mongo_storage.insert_transactions(docs)) == {}
+    assert totals(mongo_storage) == {('2025-01', 'Food'): (15, 2), ('2025-02', 'Fuel'): (7, 1)}
+
+    # Moving a row to another month and category takes it off the old rollup row
+    results = asyncio.run(mongo_storage.update_transactions('user', [
+        (docs[0]['id'], {'amount': 12, 'category': 'Fuel', 'date': '2025-02-03', 'period': '2025-02'}),
+        ('missing', {'amount': 1})
+    ]))
+    assert results == [True, False]
+    assert totals(mongo_storage) == {('2025-01', 'Food'): (5, 1), ('2025-02', 'Fuel'): (19, 2)}
+
+    assert asyncio.run(mongo_storage.delete_transactions('user', [docs[2]['id'], 'missing'])) == [True, False]
+    assert totals(mongo_storage) == {('2025-01', 'Food'): (5, 1), ('2025-02', 'Fuel'): (12, 1)}
+    assert asyncio.run(mongo_storage.rebuild_monthly_totals('user', repair=False)) == []
+
+def race(storage, monkeypatch, txn_id, changes):
+    """Apply `changes` to a row right after the next bulk write has read it"""
+    read = storage.find_transactions_by_id
+    async def racing(user_id, ids):
+        docs = await read(user_id, ids)
+        monkeypatch.setattr(storage, 'find_transactions_by_id', read)
+        await storage.update_transaction(user_id, txn_id, changes)
+        return docs
+    monkeypatch.setattr(storage, 'find_transactions_by_id', racing)
+
+def test_conflicting_concurrent_edits_are_rejected(mongo_storage, monkeypatch):
+    first, second = txn('2025-01-05', 10), txn('2025-01-06', 20)
+    asyncio.run(mongo_storage.insert_transactions([first, second]))
+
+    race(mongo_storage, monkeypatch, first['id'], {'amount': 15})
+    results = asyncio.run(mongo_storage.update_transactions('user', [(first['id'], {'amount': 100}), (second['id'], {'amount': 200})]))
+    assert isinstance(results[0], ConflictError) and results[1] is True
+    assert totals(mongo_storage) == {('2025-01', 'Food'): (215, 2)}
+
+    race(mongo_storage, monkeypatch, first['id'], {'amount': 16})
+    results = asyncio.run(mongo_storage.delete_transactions('user', [first['id'], second['id']]))
+    assert isinstance(results[0], ConflictError) and results[1] is True
+    assert totals(mongo_storage) == {('2025-01', 'Food'): (16, 1)}
+    assert asyncio.run(mongo_storage.rebuild_monthly_totals('user', repair=False)) == []
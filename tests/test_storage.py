@@ -0,0 +1,13 @@
+import pytest
+
+from storage import MongoStorage, SQLiteStorage, Storage
+
+def test_backends_implement_the_whole_interface():
+    assert not MongoStorage.__abstractmethods__
+    assert not SQLiteStorage.__abstractmethods__
+
+def test_incomplete_backend_fails_when_created():
+    methods = {name: getattr(SQLiteStorage, name) for name in Storage.__abstractmethods__ if name != 'find_user'}
+    Partial = type('Partial', (Storage,), methods)
+    with pytest.raises(TypeError, match='find_user'):
+        Partial()
@@ -0,0 +1,74 @@
+import base64
+import json
+
+def create_transactions(client, headers, rows):
+    payload = {'transactions': [
+        {'date': date, 'amount': amount, 'description': f'row {index}', 'category': 'Food', 'type': 'expense'}
+        for index, (date, amount) in enumerate(rows)
+    ]}
+    response = client.post('/api/transactions/bulk', json=payload, headers=headers)
+    assert response.status_code == 200, response.text
+    assert response.json()['failed'] == 0
+
+def page_through(client, headers, params):
+    """Every page of GET /transactions for `params`, following X-Next-Cursor"""
+    pages, cursor = [], None
+    while True:
+        response = client.get('/api/transactions', params={**params, **({'cursor': cursor} if cursor else {})}, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get('x-next-cursor')
+        if not cursor:
+            return pages
+
+def test_pages_through_equal_sort_values(client, auth_headers):
+    rows = [('2025-03-01', 10)] * 5 + [('2025-02-01', 20)] * 4
+    create_transactions(client, auth_headers, rows)
+    pages = page_through(client, auth_headers, {'sort': '-date', 'limit': 2})
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+    seen = [(txn['date'], txn['id']) for page in pages for txn in page]
+    # Ties on the date are broken by id, so no row is skipped or repeated across pages
+    assert len(set(seen)) == len(rows)
+    assert seen == sorted(seen, reverse=True)
+
+def test_pages_by_descending_amount(client, auth_headers):
+    amounts = [5, 40, 12.5, 40, 7, 100, 12.5]
+    create_transactions(client, auth_headers, [('2025-01-15', amount) for amount in amounts])
+    pages = page_through(client, auth_headers, {'sort': '-amount', 'limit': 3})
+    assert [len(page) for page in pages] == [3, 3, 1]
+    listed = [(txn['amount'], txn['id']) for page in pages for txn in page]
+    assert [amount for amount, _ in listed] == sorted(amounts, reverse=True)
+    assert listed == sorted(listed, reverse=True)
+
+def test_last_page_has_no_cursor(client, auth_headers):
+    create_transactions(client, auth_headers, [('2025-01-01', 1), ('2025-01-02', 2)])
+    response = client.get('/api/transactions', params={'limit': 2}, headers=auth_headers)
+    assert len(response.json()) == 2
+    assert 'x-next-cursor' not in response.headers
+
+def test_invalid_cursor_is_rejected(client, auth_headers):
+    malformed = [
+        'not a cursor',
+        base64.urlsafe_b64encode(b'{"date": 1}').decode('ascii'),
+        base64.urlsafe_b64encode(json.dumps(['-date', '2025-01-01', 7]).encode('utf-8')).decode('ascii'),
+    ]
+    for cursor in malformed:
+        response = client.get('/api/transactions', params={'limit': 2, 'cursor': cursor}, headers=auth_headers)
+        assert response.status_code == 400, cursor
+        assert response.json()['detail'] == 'Invalid cursor'
+
+def test_cursor_from_another_sort_is_rejected(client, auth_headers):
+    create_transactions(client, auth_headers, [('2025-01-01', 1), ('2025-01-02', 2), ('2025-01-03', 3)])
+    response = client.get('/api/transactions', params={'sort': '-date', 'limit': 1}, headers=auth_headers)
+    cursor = response.headers['x-next-cursor']
+    for sort in ('-amount', 'date'):
+        response = client.get('/api/transactions', params={'sort': sort, 'limit': 1, 'cursor': cursor}, headers=auth_headers)
+        assert response.status_code == 400
+
+def test_bulk_create_ignores_recurring_links(client, auth_headers):
+    row = {'date': '2025-01-01', 'amount': 10, 'description': 'Rent', 'category': 'Rent/mortgage', 'type': 'expense',
+           'is_recurring': True, 'recurring_id': 'forged'}
+    response = client.post('/api/transactions/bulk', json={'transactions': [row]}, headers=auth_headers)
+    assert response.json()['succeeded'] == 1
+    [txn] = client.get('/api/transactions', headers=auth_headers).json()
+    assert (txn['is_recurring'], txn['recurring_id']) == (False, None)